@@ -0,0 +1,148 @@
+"""
+Moduł trwałego cache'u wyników analiz AI dla SmartFlow.
+
+Wyniki są przechowywane w pliku SQLite, dzięki czemu cache jest współdzielony
+między sesjami Streamlit (i procesami serwera) oraz przetrwa restart aplikacji.
+"""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Any, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "analysis_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+def make_cache_key(prompt: str, model: str, prompt_version: str) -> str:
+    """Buduje klucz cache'u z znormalizowanego promptu, modelu i wersji promptu"""
+    normalized_prompt = " ".join(prompt.split())
+    payload = json.dumps(
+        {"model": model, "prompt_version": prompt_version, "prompt": normalized_prompt},
+        ensure_ascii=False,
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """Cache LRU + TTL z limitem rozmiaru, zapisywany na dysku (SQLite)"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None
+    ):
+        self.path = path or os.getenv("SMARTFLOW_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.max_entries = max_entries or int(os.getenv("SMARTFLOW_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("SMARTFLOW_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS analysis_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analysis_cache_last_access ON analysis_cache(last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Zwraca zapisaną analizę lub None (brak wpisu albo wpis wygasł)"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE analysis_cache SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Zapisuje analizę i usuwa wpisy wygasłe oraz nadmiarowe (najdawniej używane)"""
+        now = time.time()
+        serialized = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, serialized, now, now)
+            )
+            expired = self._conn.execute(
+                "DELETE FROM analysis_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+            overflow = self._conn.execute(
+                """
+                DELETE FROM analysis_cache WHERE key IN (
+                    SELECT key FROM analysis_cache
+                    ORDER BY last_access DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            ).rowcount
+            self._conn.commit()
+            self.evictions += expired + overflow
+
+    def clear(self) -> None:
+        """Czyści cały cache"""
+        with self._lock:
+            self._conn.execute("DELETE FROM analysis_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Zwraca liczniki trafień/chybień i aktualny rozmiar cache'u"""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": size,
+            "max_entries": self.max_entries,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+_shared_cache: Optional[AnalysisCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Zwraca współdzielony (na cały proces) cache analiz"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = AnalysisCache()
+        return _shared_cache
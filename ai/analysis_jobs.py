@@ -0,0 +1,152 @@
+"""
+Moduł kolejki zadań analizy AI w tle dla SmartFlow.
+
+Formularz zapisuje proces jako szkic (status draft) i zleca analizę do kolejki,
+po czym od razu kończy przebieg skryptu Streamlit. Pula wątków wykonuje analizy,
+zapisuje wynik w bazie i zmienia status procesu na analyzed; dashboard odczytuje
+postęp zadań z tego samego rejestru.
+"""
+import os
+import time
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from ai.schema import REQUIRED_FIELDS
+from ai.resilience import META_KEY, is_degraded, strip_meta
+
+logger = logging.getLogger(__name__)
+
+# Stany zadania
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Jak długo trzymamy zakończone zadania (żeby dashboard zdążył pokazać wynik)
+FINISHED_JOB_TTL_SECONDS = 600
+
+
+@dataclass
+class AnalysisJob:
+    """Zadanie analizy jednego procesu"""
+    process_id: str
+    process_data: Dict[str, Any]
+    status: str = QUEUED
+    progress: float = 0.0
+    # Ostatni częściowy wynik analizy (pola już kompletne) - do podglądu na żywo
+    partial: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+
+def _default_service() -> Any:
+    from ai.openai_service import OpenAIService
+    return OpenAIService()
+
+
+def _default_complete(process_id: str, ai_analysis: Dict[str, Any]) -> Any:
+    from database.repository import get_repository
+    return get_repository().complete_process_analysis(process_id, ai_analysis)
+
+
+class AnalysisJobQueue:
+    """Pula wątków wykonująca analizy; liczba wątków = limit równoległych zapytań do AI"""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        service_factory: Optional[Callable[[], Any]] = None,
+        on_complete: Optional[Callable[[str, Dict[str, Any]], Any]] = None
+    ):
+        self.max_workers = max_workers or int(os.getenv("SMARTFLOW_ANALYSIS_WORKERS", 4))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="smartflow-analysis")
+        self._service_factory = service_factory or _default_service
+        self._on_complete = on_complete or _default_complete
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, AnalysisJob] = {}
+        self._futures: Dict[str, Future] = {}
+
+    def submit(self, process_id: str, process_data: Dict[str, Any]) -> AnalysisJob:
+        """Zleca analizę procesu; ponowne zlecenie trwającej analizy zwraca istniejące zadanie"""
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(process_id)
+            if job is not None and job.active:
+                return job
+            job = AnalysisJob(process_id=process_id, process_data=process_data)
+            self._jobs[process_id] = job
+            # Kontekst zlecającego (m.in. token użytkownika dla RLS) przechodzi do wątku zadania
+            context = contextvars.copy_context()
+            self._futures[process_id] = self._executor.submit(context.run, self._run, job)
+        return job
+
+    def get(self, process_id: str) -> Optional[AnalysisJob]:
+        with self._lock:
+            return self._jobs.get(process_id)
+
+    def jobs_for(self, process_ids: Iterable[str]) -> Dict[str, AnalysisJob]:
+        """Zadania dla podanych procesów (tylko te, które są w rejestrze)"""
+        with self._lock:
+            return {pid: self._jobs[pid] for pid in process_ids if pid in self._jobs}
+
+    def wait(self, process_id: str, timeout: Optional[float] = None) -> Optional[AnalysisJob]:
+        """Czeka na zakończenie zadania (używane w testach i skryptach)"""
+        with self._lock:
+            future = self._futures.get(process_id)
+        if future is not None:
+            future.result(timeout=timeout)
+        return self.get(process_id)
+
+    def _run(self, job: AnalysisJob) -> None:
+        job.status = RUNNING
+        try:
+            result: Dict[str, Any] = {}
+            for result in self._service_factory().analyze_process(job.process_data, stream=True):
+                job.partial = result
+                ready = sum(name in result for name in REQUIRED_FIELDS)
+                job.progress = min(0.95, ready / len(REQUIRED_FIELDS))
+            if not result or is_degraded(result):
+                # Wynik zastępczy nie trafia do bazy - proces zostaje szkicem do ponowienia
+                reason = result.get(META_KEY, {}).get("reason") if result else None
+                raise RuntimeError(f"Usługa AI jest chwilowo niedostępna ({reason or 'brak odpowiedzi'})")
+            self._on_complete(job.process_id, strip_meta(result))
+            job.progress = 1.0
+            job.status = DONE
+        except Exception as e:
+            logger.warning("Analiza procesu %s nie powiodła się: %s", job.process_id, e)
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self) -> None:
+        now = time.time()
+        for process_id, job in list(self._jobs.items()):
+            if job.finished_at and now - job.finished_at > FINISHED_JOB_TTL_SECONDS:
+                del self._jobs[process_id]
+                self._futures.pop(process_id, None)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+_jobs: Optional[AnalysisJobQueue] = None
+_jobs_lock = threading.Lock()
+
+
+def get_analysis_jobs() -> AnalysisJobQueue:
+    """Zwraca kolejkę analiz współdzieloną przez wszystkie sesje"""
+    global _jobs
+    with _jobs_lock:
+        if _jobs is None:
+            _jobs = AnalysisJobQueue()
+    return _jobs
@@ -0,0 +1,105 @@
+"""
+Moduł współdzielonych klientów OpenAI dla SmartFlow.
+
+Jeden długo żyjący klient na proces (i konfigurację) z pulą połączeń HTTP
+keep-alive - kolejne analizy nie płacą za tworzenie klienta ani za nowy
+handshake TLS. Używają go wszystkie punkty wejścia AI.
+"""
+import os
+import asyncio
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+import httpx
+import openai
+
+
+def _settings() -> Tuple:
+    """Konfiguracja klienta z env - zmiana (np. w testach) daje nowego klienta"""
+    return (
+        os.getenv("OPENAI_API_KEY"),
+        os.getenv("OPENAI_BASE_URL"),
+        float(os.getenv("OPENAI_TIMEOUT", 30)),
+        float(os.getenv("OPENAI_CONNECT_TIMEOUT", 5)),
+        int(os.getenv("OPENAI_MAX_CONNECTIONS", 20)),
+        int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 10)),
+        float(os.getenv("OPENAI_KEEPALIVE_SECONDS", 30))
+    )
+
+
+def _http_options(settings: Tuple) -> Dict:
+    _, _, timeout, connect_timeout, max_connections, max_keepalive, keepalive_expiry = settings
+    return {
+        "timeout": httpx.Timeout(timeout, connect=connect_timeout),
+        "limits": httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+    }
+
+
+def _client_options(settings: Tuple) -> Dict:
+    api_key, base_url, timeout = settings[:3]
+    # Ponawianiem zajmuje się ai.resilience, więc wbudowane ponawianie klienta jest wyłączone
+    return {"api_key": api_key, "base_url": base_url, "max_retries": 0, "timeout": timeout}
+
+
+_lock = threading.Lock()
+_clients: Dict[Tuple, openai.OpenAI] = {}
+# Klient asynchroniczny jest związany z pętlą zdarzeń (asyncio.run tworzy nową)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, openai.AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+
+
+def get_openai_client() -> openai.OpenAI:
+    """Zwraca współdzielonego klienta OpenAI z pulą połączeń"""
+    settings = _settings()
+    with _lock:
+        client = _clients.get(settings)
+        if client is None:
+            client = openai.OpenAI(
+                http_client=httpx.Client(**_http_options(settings)),
+                **_client_options(settings)
+            )
+            _clients[settings] = client
+    return client
+
+
+def get_async_openai_client(loop: Optional[asyncio.AbstractEventLoop] = None) -> openai.AsyncOpenAI:
+    """
+    Zwraca asynchronicznego klienta OpenAI współdzielonego w ramach pętli zdarzeń.
+
+    Połączenia klienta należą do pętli, więc właściciel pętli musi przed jej
+    zakończeniem wywołać await aclose_async_clients() (jak analyze_processes).
+    """
+    loop = loop or asyncio.get_running_loop()
+    settings = _settings()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(settings)
+        if client is None:
+            client = openai.AsyncOpenAI(
+                http_client=httpx.AsyncClient(**_http_options(settings)),
+                **_client_options(settings)
+            )
+            clients[settings] = client
+    return client
+
+
+def close_clients() -> None:
+    """Zamyka klientów synchronicznych (np. przy zamykaniu aplikacji lub w testach)"""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+async def aclose_async_clients() -> None:
+    """Zamyka klientów asynchronicznych bieżącej pętli zdarzeń (przed jej zakończeniem)"""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.pop(loop, {})
+    for client in clients.values():
+        await client.close()
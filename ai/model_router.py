@@ -0,0 +1,94 @@
+"""
+Moduł wyboru modelu AI (tiering) dla SmartFlow.
+
+Analiza trafia najpierw do najtańszego/najszybszego skonfigurowanego modelu.
+Do mocniejszego modelu eskalujemy tylko wtedy, gdy odpowiedź jest ucięta lub
+niezgodna ze schematem (ai.schema), albo gdy proces jest oznaczony jako złożony.
+"""
+import os
+import logging
+from typing import Dict, Any, List, Optional
+
+from ai.response_parser import ParseResult
+from ai.schema import validate_analysis
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_TIERS = ["gpt-4o-mini", "gpt-4o"]
+DEFAULT_COMPLEX_DESCRIPTION_CHARS = 1500
+DEFAULT_COMPLEX_GOALS = 3
+COMPLEX_PARTICIPANTS = "4 lub więcej"
+
+# Powody eskalacji
+TRUNCATED = "truncated"
+INVALID_SCHEMA = "invalid_schema"
+
+class ModelRouter:
+    """Kolejność modeli od najtańszego do najmocniejszego i reguły eskalacji"""
+
+    def __init__(
+        self,
+        tiers: Optional[List[str]] = None,
+        complex_description_chars: Optional[int] = None,
+        complex_goals: Optional[int] = None
+    ):
+        configured = [name.strip() for name in os.getenv("SMARTFLOW_MODEL_TIERS", "").split(",") if name.strip()]
+        self.tiers = tiers or configured or list(DEFAULT_MODEL_TIERS)
+        self.complex_description_chars = complex_description_chars or int(
+            os.getenv("SMARTFLOW_COMPLEX_DESCRIPTION_CHARS", DEFAULT_COMPLEX_DESCRIPTION_CHARS)
+        )
+        self.complex_goals = complex_goals or int(os.getenv("SMARTFLOW_COMPLEX_GOALS", DEFAULT_COMPLEX_GOALS))
+
+    @property
+    def cheapest_model(self) -> str:
+        return self.tiers[0]
+
+    def is_complex(self, process_data: Dict[str, Any]) -> bool:
+        """Czy proces jest złożony (długi opis, wielu uczestników, wiele celów)"""
+        form_data = process_data.get("form_data", process_data)
+        process = form_data.get("process", {})
+        goals = form_data.get("improvement_goals") or form_data.get("improvement_goal") or []
+        return (
+            len(process.get("description") or process_data.get("description") or "") > self.complex_description_chars
+            or process.get("participants") == COMPLEX_PARTICIPANTS
+            or len(goals) >= self.complex_goals
+        )
+
+    def initial_tier(self, process_data: Dict[str, Any]) -> int:
+        """Poziom, od którego zaczynamy - złożone procesy od razu trafiają poziom wyżej"""
+        if len(self.tiers) > 1 and self.is_complex(process_data):
+            return 1
+        return 0
+
+    def route_signature(self, tier: int) -> str:
+        """Opis ścieżki modeli od danego poziomu - część klucza cache'u"""
+        return ",".join(self.tiers[tier:])
+
+    def escalation_reason(self, parsed: ParseResult, finish_reason: Optional[str] = None) -> Optional[str]:
+        """Powód eskalacji odpowiedzi do mocniejszego modelu lub None"""
+        if parsed.truncated or finish_reason == "length":
+            return TRUNCATED
+        if not parsed.data or validate_analysis(parsed.data):
+            return INVALID_SCHEMA
+        return None
+
+    def next_tier(self, tier: int) -> Optional[int]:
+        return tier + 1 if tier + 1 < len(self.tiers) else None
+
+    def log_served(self, tier: int, escalations: List[str]) -> None:
+        logger.info(
+            "Analiza obsłużona przez model %s (poziom %d)%s",
+            self.tiers[tier], tier,
+            f", eskalacje: {', '.join(escalations)}" if escalations else ""
+        )
+
+
+_router: Optional[ModelRouter] = None
+
+
+def get_model_router() -> ModelRouter:
+    """Zwraca router skonfigurowany dla bieżącego wdrożenia"""
+    global _router
+    if _router is None:
+        _router = ModelRouter()
+    return _router
@@ -2,11 +2,28 @@
 Moduł integracji z OpenAI dla SmartFlow.
 """
 import os
-from typing import Dict, Any, Optional
+import copy
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, AsyncIterator, Iterator, Tuple, Union
 import openai
 from dotenv import load_dotenv
-import json
-import time
+from ai.client import aclose_async_clients, get_async_openai_client, get_openai_client
+from ai.analysis_cache import AnalysisCache, get_analysis_cache, make_cache_key
+from ai.response_parser import IncrementalJSONParser, ParseResult, parse_response
+from ai.single_flight import SingleFlight
+from ai.model_router import ModelRouter, get_model_router
+from ai.schema import coerce_result, parse_analysis, response_format_for, validate_analysis
+from ai.resilience import (
+    CircuitBreaker,
+    RetryPolicy,
+    INVALID_RESPONSE,
+    call_with_resilience,
+    call_with_resilience_async,
+    classify_error,
+    with_meta
+)
 
 # Wczytanie zmiennych środowiskowych
 load_dotenv()
@@ -14,26 +31,244 @@ load_dotenv()
 # Konfiguracja OpenAI
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+logger = logging.getLogger(__name__)
+
+# Zmień przy każdej zmianie treści promptu - unieważnia wpisy w cache
+PROMPT_VERSION = "1"
+
+# Wspólny dla całego procesu - scala identyczne analizy zlecone równolegle
+_in_flight = SingleFlight()
+# Wspólny bezpiecznik - gdy OpenAI jest niedostępne, kolejne zapytania od razu dostają wynik degraded
+_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("OPENAI_BREAKER_FAILURES", 5)),
+    recovery_timeout=float(os.getenv("OPENAI_BREAKER_RECOVERY_SECONDS", 30))
+)
+
 class OpenAIService:
-    def __init__(self):
-        self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    def __init__(
+        self,
+        cache: Optional[AnalysisCache] = None,
+        use_cache: bool = True,
+        retry_policy: Optional[RetryPolicy] = None,
+        router: Optional[ModelRouter] = None
+    ):
+        self.client = self._default_client()
+        self.cache = (cache or get_analysis_cache()) if use_cache else None
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.router = router or get_model_router()
+        self.last_parse: Optional[ParseResult] = None
+
+    def _default_client(self) -> Any:
+        return get_openai_client()
     
-    def analyze_process(self, process_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Analizuje proces biznesowy używając OpenAI"""
+    def analyze_process(
+        self,
+        process_data: Dict[str, Any],
+        stream: bool = False
+    ) -> Union[Dict[str, Any], Iterator[Dict[str, Any]]]:
+        """
+        Analizuje proces biznesowy używając OpenAI.
+
+        Przy stream=True zwraca iterator częściowych wyników: każdy kolejny słownik
+        zawiera pola odpowiedzi, które są już kompletne, a ostatni - pełną analizę.
+        Pełna analiza zawiera metadane (klucz "_meta"): źródło wyniku (live, cache,
+        mock), liczbę prób, model, który udzielił odpowiedzi, oraz flagę degraded
+        dla wyniku zastępczego.
+        """
         prompt = self._prepare_prompt(process_data)
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "Jesteś ekspertem od automatyzacji procesów biznesowych w polskich firmach."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1000
+        tier = self.router.initial_tier(process_data)
+        cache_key = make_cache_key(prompt, self.router.route_signature(tier), PROMPT_VERSION)
+        if stream:
+            return self._stream_analysis(prompt, cache_key, tier)
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return with_meta(cached, source="cache", attempts=0)
+        return _in_flight.do(cache_key, lambda: self._request_analysis(prompt, cache_key, tier))
+
+    def _request_analysis(
+        self,
+        prompt: str,
+        cache_key: str,
+        tier: int,
+        escalations: Optional[List[str]] = None,
+        fallback: Optional[Tuple[ParseResult, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Wykonuje zapytanie do OpenAI z ponawianiem (bez cache'u i scalania),
+        eskalując do mocniejszego modelu, gdy odpowiedź jest ucięta lub niepoprawna.
+        fallback to wcześniejsza, słabsza odpowiedź używana, gdy eskalacja się nie uda.
+        """
+        escalations = escalations if escalations is not None else []
+        best = fallback
+        total_attempts = 0
+        while True:
+            model = self.router.tiers[tier]
+            try:
+                response, attempts = call_with_resilience(
+                    lambda: self.client.chat.completions.create(**self._completion_params(prompt, model)),
+                    self.retry_policy,
+                    _breaker
+                )
+            except Exception as e:
+                if best is None:
+                    return self._degraded_analysis(e, attempts=total_attempts + 1)
+                break
+            total_attempts += attempts
+            parsed = parse_analysis(response.choices[0].message.content)
+            if parsed.data:
+                best = (parsed, tier)
+            next_tier = self._escalate(parsed, response.choices[0].finish_reason, tier, escalations)
+            if next_tier is None:
+                break
+            tier = next_tier
+        if best is None:
+            return self._degraded_analysis(reason=INVALID_RESPONSE, attempts=total_attempts)
+        return self._served(best, cache_key, total_attempts, escalations)
+
+    def _escalate(
+        self,
+        parsed: ParseResult,
+        finish_reason: Optional[str],
+        tier: int,
+        escalations: List[str]
+    ) -> Optional[int]:
+        """Zwraca kolejny poziom modelu, jeśli odpowiedź wymaga eskalacji"""
+        reason = self.router.escalation_reason(parsed, finish_reason)
+        next_tier = self.router.next_tier(tier)
+        if reason is None or next_tier is None:
+            return None
+        escalations.append(f"{self.router.tiers[tier]}: {reason}")
+        return next_tier
+
+    def _served(
+        self,
+        best: Tuple[ParseResult, int],
+        cache_key: str,
+        attempts: int,
+        escalations: List[str]
+    ) -> Dict[str, Any]:
+        """Wynik z odpowiedzi modelu wraz z metadanymi i logiem obsługującego poziomu"""
+        parsed, tier = best
+        self.router.log_served(tier, escalations)
+        data = self._accept(parsed, cache_key)
+        return with_meta(
+            data,
+            source="live",
+            attempts=attempts,
+            truncated=parsed.truncated,
+            model=self.router.tiers[tier],
+            tier=tier,
+            escalations=escalations
+        )
+
+    def _accept(self, parsed: ParseResult, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Zwraca dane z odpowiedzi (także odzyskane z uciętej) i zapisuje pełne w cache"""
+        self.last_parse = parsed
+        if not parsed.data:
+            return None
+        if parsed.truncated:
+            logger.warning(
+                "Odpowiedź AI ucięta - odzyskano pola %s, pominięto %d znaków",
+                parsed.salvaged_fields, parsed.dropped_chars
             )
-            return self._parse_response(response.choices[0].message.content)
-        except Exception as e:
-            return self._get_mock_analysis()
+        # Do cache trafiają tylko pełne i poprawne odpowiedzi modelu, nigdy mock ani ucięte
+        elif self.cache and not validate_analysis(parsed.data):
+            self.cache.set(cache_key, parsed.data)
+        return parsed.data
+
+    def _degraded_analysis(
+        self,
+        error: Optional[BaseException] = None,
+        reason: Optional[str] = None,
+        attempts: int = 1
+    ) -> Dict[str, Any]:
+        """Wynik zastępczy (mock) jawnie oznaczony jako degraded"""
+        reason = reason or classify_error(error)
+        logger.warning("Analiza AI niedostępna (%s): %s", reason, error)
+        return with_meta(self._get_mock_analysis(), source="mock", attempts=attempts, degraded=True, reason=reason)
+
+    def _stream_analysis(self, prompt: str, cache_key: str, tier: int) -> Iterator[Dict[str, Any]]:
+        """Strumieniuje odpowiedź AI, zwracając kolejne kompletne pola"""
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield with_meta(cached, source="cache", attempts=0)
+                return
+        future, leader = _in_flight.begin(cache_key)
+        if not leader:
+            # Ta sama analiza jest już w toku (np. podwójne kliknięcie) - czekamy na jej wynik
+            try:
+                yield copy.deepcopy(future.result())
+            except Exception as e:
+                yield self._degraded_analysis(e)
+            return
+        result = None
+        try:
+            parser = IncrementalJSONParser()
+            revision = 0
+            finish_reason = None
+            model = self.router.tiers[tier]
+            try:
+                # Ponawiać można tylko nawiązanie strumienia - przed pierwszym fragmentem
+                stream, attempts = call_with_resilience(
+                    lambda: self.client.chat.completions.create(stream=True, **self._completion_params(prompt, model)),
+                    self.retry_policy,
+                    _breaker
+                )
+            except Exception as e:
+                result = self._degraded_analysis(e)
+            else:
+                try:
+                    for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        finish_reason = chunk.choices[0].finish_reason or finish_reason
+                        if not chunk.choices[0].delta.content:
+                            continue
+                        parser.feed(chunk.choices[0].delta.content)
+                        if parser.revision != revision:
+                            revision = parser.revision
+                            yield parser.completed_fields()
+                except Exception as e:
+                    # Zerwany strumień - zachowujemy to, co udało się odebrać
+                    _breaker.record_failure(e)
+                    logger.warning("Strumień AI przerwany: %s", e)
+                parsed = coerce_result(parser.result())
+                escalations: List[str] = []
+                next_tier = self._escalate(parsed, finish_reason, tier, escalations)
+                if next_tier is not None:
+                    # Odpowiedź ucięta lub niepoprawna - poprawiona wersja z mocniejszego modelu
+                    result = self._request_analysis(
+                        prompt, cache_key, next_tier, escalations,
+                        fallback=(parsed, tier) if parsed.data else None
+                    )
+                elif parsed.data:
+                    result = self._served((parsed, tier), cache_key, attempts, escalations)
+                else:
+                    result = self._degraded_analysis(reason=INVALID_RESPONSE, attempts=attempts)
+        finally:
+            if result is None:
+                # Odbiorca przerwał strumień - oczekujący nie mogą czekać w nieskończoność
+                _in_flight.finish(cache_key, error=RuntimeError("Analiza została przerwana"))
+        _in_flight.finish(cache_key, result=result)
+        yield result
+
+    def _completion_params(self, prompt: str, model: str) -> Dict[str, Any]:
+        """Parametry zapytania chat.completions dla analizy procesu (ze schematem, jeśli model go obsługuje)"""
+        params = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": "Jesteś ekspertem od automatyzacji procesów biznesowych w polskich firmach."},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.7,
+            "max_tokens": 1000
+        }
+        response_format = response_format_for(model)
+        if response_format:
+            params["response_format"] = response_format
+        return params
 
     def _prepare_prompt(self, data: Dict[str, Any]) -> str:
         form_data = data.get('form_data', {})
@@ -62,15 +297,14 @@ class OpenAIService:
 
     def _parse_response(self, response: str) -> Dict[str, Any]:
         """Parsuje odpowiedź AI do struktury"""
-        try:
-            start = response.find('{')
-            end = response.rfind('}') + 1
-            if start != -1 and end != 0:
-                json_str = response[start:end]
-                return json.loads(json_str)
-        except:
-            pass
-        return self._get_mock_analysis()
+        result = self._extract_json(response)
+        if result is None:
+            return self._get_mock_analysis()
+        return result
+
+    def _extract_json(self, response: str) -> Optional[Dict[str, Any]]:
+        """Wyciąga obiekt JSON z odpowiedzi AI, także uciętej (None gdy się nie da)"""
+        return parse_analysis(response).data or None
 
     def _get_mock_analysis(self) -> Dict[str, Any]:
         """Mock analiza dla testów"""
@@ -96,6 +330,122 @@ class OpenAIService:
             "uwagi": ["Wymaga podstawowej wiedzy o automatyzacji"]
         }
 
+@dataclass
+class BatchItemResult:
+    """Wynik analizy pojedynczego procesu w ramach analizy wsadowej"""
+    index: int
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class AsyncOpenAIService(OpenAIService):
+    """Asynchroniczna wersja serwisu - analiza wielu procesów równolegle"""
+
+    def _default_client(self) -> Optional[openai.AsyncOpenAI]:
+        # Klient asynchroniczny jest związany z pętlą zdarzeń - pobierany dopiero w trakcie działania
+        return None
+
+    @property
+    def client(self) -> openai.AsyncOpenAI:
+        return self._client or get_async_openai_client()
+
+    @client.setter
+    def client(self, value: Optional[openai.AsyncOpenAI]) -> None:
+        self._client = value
+
+    async def analyze_process(self, process_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Analizuje proces biznesowy; w przeciwieństwie do wersji synchronicznej zgłasza błędy zamiast zwracać mock"""
+        prompt = self._prepare_prompt(process_data)
+        tier = self.router.initial_tier(process_data)
+        cache_key = make_cache_key(prompt, self.router.route_signature(tier), PROMPT_VERSION)
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return with_meta(cached, source="cache", attempts=0)
+        escalations: List[str] = []
+        best = None
+        total_attempts = 0
+        while True:
+            model = self.router.tiers[tier]
+            try:
+                response, attempts = await call_with_resilience_async(
+                    lambda: self.client.chat.completions.create(**self._completion_params(prompt, model)),
+                    self.retry_policy,
+                    _breaker
+                )
+            except Exception:
+                if best is None:
+                    raise
+                break
+            total_attempts += attempts
+            parsed = parse_analysis(response.choices[0].message.content)
+            if parsed.data:
+                best = (parsed, tier)
+            next_tier = self._escalate(parsed, response.choices[0].finish_reason, tier, escalations)
+            if next_tier is None:
+                break
+            tier = next_tier
+        if best is None:
+            raise ValueError("Odpowiedź AI nie zawiera poprawnego JSON")
+        return self._served(best, cache_key, total_attempts, escalations)
+
+    async def analyze_many(
+        self,
+        processes: List[Dict[str, Any]],
+        max_concurrency: int = 5
+    ) -> AsyncIterator[BatchItemResult]:
+        """
+        Analizuje wiele procesów równolegle (maks. max_concurrency zapytań naraz).
+
+        Wyniki są zwracane w kolejności ukończenia; pole index wskazuje pozycję
+        procesu na liście wejściowej. Błąd pojedynczego procesu nie przerywa partii.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(index: int, process_data: Dict[str, Any]) -> BatchItemResult:
+            async with semaphore:
+                try:
+                    return BatchItemResult(index=index, result=await self.analyze_process(process_data))
+                except Exception as e:
+                    return BatchItemResult(index=index, error=str(e))
+
+        tasks = [asyncio.create_task(run(i, p)) for i, p in enumerate(processes)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Przerwanie iteracji przez wywołującego anuluje pozostałe zapytania
+            for task in tasks:
+                task.cancel()
+
+    async def analyze_many_ordered(
+        self,
+        processes: List[Dict[str, Any]],
+        max_concurrency: int = 5
+    ) -> List[BatchItemResult]:
+        """Jak analyze_many, ale zwraca listę wyników w kolejności wejściowej"""
+        results: List[Optional[BatchItemResult]] = [None] * len(processes)
+        async for item in self.analyze_many(processes, max_concurrency=max_concurrency):
+            results[item.index] = item
+        return results
+
+
+def analyze_processes(processes: List[Dict[str, Any]], max_concurrency: int = 5) -> List[BatchItemResult]:
+    """Synchroniczny punkt wejścia do analizy wsadowej (np. ze skryptu Streamlit)"""
+
+    async def run() -> List[BatchItemResult]:
+        try:
+            return await AsyncOpenAIService().analyze_many_ordered(processes, max_concurrency=max_concurrency)
+        finally:
+            # asyncio.run zamyka pętlę - jej klient musi zamknąć połączenia wcześniej
+            await aclose_async_clients()
+
+    return asyncio.run(run())
+
 def get_process_summary(process_data: Dict[str, Any]) -> str:
     """
     Generowanie podsumowania procesu.
@@ -123,8 +473,8 @@ def get_process_summary(process_data: Dict[str, Any]) -> str:
     """
     
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
+        response = get_openai_client().chat.completions.create(
+            model=get_model_router().cheapest_model,
             messages=[
                 {"role": "system", "content": "Jesteś ekspertem w analizie procesów biznesowych."},
                 {"role": "user", "content": prompt}
@@ -136,4 +486,134 @@ def get_process_summary(process_data: Dict[str, Any]) -> str:
         return response.choices[0].message.content
         
     except Exception as e:
-        raise ValueError(f"Błąd podczas generowania podsumowania: {str(e)}") 
\ No newline at end of file
+        raise ValueError(f"Błąd podczas generowania podsumowania: {str(e)}") 
+
+# Budżet tokenów jednego zapytania wsadowego (prompt + oczekiwana odpowiedź)
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SMARTFLOW_SUMMARY_TOKEN_BUDGET", 6000))
+# Szacowana długość jednego podsumowania w tokenach
+SUMMARY_TOKENS_PER_ITEM = 250
+
+SUMMARY_SYSTEM_PROMPT = "Jesteś ekspertem w analizie procesów biznesowych."
+
+
+def estimate_tokens(text: str) -> int:
+    """Przybliżona liczba tokenów (~4 znaki na token)"""
+    return len(text) // 4 + 1
+
+
+def _summary_item(process_data: Dict[str, Any]) -> str:
+    return (
+        f"Nazwa: {process_data.get('title', 'Nieznany proces')}\n"
+        f"Częstotliwość: {process_data.get('frequency', 'Nieznana')}\n"
+        f"Liczba uczestników: {process_data.get('participants', 0)}\n"
+        f"Czas trwania: {process_data.get('duration', 0)} minut\n"
+        f"Cele optymalizacji: {process_data.get('improvement_goals', 'Nieokreślone')}\n"
+        f"Opis: {process_data.get('description', 'Brak opisu')}"
+    )
+
+
+def _summary_batch_prompt(items: List[Tuple[str, str]]) -> str:
+    blocks = "\n\n".join(f"### Proces {key}\n{text}" for key, text in items)
+    return (
+        "Wygeneruj krótkie podsumowanie każdego z poniższych procesów biznesowych.\n"
+        "Każde podsumowanie powinno zawierać: główny cel procesu, kluczowe wyzwania "
+        "i potencjalne obszary optymalizacji.\n\n"
+        f"{blocks}\n\n"
+        "Zwróć WYŁĄCZNIE obiekt JSON, w którym kluczem jest identyfikator procesu, "
+        'a wartością tekst podsumowania, np. {"p0": "...", "p1": "..."}.'
+    )
+
+
+def pack_summary_batches(texts: List[str], token_budget: int = SUMMARY_TOKEN_BUDGET) -> List[List[int]]:
+    """
+    Dzieli procesy na paczki mieszczące się w budżecie tokenów.
+
+    Args:
+        texts: Opisy procesów (treść wstawiana do promptu)
+        token_budget: Limit tokenów promptu i odpowiedzi jednej paczki
+
+    Returns:
+        Lista paczek - każda to lista indeksów procesów
+    """
+    overhead = estimate_tokens(SUMMARY_SYSTEM_PROMPT + _summary_batch_prompt([]))
+    batches: List[List[int]] = []
+    current: List[int] = []
+    used = overhead
+    for index, text in enumerate(texts):
+        cost = estimate_tokens(text) + SUMMARY_TOKENS_PER_ITEM + 10
+        if current and used + cost > token_budget:
+            batches.append(current)
+            current, used = [], overhead
+        current.append(index)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def get_process_summaries(
+    processes: List[Dict[str, Any]],
+    token_budget: int = SUMMARY_TOKEN_BUDGET,
+    max_retries: int = 2,
+    client: Optional[Any] = None
+) -> List[Optional[str]]:
+    """
+    Wsadowe generowanie podsumowań wielu procesów.
+
+    Kilka procesów trafia do jednego zapytania (w ramach budżetu tokenów),
+    a model zwraca mapę JSON identyfikator -> podsumowanie. Ponawiane są tylko
+    procesy, których podsumowania zabrakło w odpowiedzi (także uciętej).
+
+    Args:
+        processes: Dane procesów (jak w get_process_summary)
+        token_budget: Limit tokenów jednego zapytania
+        max_retries: Liczba ponownych rund dla brakujących podsumowań
+        client: Klient OpenAI (domyślnie współdzielony klient z ai.client)
+
+    Returns:
+        Podsumowania w kolejności wejścia; None dla procesów, których nie udało się podsumować
+    """
+    client = client or get_openai_client()
+    model = get_model_router().cheapest_model
+    policy = RetryPolicy()
+    texts = [_summary_item(process_data) for process_data in processes]
+    summaries: List[Optional[str]] = [None] * len(processes)
+    pending = list(range(len(processes)))
+
+    for _ in range(max_retries + 1):
+        if not pending:
+            break
+        failed: List[int] = []
+        for batch in pack_summary_batches([texts[i] for i in pending], token_budget):
+            indexes = [pending[i] for i in batch]
+            keys = {f"p{position}": index for position, index in enumerate(indexes)}
+            prompt = _summary_batch_prompt([(key, texts[index]) for key, index in keys.items()])
+            try:
+                response, _ = call_with_resilience(
+                    lambda: client.chat.completions.create(
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                            {"role": "user", "content": prompt}
+                        ],
+                        temperature=0.7,
+                        max_tokens=SUMMARY_TOKENS_PER_ITEM * len(indexes)
+                    ),
+                    policy,
+                    _breaker
+                )
+                data = parse_response(response.choices[0].message.content).data or {}
+            except Exception as e:
+                logger.warning("Błąd podsumowania paczki %d procesów: %s", len(indexes), e)
+                data = {}
+            for key, index in keys.items():
+                summary = data.get(key)
+                if isinstance(summary, str) and summary.strip():
+                    summaries[index] = summary.strip()
+                else:
+                    failed.append(index)
+        pending = failed
+
+    if pending:
+        logger.warning("Nie udało się podsumować %d z %d procesów", len(pending), len(processes))
+    return summaries
@@ -0,0 +1,206 @@
+"""
+Moduł odporności na błędy OpenAI dla SmartFlow.
+
+Zawiera klasyfikację błędów, ponawianie z wykładniczym opóźnieniem (jitter,
+nagłówek Retry-After) oraz bezpiecznik (circuit breaker), który przy
+niedostępności dostawcy od razu zwraca błąd zamiast czekać na kolejne timeouty.
+"""
+import time
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import openai
+
+# Rodzaje błędów
+RATE_LIMIT = "rate_limit"
+TIMEOUT = "timeout"
+SERVER_ERROR = "server_error"
+AUTH = "auth"
+BAD_REQUEST = "bad_request"
+CIRCUIT_OPEN = "circuit_open"
+INVALID_RESPONSE = "invalid_response"
+UNKNOWN = "unknown"
+
+RETRYABLE = {RATE_LIMIT, TIMEOUT, SERVER_ERROR}
+
+# Klucz metadanych dołączanych do wyniku analizy
+META_KEY = "_meta"
+
+
+class CircuitOpenError(Exception):
+    """Bezpiecznik otwarty - dostawca AI uznany za niedostępny"""
+
+
+def classify_error(error: BaseException) -> str:
+    """Przypisuje wyjątek OpenAI do jednego z rodzajów błędów"""
+    if isinstance(error, CircuitOpenError):
+        return CIRCUIT_OPEN
+    if isinstance(error, openai.RateLimitError):
+        return RATE_LIMIT
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return TIMEOUT
+    if isinstance(error, (openai.AuthenticationError, openai.PermissionDeniedError)):
+        return AUTH
+    if isinstance(error, openai.APIStatusError):
+        if error.status_code >= 500:
+            return SERVER_ERROR
+        return BAD_REQUEST
+    return UNKNOWN
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Odczytuje Retry-After (sekundy lub data HTTP) z odpowiedzi błędu"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Wykładnicze opóźnienie z pełnym jitterem, z limitem prób i opóźnienia"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """Opóźnienie przed kolejną próbą lub None, gdy nie należy ponawiać"""
+        if attempt >= self.max_attempts or classify_error(error) not in RETRYABLE:
+            return None
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            # Dostawca każe czekać dłużej niż nasz budżet - lepiej od razu zwrócić błąd
+            return retry_after if retry_after <= self.max_delay else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Bezpiecznik: po serii błędów dostawcy odrzuca zapytania przez recovery_timeout sekund"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Czy można wysłać zapytanie (w stanie half-open przepuszcza jedną próbę)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self, error: BaseException) -> None:
+        # Błędy po naszej stronie (auth, złe zapytanie) nie świadczą o awarii dostawcy
+        if classify_error(error) not in RETRYABLE:
+            with self._lock:
+                if self.state == self.HALF_OPEN:
+                    # Próba doszła do dostawcy - bez zamknięcia allow() odrzucałby wszystko na zawsze
+                    self.state = self.CLOSED
+                    self.failures = 0
+            return
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+def call_with_resilience(
+    fn: Callable[[], Any],
+    policy: RetryPolicy,
+    breaker: CircuitBreaker,
+    sleep: Callable[[float], None] = time.sleep
+) -> Tuple[Any, int]:
+    """Wywołuje fn() z ponawianiem i bezpiecznikiem; zwraca (wynik, liczba prób)"""
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError("Usługa AI jest chwilowo niedostępna")
+        attempt += 1
+        try:
+            result = fn()
+        except Exception as e:
+            breaker.record_failure(e)
+            delay = policy.delay(attempt, e)
+            if delay is None:
+                raise
+            sleep(delay)
+            continue
+        breaker.record_success()
+        return result, attempt
+
+
+async def call_with_resilience_async(
+    fn: Callable[[], Awaitable[Any]],
+    policy: RetryPolicy,
+    breaker: CircuitBreaker
+) -> Tuple[Any, int]:
+    """Asynchroniczna wersja call_with_resilience"""
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError("Usługa AI jest chwilowo niedostępna")
+        attempt += 1
+        try:
+            result = await fn()
+        except Exception as e:
+            breaker.record_failure(e)
+            delay = policy.delay(attempt, e)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        breaker.record_success()
+        return result, attempt
+
+
+def with_meta(result: Dict[str, Any], **meta: Any) -> Dict[str, Any]:
+    """Zwraca kopię wyniku z dołączonymi metadanymi (source, attempts, degraded...)"""
+    meta.setdefault("degraded", False)
+    meta["retried"] = meta.get("attempts", 1) > 1
+    return {**result, META_KEY: meta}
+
+
+def is_degraded(result: Dict[str, Any]) -> bool:
+    """Czy wynik jest zastępczy (mock), a nie prawdziwą analizą AI"""
+    return bool(result.get(META_KEY, {}).get("degraded"))
+
+
+def strip_meta(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Usuwa metadane przed zapisem wyniku do bazy"""
+    return {key: value for key, value in result.items() if key != META_KEY}
@@ -0,0 +1,236 @@
+"""
+Moduł parsowania odpowiedzi AI dla SmartFlow.
+
+IncrementalJSONParser czyta odpowiedź fragment po fragmencie (np. ze strumienia),
+pomija otoczkę markdown (```json ... ```) i pozwala:
+- odczytać pola głównego obiektu, które są już kompletne,
+- odzyskać najdłuższy poprawny prefiks odpowiedzi uciętej przez limit tokenów
+  (domykając otwarte tablice i obiekty).
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+_WHITESPACE = " \t\r\n"
+_SCALAR_END = ",}] \t\r\n"
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+@dataclass
+class ParseResult:
+    """Wynik parsowania odpowiedzi wraz z informacją, co udało się odzyskać"""
+    data: Optional[Dict[str, Any]]
+    complete: bool
+    truncated: bool
+    salvaged_fields: List[str] = field(default_factory=list)
+    dropped_chars: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.data is not None
+
+
+class IncrementalJSONParser:
+    """Przyrostowy, tolerancyjny na ucięcie parser obiektu JSON z odpowiedzi AI"""
+
+    def __init__(self):
+        self.buffer = ""
+        # Licznik zmian kompletnych pól - pozwala tanio wykryć nowe dane
+        self.revision = 0
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        # Stos otwartych kontenerów: [rodzaj ('{' lub '['), stan]
+        self._stack: List[List[str]] = []
+        self._in_string = False
+        self._escape = False
+        self._string_is_key = False
+        self._string_start = 0
+        self._in_scalar = False
+        self._scalar_start = 0
+        # Ostatni punkt, w którym ucięcie + domknięcie daje poprawny JSON
+        self._cut: Optional[Tuple[int, str]] = None
+        self._fields: Dict[str, Any] = {}
+        self._current_key: Optional[str] = None
+        self._member_start = 0
+        self._item_start = 0
+        self._partial_items: List[Any] = []
+        # Niepoprawny klucz głównego obiektu - dalsza część odpowiedzi jest pomijana
+        self._invalid = False
+
+    @property
+    def done(self) -> bool:
+        """Czy główny obiekt został domknięty"""
+        return self._end is not None
+
+    def feed(self, chunk: str) -> "IncrementalJSONParser":
+        """Dopisuje fragment odpowiedzi i przetwarza tylko nowe znaki"""
+        self.buffer += chunk
+        text = self.buffer
+        i = self._pos
+        if self._start is None:
+            brace = text.find("{", i)
+            if brace == -1:
+                self._pos = len(text)
+                return self
+            self._start = i = brace
+
+        while i < len(text) and self._end is None and not self._invalid:
+            char = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._on_string_end(i + 1)
+                i += 1
+                continue
+            if self._in_scalar:
+                if char not in _SCALAR_END:
+                    i += 1
+                    continue
+                self._in_scalar = False
+                self._on_value_end(self._scalar_start, i)
+            if char in _WHITESPACE:
+                pass
+            elif char == '"':
+                top = self._stack[-1] if self._stack else None
+                self._string_is_key = top is not None and top[0] == "{" and top[1] == "key"
+                self._in_string = True
+                self._string_start = i
+                if not self._string_is_key:
+                    self._on_value_start(i)
+            elif char in "{[":
+                self._on_value_start(i)
+                self._stack.append([char, "key" if char == "{" else "value"])
+                if len(self._stack) == 1:
+                    # Puste zagnieżdżone kontenery (np. "{}" w rekomendacjach) nic nie wnoszą
+                    self._mark_cut(i + 1)
+            elif char in "}]":
+                self._stack.pop()
+                self._on_value_end(self._container_start(), i + 1)
+            elif char == ",":
+                top = self._stack[-1]
+                top[1] = "key" if top[0] == "{" else "value"
+            elif char == ":":
+                self._stack[-1][1] = "value"
+            else:
+                self._in_scalar = True
+                self._scalar_start = i
+                self._on_value_start(i)
+            i += 1
+        self._pos = i
+        return self
+
+    def completed_fields(self) -> Dict[str, Any]:
+        """
+        Zwraca kompletne pola głównego obiektu.
+
+        Dla tablicy, która jest jeszcze w trakcie przesyłania (np. rekomendacje),
+        zwraca jej dotychczas kompletne elementy.
+        """
+        fields = dict(self._fields)
+        if self._partial_items and self._current_key not in fields:
+            fields[self._current_key] = list(self._partial_items)
+        return fields
+
+    def result(self) -> ParseResult:
+        """Zwraca sparsowany obiekt; dla uciętej odpowiedzi - odzyskany prefiks"""
+        if self._start is None:
+            return ParseResult(data=None, complete=False, truncated=False)
+        if self._end is not None:
+            try:
+                data = json.loads(self.buffer[self._start:self._end])
+            except ValueError:
+                return ParseResult(data=None, complete=False, truncated=False)
+            return ParseResult(data=data, complete=True, truncated=False, salvaged_fields=list(data))
+
+        candidates = []
+        if self._in_scalar:
+            # Strumień skończył się na wartości skalarnej - może być kompletna (np. "8")
+            candidates.append((len(self.buffer), self._closers()))
+        if self._cut is not None:
+            candidates.append(self._cut)
+        for cut, closers in candidates:
+            try:
+                data = json.loads(self.buffer[self._start:cut] + closers)
+            except ValueError:
+                continue
+            if isinstance(data, dict):
+                return ParseResult(
+                    data=data,
+                    complete=False,
+                    truncated=True,
+                    salvaged_fields=list(data),
+                    dropped_chars=len(self.buffer) - cut
+                )
+        return ParseResult(data=None, complete=False, truncated=True, dropped_chars=len(self.buffer) - self._start)
+
+    def _closers(self) -> str:
+        return "".join(_CLOSERS[kind] for kind, _ in reversed(self._stack))
+
+    def _mark_cut(self, index: int) -> None:
+        self._cut = (index, self._closers())
+
+    def _container_start(self) -> int:
+        # Początek domykanego kontenera jest potrzebny tylko dla pól i elementów głównego obiektu
+        depth = len(self._stack)
+        if depth == 1:
+            return self._member_start
+        if depth == 2:
+            return self._item_start
+        return 0
+
+    def _on_value_start(self, index: int) -> None:
+        depth = len(self._stack)
+        if depth == 1 and self._stack[0][0] == "{":
+            self._member_start = index
+        elif depth == 2 and self._stack[0][0] == "{" and self._stack[1][0] == "[":
+            self._item_start = index
+
+    def _on_value_end(self, start: int, end: int) -> None:
+        depth = len(self._stack)
+        if depth == 0:
+            self._end = end
+            return
+        self._stack[-1][1] = "after"
+        self._mark_cut(end)
+        if depth == 1 and self._stack[0][0] == "{":
+            try:
+                self._fields[self._current_key] = json.loads(self.buffer[start:end])
+            except ValueError:
+                return
+            self._partial_items = []
+            self.revision += 1
+        elif depth == 2 and self._stack[0][0] == "{" and self._stack[1][0] == "[":
+            try:
+                self._partial_items.append(json.loads(self.buffer[start:end]))
+            except ValueError:
+                return
+            self.revision += 1
+
+    def _on_string_end(self, end: int) -> None:
+        if not self._string_is_key:
+            self._on_value_end(self._string_start, end)
+            return
+        if len(self._stack) == 1:
+            try:
+                self._current_key = json.loads(self.buffer[self._string_start:end])
+            except ValueError:
+                # Np. niedozwolona sekwencja ucieczki - odzyskujemy tylko pola przed tym kluczem
+                self._invalid = True
+                return
+            self._partial_items = []
+        self._stack[-1][1] = "colon"
+
+
+def parse_response(text: str) -> ParseResult:
+    """Parsuje pełną (lub uciętą) odpowiedź AI"""
+    return IncrementalJSONParser().feed(text).result()
+
+
+def extract_complete_fields(text: str) -> Dict[str, Any]:
+    """Zwraca pola głównego obiektu JSON, które są już kompletne"""
+    return IncrementalJSONParser().feed(text).completed_fields()
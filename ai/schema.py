@@ -0,0 +1,193 @@
+"""
+Moduł kanonicznego schematu wyniku analizy AI dla SmartFlow.
+
+Jeden schemat JSON opisuje pola ocena_potencjalu, mozliwe_oszczednosci,
+rekomendacje, plan_wdrozenia i uwagi. Z niego powstają:
+- schemat structured output wysyłany do modeli, które go obsługują,
+- walidator i konwerter typów skompilowane raz do zagnieżdżonych domknięć
+  (bez interpretowania schematu przy każdym wyniku).
+"""
+import os
+import re
+import copy
+from typing import Any, Callable, Dict, List, Optional
+
+from ai.response_parser import ParseResult, parse_response
+
+ANALYSIS_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "ocena_potencjalu": {"type": "integer", "minimum": 1, "maximum": 10},
+        "mozliwe_oszczednosci": {
+            "type": "object",
+            "properties": {
+                "czas_godziny_miesiecznie": {"type": "number", "minimum": 0},
+                "oszczednosci_pieniadze_miesiecznie": {"type": "number", "minimum": 0}
+            },
+            "required": []
+        },
+        "rekomendacje": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "narzedzie": {"type": "string"},
+                    "opis": {"type": "string"},
+                    "koszt_miesiecznie": {"type": "number", "minimum": 0},
+                    "czas_wdrozenia": {"type": "string"}
+                },
+                "required": []
+            }
+        },
+        "plan_wdrozenia": {"type": "array", "items": {"type": "string"}},
+        "uwagi": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["ocena_potencjalu", "mozliwe_oszczednosci", "rekomendacje", "plan_wdrozenia"]
+}
+
+REQUIRED_FIELDS = tuple(ANALYSIS_SCHEMA["required"])
+
+# Rodziny modeli obsługujące response_format typu json_schema
+STRUCTURED_OUTPUT_MODELS = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+
+# Ograniczenia sprawdzane lokalnie, nieobsługiwane przez tryb strict API
+_LOCAL_ONLY_KEYWORDS = ("minimum", "maximum")
+
+_TYPES = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool)
+}
+
+_NUMBER = re.compile(r"-?\d+(?:[.,]\d+)?")
+
+Check = Callable[[Any, str, List[str]], None]
+
+
+def _compile_check(schema: Dict[str, Any]) -> Check:
+    """Zamienia (pod)schemat na funkcję sprawdzającą wartość i dopisującą błędy"""
+    type_name = schema.get("type")
+    is_type = _TYPES[type_name]
+    minimum = schema.get("minimum")
+    maximum = schema.get("maximum")
+    required = tuple(schema.get("required", ()))
+    properties = tuple((name, _compile_check(sub)) for name, sub in schema.get("properties", {}).items())
+    items = _compile_check(schema["items"]) if "items" in schema else None
+
+    def check(value: Any, path: str, errors: List[str]) -> None:
+        if not is_type(value):
+            errors.append(f"{path}: oczekiwano typu {type_name}")
+            return
+        if minimum is not None and value < minimum:
+            errors.append(f"{path}: wartość mniejsza niż {minimum}")
+        if maximum is not None and value > maximum:
+            errors.append(f"{path}: wartość większa niż {maximum}")
+        for name in required:
+            if name not in value:
+                errors.append(f"{path}: brak pola {name}")
+        for name, check_property in properties:
+            if name in value:
+                check_property(value[name], f"{path}.{name}", errors)
+        if items is not None:
+            for index, item in enumerate(value):
+                items(item, f"{path}[{index}]", errors)
+
+    return check
+
+
+def _to_number(value: Any, integer: bool) -> Any:
+    if isinstance(value, str):
+        match = _NUMBER.search(value.replace(" ", "").replace(" ", ""))
+        if not match:
+            return value
+        value = float(match.group().replace(",", "."))
+    if isinstance(value, float) and integer:
+        return int(round(value))
+    return value
+
+
+def _compile_coerce(schema: Dict[str, Any]) -> Callable[[Any], Any]:
+    """Zamienia (pod)schemat na funkcję poprawiającą typowe odstępstwa typów"""
+    type_name = schema.get("type")
+    if type_name in ("integer", "number"):
+        integer = type_name == "integer"
+        return lambda value: _to_number(value, integer) if not isinstance(value, bool) else value
+    if type_name == "string":
+        return lambda value: str(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+    if type_name == "array":
+        coerce_item = _compile_coerce(schema["items"]) if "items" in schema else (lambda value: value)
+
+        def coerce_array(value: Any) -> Any:
+            if value is None:
+                return []
+            if not isinstance(value, list):
+                value = [value]
+            return [coerce_item(item) for item in value]
+
+        return coerce_array
+    if type_name == "object":
+        properties = tuple((name, _compile_coerce(sub)) for name, sub in schema.get("properties", {}).items())
+
+        def coerce_object(value: Any) -> Any:
+            if not isinstance(value, dict):
+                return value
+            coerced = dict(value)
+            for name, coerce_property in properties:
+                if name in coerced:
+                    coerced[name] = coerce_property(coerced[name])
+            return coerced
+
+        return coerce_object
+    return lambda value: value
+
+
+_check_analysis = _compile_check(ANALYSIS_SCHEMA)
+coerce_analysis: Callable[[Dict[str, Any]], Dict[str, Any]] = _compile_coerce(ANALYSIS_SCHEMA)
+
+
+def validate_analysis(data: Dict[str, Any]) -> List[str]:
+    """Zwraca listę problemów z wynikiem analizy (pusta lista = wynik poprawny)"""
+    errors: List[str] = []
+    _check_analysis(data, "$", errors)
+    return errors
+
+
+def coerce_result(parsed: ParseResult) -> ParseResult:
+    """Konwertuje typy w danych sparsowanej odpowiedzi (np. "8" -> 8)"""
+    if parsed.data:
+        parsed.data = coerce_analysis(parsed.data)
+    return parsed
+
+
+def parse_analysis(text: str) -> ParseResult:
+    """Parsuje odpowiedź modelu i konwertuje typy pól do schematu"""
+    return coerce_result(parse_response(text))
+
+
+def _strict_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    strict = {key: value for key, value in schema.items() if key not in _LOCAL_ONLY_KEYWORDS}
+    if "properties" in schema:
+        strict["properties"] = {name: _strict_schema(sub) for name, sub in schema["properties"].items()}
+        # Tryb strict wymaga wszystkich pól i zakazu dodatkowych
+        strict["required"] = list(schema["properties"])
+        strict["additionalProperties"] = False
+    if "items" in schema:
+        strict["items"] = _strict_schema(schema["items"])
+    return strict
+
+
+STRICT_ANALYSIS_SCHEMA = _strict_schema(copy.deepcopy(ANALYSIS_SCHEMA))
+
+
+def response_format_for(model: str) -> Optional[Dict[str, Any]]:
+    """Parametr response_format dla modelu (None gdy model go nie obsługuje)"""
+    if os.getenv("SMARTFLOW_STRUCTURED_OUTPUT", "1") == "0":
+        return None
+    if model.startswith(STRUCTURED_OUTPUT_MODELS):
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": "analiza_procesu", "strict": True, "schema": STRICT_ANALYSIS_SCHEMA}
+        }
+    return None
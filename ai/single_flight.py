@@ -0,0 +1,61 @@
+"""
+Moduł scalania identycznych, równoległych zapytań (single-flight) dla SmartFlow.
+
+Gdy kilka wątków (sesji Streamlit) jednocześnie zleca tę samą pracę - np.
+analizę identycznego procesu - tylko pierwszy ją wykonuje, a pozostałe czekają
+na jego wynik.
+"""
+import copy
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class SingleFlight:
+    """Rejestr zapytań w toku, kluczowany np. kluczem cache'u analizy"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.coalesced = 0
+
+    def begin(self, key: str) -> Tuple[Future, bool]:
+        """Zwraca (future, czy_lider); lider musi później wywołać finish()"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def finish(self, key: str, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """Kończy zapytanie lidera i budzi oczekujących"""
+        with self._lock:
+            future = self._calls.pop(key, None)
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Wykonuje fn() raz dla wszystkich równoległych wywołań z tym samym kluczem"""
+        future, leader = self.begin(key)
+        if not leader:
+            # Kopia - oczekujący nie współdzielą mutowalnego wyniku z liderem
+            return copy.deepcopy(future.result(timeout=timeout))
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result=result)
+        return result
+
+    def in_flight(self) -> int:
+        """Liczba zapytań aktualnie w toku"""
+        with self._lock:
+            return len(self._calls)
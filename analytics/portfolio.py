@@ -0,0 +1,166 @@
+"""
+Moduł kalkulatora oszczędności i ROI portfela procesów dla SmartFlow.
+
+Zamienia dane z formularza (częstotliwość, uczestnicy, czas trwania) na
+miesięczne roboczogodziny, łączy je z oszczędnościami i kosztami narzędzi
+z ai_analysis i liczy okres zwrotu, roczny ROI oraz sumy dla wszystkich
+procesów użytkownika w jednym przebiegu wektorowym (bez pętli po wierszach
+w obliczeniach).
+"""
+import json
+import numbers
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from analytics.prescore import (
+    DEFAULT_HOURLY_RATE,
+    FREQUENCY_PER_MONTH,
+    HOURLY_RATE,
+    PARTICIPANTS_COUNT
+)
+
+# Szacowany nakład pracy na wdrożenie narzędzia: godzin na tydzień wdrożenia
+IMPLEMENTATION_HOURS_PER_WEEK = 8.0
+# Domyślny czas wdrożenia, gdy AI go nie podało (tygodnie)
+DEFAULT_IMPLEMENTATION_WEEKS = 2.0
+
+
+def _analysis(process: Dict[str, Any]) -> Dict[str, Any]:
+    analysis = process.get("ai_analysis")
+    if isinstance(analysis, str):
+        try:
+            analysis = json.loads(analysis)
+        except ValueError:
+            return {}
+    return analysis if isinstance(analysis, dict) else {}
+
+
+def _numeric(values: pd.Series) -> np.ndarray:
+    """Liczby z pól JSON jak jsonb_numeric w SQL: liczba albo pierwsza liczba z tekstu ("1 200 zł", "1,5")"""
+    is_number = values.map(lambda v: isinstance(v, numbers.Number) and not isinstance(v, bool))
+    is_text = values.map(lambda v: isinstance(v, str))
+    text = values.where(is_text, "").str.replace(" ", "", regex=False)
+    parsed = pd.to_numeric(text.str.extract(r"(-?\d+(?:[.,]\d+)?)", expand=False).str.replace(",", ".", regex=False), errors="coerce")
+    return pd.to_numeric(values.where(is_number), errors="coerce").fillna(parsed).to_numpy(float)
+
+
+def numeric_value(value: Any) -> float:
+    """Jedna wartość pola JSON jako liczba (reguły _numeric); NaN, gdy nie da się jej odczytać"""
+    return float(_numeric(pd.Series([value], dtype=object))[0])
+
+
+def portfolio_frame(processes: Sequence[Dict[str, Any]]) -> pd.DataFrame:
+    """Kolumny wejściowe kalkulatora - jeden wiersz na proces"""
+    forms = [process.get("form_data") or {} for process in processes]
+    details = pd.DataFrame([form.get("process") or {} for form in forms], index=range(len(forms)))
+    companies = pd.DataFrame([form.get("company") or {} for form in forms], index=range(len(forms)))
+    savings = pd.DataFrame([_analysis(p).get("mozliwe_oszczednosci") or {} for p in processes], index=range(len(forms)))
+
+    # Rekomendacje spłaszczone do jednej tabeli; sumy per proces przez bincount
+    recommendations = [
+        (position, rec.get("koszt_miesiecznie"), rec.get("czas_wdrozenia"))
+        for position, process in enumerate(processes)
+        for rec in (_analysis(process).get("rekomendacje") or [])
+        if isinstance(rec, dict)
+    ]
+    recs = pd.DataFrame(recommendations, columns=["position", "cost", "duration"])
+    weeks = recs["duration"].astype(str).str.extract(r"(\d+(?:[.,]\d+)?)\s*(tydz|tyg|mies|dni|dzie)", expand=True)
+    weeks_value = pd.to_numeric(weeks[0].str.replace(",", "."), errors="coerce")
+    weeks_value = np.select(
+        [weeks[1].isin(["mies"]), weeks[1].isin(["dni", "dzie"])],
+        [weeks_value * 4.33, weeks_value / 7],
+        weeks_value
+    )
+    positions = recs["position"].to_numpy(int)
+    size = len(processes)
+
+    def column(frame: pd.DataFrame, name: str) -> pd.Series:
+        return frame[name] if name in frame else pd.Series([np.nan] * len(frame), dtype=object)
+
+    return pd.DataFrame({
+        "runs_per_month": column(details, "frequency").map(FREQUENCY_PER_MONTH).to_numpy(float),
+        "participants": column(details, "participants").map(PARTICIPANTS_COUNT).to_numpy(float),
+        "duration": _numeric(column(details, "duration")),
+        "hourly_rate": column(companies, "company_size").map(HOURLY_RATE).fillna(DEFAULT_HOURLY_RATE).to_numpy(float),
+        "hours_saved": _numeric(column(savings, "czas_godziny_miesiecznie")),
+        "money_saved": _numeric(column(savings, "oszczednosci_pieniadze_miesiecznie")),
+        "tool_cost": np.bincount(positions, weights=np.nan_to_num(_numeric(recs["cost"])), minlength=size),
+        "implementation_weeks": np.bincount(positions, weights=np.nan_to_num(weeks_value.astype(float), nan=DEFAULT_IMPLEMENTATION_WEEKS), minlength=size)
+    })
+
+
+def compute_portfolio(frame: pd.DataFrame) -> Dict[str, Any]:
+    """Wskaźniki per proces (kolumny) i sumy portfela; tylko procesy z analizą AI liczą się do sum"""
+    runs = frame["runs_per_month"].to_numpy(float)
+    participants = frame["participants"].to_numpy(float)
+    duration = frame["duration"].to_numpy(float)
+    rate = frame["hourly_rate"].to_numpy(float)
+    hours_saved = frame["hours_saved"].to_numpy(float)
+    money_saved = frame["money_saved"].to_numpy(float)
+    tool_cost = frame["tool_cost"].to_numpy(float)
+    weeks = frame["implementation_weeks"].to_numpy(float)
+
+    monthly_hours = runs * duration * participants
+    analyzed = ~np.isnan(hours_saved) | ~np.isnan(money_saved)
+    # Brak kwoty od AI - wyceniamy zaoszczędzone godziny stawką godzinową
+    money_saved = np.where(np.isnan(money_saved), np.nan_to_num(hours_saved) * rate, money_saved)
+    hours_saved = np.nan_to_num(hours_saved)
+
+    net_monthly = money_saved - tool_cost
+    setup_cost = weeks * IMPLEMENTATION_HOURS_PER_WEEK * rate
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payback_months = np.where(net_monthly > 0, setup_cost / net_monthly, np.inf)
+        yearly_cost = 12 * tool_cost + setup_cost
+        annual_roi = np.where(yearly_cost > 0, (12 * net_monthly - setup_cost) / yearly_cost, np.nan)
+
+    total_net = float(net_monthly[analyzed].sum())
+    total_setup = float(setup_cost[analyzed].sum())
+    total_yearly_cost = float(yearly_cost[analyzed].sum())
+    return {
+        "monthly_hours": monthly_hours,
+        "hours_saved": hours_saved,
+        "money_saved": money_saved,
+        "net_monthly": net_monthly,
+        "setup_cost": setup_cost,
+        "payback_months": payback_months,
+        "annual_roi": annual_roi,
+        "analyzed": analyzed,
+        "totals": {
+            "processes": int(len(frame)),
+            "analyzed": int(analyzed.sum()),
+            "monthly_hours": float(np.nansum(monthly_hours)),
+            "hours_saved_monthly": float(hours_saved[analyzed].sum()),
+            "money_saved_monthly": float(money_saved[analyzed].sum()),
+            "tool_cost_monthly": float(tool_cost[analyzed].sum()),
+            "net_monthly": total_net,
+            "setup_cost": total_setup,
+            "payback_months": total_setup / total_net if total_net > 0 else float("inf"),
+            "annual_roi": (12 * total_net - total_setup) / total_yearly_cost if total_yearly_cost > 0 else float("nan")
+        }
+    }
+
+
+def portfolio_summary(processes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sumy portfela procesów użytkownika (oszczędności, koszty, zwrot, ROI)"""
+    return compute_portfolio(portfolio_frame(processes))["totals"]
+
+
+def totals_from_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Sumy portfela (kształt jak portfolio_summary) z wyniku RPC get_process_stats"""
+    net_monthly = float(stats.get("money_saved_monthly") or 0) - float(stats.get("tool_cost_monthly") or 0)
+    setup_cost = float(stats.get("setup_cost") or 0)
+    yearly_cost = 12 * float(stats.get("tool_cost_monthly") or 0) + setup_cost
+    return {
+        "processes": int(stats.get("total") or 0),
+        "analyzed": int(stats.get("analyzed") or 0),
+        "monthly_hours": float(stats.get("monthly_hours") or 0),
+        "hours_saved_monthly": float(stats.get("hours_saved_monthly") or 0),
+        "money_saved_monthly": float(stats.get("money_saved_monthly") or 0),
+        "tool_cost_monthly": float(stats.get("tool_cost_monthly") or 0),
+        "net_monthly": net_monthly,
+        "setup_cost": setup_cost,
+        "payback_months": setup_cost / net_monthly if net_monthly > 0 else float("inf"),
+        "annual_roi": (12 * net_monthly - setup_cost) / yearly_cost if yearly_cost > 0 else float("nan")
+    }
@@ -0,0 +1,128 @@
+"""
+Moduł wstępnej (heurystycznej) oceny procesów dla SmartFlow.
+
+Deterministyczna ocena liczona lokalnie z pól formularza i prostych cech opisu
+(liczba kroków, słowa kluczowe pracy ręcznej), wyświetlana od razu - zanim
+odpowie model AI. Obliczenia są wektorowe (NumPy/pandas), więc ta sama funkcja
+ocenia jeden proces albo tysiące zapisanych procesów naraz.
+"""
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Liczba wykonań procesu w miesiącu (~21 dni roboczych)
+FREQUENCY_PER_MONTH = {
+    "codziennie": 21.0,
+    "raz w tygodniu": 4.33,
+    "raz w miesiącu": 1.0
+}
+
+# Średnia liczba osób w przedziale z formularza
+PARTICIPANTS_COUNT = {
+    "1 osoba": 1.0,
+    "2-3 osoby": 2.5,
+    "4 lub więcej": 4.0
+}
+
+# Koszt godziny pracy (zł) zależnie od wielkości firmy
+HOURLY_RATE = {
+    "5-10 osób": 120.0,
+    "11-25 osób": 150.0,
+    "26-50 osób": 180.0
+}
+DEFAULT_HOURLY_RATE = 150.0
+
+# Korekta oceny zależnie od budżetu na narzędzia
+BUDGET_ADJUSTMENT = {
+    "do 500 zł/miesiąc": -0.5,
+    "500-2000 zł/miesiąc": 0.0,
+    "powyżej 2000 zł/miesiąc": 0.5
+}
+
+# Słowa świadczące o pracy ręcznej, którą łatwo zautomatyzować
+MANUAL_WORK_PATTERN = r"excel|arkusz|e-?mail|mail|ręczn|przepis|kopiuj|wklej|drukuj|skan|papier|faktur"
+# Kroki opisu: linie zaczynające się od numeru lub punktora
+STEP_PATTERN = r"(?m)^\s*(?:\d+[.)]|[-*•])\s+"
+
+# Liczba godzin miesięcznie, powyżej której skala procesu nie podnosi już oceny
+FULL_SCALE_HOURS = 160.0
+
+
+def score_arrays(
+    runs_per_month: np.ndarray,
+    duration: np.ndarray,
+    participants: np.ndarray,
+    goals: np.ndarray,
+    manual_hits: np.ndarray,
+    steps: np.ndarray,
+    hourly_rate: np.ndarray,
+    budget_adjustment: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """Ocena i szacunek oszczędności dla tablic cech (jeden element = jeden proces)"""
+    monthly_hours = runs_per_month * duration * participants
+    manual = np.clip(manual_hits / 4.0, 0.0, 1.0)
+    structured = np.clip(steps / 8.0, 0.0, 1.0)
+
+    # Część czasu możliwa do odzyskania automatyzacją
+    automation_share = np.clip(0.2 + 0.3 * manual + 0.1 * structured + 0.03 * goals, 0.2, 0.6)
+    hours_saved = np.round(monthly_hours * automation_share, 1)
+
+    scale = np.clip(np.log1p(monthly_hours) / np.log1p(FULL_SCALE_HOURS), 0.0, 1.0)
+    raw_score = 1.0 + 9.0 * (0.5 * scale + 0.35 * manual + 0.15 * structured) + budget_adjustment
+    return {
+        "ocena_potencjalu": np.clip(np.rint(raw_score), 1, 10).astype(int),
+        "czas_godziny_miesiecznie": hours_saved,
+        "oszczednosci_pieniadze_miesiecznie": np.round(hours_saved * hourly_rate, -1)
+    }
+
+
+def extract_features(processes: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Cechy procesów (dane z formularza lub wiersze z bazy) jako tablice NumPy"""
+    forms = [process.get("form_data") or process for process in processes]
+    details = pd.DataFrame([form.get("process") or {} for form in forms], index=range(len(forms)))
+    companies = pd.DataFrame([form.get("company") or {} for form in forms], index=range(len(forms)))
+    descriptions = pd.Series(
+        [(form.get("process") or {}).get("description") or process.get("description") or ""
+         for form, process in zip(forms, processes)],
+        dtype=object
+    ).str.lower()
+
+    def column(frame: pd.DataFrame, name: str) -> pd.Series:
+        return frame[name] if name in frame else pd.Series([None] * len(frame), dtype=object)
+
+    return {
+        "runs_per_month": column(details, "frequency").map(FREQUENCY_PER_MONTH).fillna(FREQUENCY_PER_MONTH["raz w tygodniu"]).to_numpy(float),
+        "duration": pd.to_numeric(column(details, "duration"), errors="coerce").fillna(1.0).to_numpy(float),
+        "participants": column(details, "participants").map(PARTICIPANTS_COUNT).fillna(1.0).to_numpy(float),
+        "goals": np.array([len(form.get("improvement_goals") or []) for form in forms], dtype=float),
+        "manual_hits": descriptions.str.count(MANUAL_WORK_PATTERN).to_numpy(float),
+        "steps": descriptions.str.count(STEP_PATTERN).to_numpy(float),
+        "hourly_rate": column(companies, "company_size").map(HOURLY_RATE).fillna(DEFAULT_HOURLY_RATE).to_numpy(float),
+        "budget_adjustment": column(companies, "budget_range").map(BUDGET_ADJUSTMENT).fillna(0.0).to_numpy(float)
+    }
+
+
+def prescore_many(processes: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Wstępna ocena wielu procesów naraz"""
+    if not processes:
+        return {name: np.array([]) for name in ("ocena_potencjalu", "czas_godziny_miesiecznie", "oszczednosci_pieniadze_miesiecznie")}
+    return score_arrays(**extract_features(processes))
+
+
+def prescore(process_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Wstępna ocena jednego procesu w kształcie wyniku analizy AI"""
+    scores = prescore_many([process_data])
+    return {
+        "ocena_potencjalu": int(scores["ocena_potencjalu"][0]),
+        "mozliwe_oszczednosci": {
+            "czas_godziny_miesiecznie": float(scores["czas_godziny_miesiecznie"][0]),
+            "oszczednosci_pieniadze_miesiecznie": float(scores["oszczednosci_pieniadze_miesiecznie"][0])
+        }
+    }
+
+
+def prescore_rows(processes: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Wstępne oceny zapisanych procesów, kluczowane id (np. dla szkiców na dashboardzie)"""
+    scores = prescore_many(processes)["ocena_potencjalu"]
+    return {process["id"]: int(score) for process, score in zip(processes, scores)}
@@ -3,7 +3,8 @@ Moduł autentykacji dla SmartFlow.
 """
 import streamlit as st
 from typing import Optional, Dict, Any
-from database.supabase_client import init_supabase
+from database.repository import get_repository
+from database.supabase_client import set_session
 
 def show_auth_page():
     """Wyświetla stronę logowania/rejestracji"""
@@ -31,25 +32,20 @@ def show_login_form():
         if submitted:
             if email and password and email.strip() and password.strip():
                 try:
-                    # Logowanie przez Supabase Auth
-                    supabase = init_supabase()
-                    response = supabase.auth.sign_in_with_password({
-                        "email": email.strip(),
-                        "password": password.strip()
-                    })
+                    # Logowanie przez repozytorium (Supabase Auth albo lokalna baza SQLite)
+                    user, session = get_repository().authenticate(email.strip(), password.strip())
                     
-                    if response.user:
-                        # Ustawienie session state
-                        st.session_state.authenticated = True
-                        st.session_state.user_data = {
-                            "id": response.user.id,
-                            "email": response.user.email
-                        }
-                        st.success("Zalogowano pomyślnie!")
-                        st.rerun()
-                    else:
-                        st.error("Nieprawidłowe dane logowania")
+                    # Ustawienie session state
+                    st.session_state.authenticated = True
+                    st.session_state.user_data = user
+                    # Sesja użytkownika (tokeny) - zapytania do Supabase podlegają RLS
+                    st.session_state.auth_session = session
+                    set_session(session)
+                    st.success("Zalogowano pomyślnie!")
+                    st.rerun()
                         
+                except ValueError as e:
+                    st.error(str(e))
                 except Exception as e:
                     st.error(f"Błąd logowania: {str(e)}")
             else:
@@ -72,17 +68,11 @@ def show_registration_form():
                 st.error("Hasło musi mieć co najmniej 6 znaków")
             else:
                 try:
-                    # Rejestracja przez Supabase Auth
-                    supabase = init_supabase()
-                    response = supabase.auth.sign_up({
-                        "email": email,
-                        "password": password
-                    })
-                    
-                    if response.user:
-                        st.success("Konto utworzone pomyślnie! Sprawdź email aby potwierdzić rejestrację.")
-                    else:
-                        st.error("Błąd podczas tworzenia konta")
+                    # Rejestracja przez repozytorium (Supabase Auth albo lokalna baza SQLite)
+                    get_repository().create_user(email, password)
+                    st.success("Konto utworzone pomyślnie! Sprawdź email aby potwierdzić rejestrację.")
                         
+                except ValueError as e:
+                    st.error(str(e))
                 except Exception as e:
                     st.error(f"Błąd rejestracji: {str(e)}") 
\ No newline at end of file
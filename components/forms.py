@@ -4,8 +4,16 @@ Moduł formularzy dla SmartFlow.
 import streamlit as st
 import time
 from typing import Dict, Any, List
-from ai.openai_service import OpenAIService
-from database.supabase_client import update_process, get_user_processes, save_process
+from ai.resilience import is_degraded, strip_meta
+from ai.analysis_jobs import DONE, get_analysis_jobs
+from database.repository import get_repository
+from database.bulk_import import detect_format, import_processes
+from analytics.prescore import prescore
+from database.validation import (
+    DESCRIPTION_MAX_CHARS, DURATION_MAX_HOURS, DURATION_MIN_HOURS, FREQUENCY_OPTIONS,
+    IMPROVEMENT_GOAL_OPTIONS, PARTICIPANTS_OPTIONS, validate_process_fields
+)
+from components.visualizations import show_streaming_results
 
 def show_profile_form():
     """Formularz danych o firmie (jednorazowy)"""
@@ -41,7 +49,13 @@ def show_profile_form():
                 "budget_range": budget_range
             }
             
-            # TODO: Zapisz do Supabase
+            user_id = st.session_state.user_data["id"] if st.session_state.get("user_data") else None
+            if user_id:
+                try:
+                    get_repository().save_profile(user_id, profile_data)
+                except Exception as e:
+                    st.error(f"Błąd zapisu profilu: {str(e)}")
+                    return
             st.session_state.user_profile = profile_data
             st.success("Profil firmy zapisany!")
             st.rerun()
@@ -85,26 +99,26 @@ def show_process_form():
             
             frequency = st.selectbox(
                 "Jak często wykonywany",
-                ["codziennie", "raz w tygodniu", "raz w miesiącu"]
+                FREQUENCY_OPTIONS
             )
             
             participants = st.selectbox(
                 "Liczba uczestników",
-                ["1 osoba", "2-3 osoby", "4 lub więcej"]
+                PARTICIPANTS_OPTIONS
             )
         
         with col2:
             duration = st.number_input(
                 "Czas trwania (godziny)",
-                min_value=0.5,
-                max_value=40.0,
+                min_value=DURATION_MIN_HOURS,
+                max_value=DURATION_MAX_HOURS,
                 step=0.5,
                 value=2.0
             )
             
             improvement_goals = st.multiselect(
                 "Co chcesz poprawić?",
-                ["szybkość", "mniej błędów", "mniej nudnej pracy", "oszczędność pieniędzy"],
+                IMPROVEMENT_GOAL_OPTIONS,
                 default=["szybkość"]
             )
         
@@ -144,7 +158,7 @@ def show_process_form():
             label_visibility="collapsed",
             placeholder="Przykład opisu procesu:\n\n1. Otrzymuję zamówienie przez email\n2. Sprawdzam dostępność produktu w systemie Excel\n3. Tworzę fakturę ręcznie w programie\n4. Wysyłam fakturę do klienta mailem\n5. Archywizuję dokumenty w folderze\n\nUWAGA: Możesz wkleić tekst ze schowka używając Ctrl+V",
             height=220,
-            max_chars=3000,
+            max_chars=DESCRIPTION_MAX_CHARS,
             help="Pole obsługuje standardowe skróty klawiszowe: Ctrl+V (wklej), Ctrl+C (kopiuj), Ctrl+A (zaznacz wszystko)"
         )
         
@@ -170,16 +184,8 @@ def show_process_form():
             submitted = st.form_submit_button("Przeanalizuj proces", use_container_width=True, type="primary")
         
         if submitted:
-            # Walidacja pól z podświetlaniem na 5 sekund
-            validation_errors = {}
-            
-            if not process_name or process_name.strip() == "":
-                validation_errors["process_name"] = True
-                
-            if not description or description.strip() == "":
-                validation_errors["description"] = True
-            elif len(description.strip()) < 50:
-                validation_errors["description"] = True
+            # Walidacja pól z podświetlaniem na 5 sekund (reguły wspólne z importem z pliku)
+            validation_errors = {field: True for field in validate_process_fields(process_name, description)}
             
             if validation_errors:
                 # Ustaw błędy walidacji w session state
@@ -211,28 +217,22 @@ def show_process_form():
                 # Zapisz do session state
                 st.session_state.current_analysis = process_data
                 
-                # Wyświetl status analizy
-                with st.spinner("Analizuję proces..."):
+                user_id = st.session_state.user_data["id"] if st.session_state.user_data else None
+                if not user_id:
+                    st.warning("Brak użytkownika. Zaloguj się, aby zapisać i przeanalizować proces.")
+                else:
+                    # Zapis szkicu i analiza w tle - wyniki pojawiają się poniżej w miarę napływania
                     try:
-                        ai_service = OpenAIService()
-                        ai_results = ai_service.analyze_process(process_data)
-                        st.session_state.current_analysis["ai_analysis"] = ai_results
-                        st.session_state.current_analysis["potential_score"] = ai_results["ocena_potencjalu"]
-                        # Zapisz proces do bazy
-                        user_id = st.session_state.user_data["id"] if st.session_state.user_data else None
-                        if user_id:
-                            try:
-                                process_id = save_process(user_id, st.session_state.current_analysis)
-                                st.success("Proces został zapisany!")
-                                st.rerun()
-                            except Exception as e:
-                                st.error(f"Błąd zapisu procesu: {str(e)}")
-                        else:
-                            st.warning("Brak użytkownika. Proces nie został zapisany.")
+                        process_id = get_repository().create_draft_process(user_id, process_data)
+                        get_analysis_jobs().submit(process_id, process_data)
                     except Exception as e:
-                        st.error(f"Błąd podczas analizy: {str(e)}")
-                
-                st.rerun()
+                        st.error(f"Błąd zapisu procesu: {str(e)}")
+                    else:
+                        st.success("Proces został zapisany. Analiza AI trwa w tle - możesz przejść dalej, postęp zobaczysz na dashboardzie.")
+                        st.session_state.pending_analysis = {"process_id": process_id, "title": process_name, "process_data": process_data}
+
+    if st.session_state.get("pending_analysis"):
+        show_job_analysis(st.session_state.pending_analysis)
 
     # Auto-refresh aby usunąć błędy po 5 sekundach
     if st.session_state.validation_errors and st.session_state.validation_timestamp > 0:
@@ -242,17 +242,81 @@ def show_process_form():
             time.sleep(0.5)
             st.rerun()
 
+def show_job_analysis(pending: Dict[str, Any]):
+    """
+    Bieżący stan analizy w tle - częściowe pola zadania z kolejki, zanim trafią
+    do bazy. Przebieg skryptu nie czeka na zadanie: dopóki trwa, strona
+    odświeża się co sekundę (jak dashboard).
+    """
+    job = get_analysis_jobs().get(pending["process_id"])
+    partial = job.partial if job is not None else {}
+    with st.container():
+        ai_results = show_streaming_results(pending["title"], iter([partial] if partial else []),
+                                            provisional=prescore(pending["process_data"]))
+    if job is not None and job.active:
+        time.sleep(1)
+        st.rerun()
+    st.session_state.pending_analysis = None
+    if job is not None and job.status == DONE:
+        st.session_state.current_analysis["ai_analysis"] = strip_meta(ai_results)
+        st.session_state.current_analysis["potential_score"] = ai_results.get("ocena_potencjalu")
+    elif job is None or not ai_results or is_degraded(ai_results):
+        # Wynik zastępczy nie może być pokazany jako prawdziwa analiza
+        st.error("Usługa AI jest chwilowo niedostępna. Proces zostaje szkicem - analizę możesz ponowić na dashboardzie.")
+    else:
+        st.error(f"Błąd podczas analizy: {job.error}")
+
+def show_import_form():
+    """Import wielu procesów z pliku CSV/JSONL (zapis jako szkice, opcjonalnie z analizą AI)"""
+    with st.expander("Import wielu procesów z pliku (CSV / JSONL)"):
+        st.caption(
+            "Kolumny: name, description (min. 50 znaków), opcjonalnie frequency, participants, "
+            "duration, improvement_goals (w CSV rozdzielone średnikiem)."
+        )
+        uploaded = st.file_uploader("Plik z procesami", type=["csv", "jsonl", "ndjson"])
+        analyze = st.checkbox("Zleć analizy AI po imporcie", value=False)
+        if not uploaded or not st.button("Importuj procesy", use_container_width=True):
+            return
+        user_id = st.session_state.user_data["id"] if st.session_state.get("user_data") else None
+        if not user_id:
+            st.warning("Brak użytkownika. Zaloguj się, aby zaimportować procesy.")
+            return
+        try:
+            fmt = detect_format(uploaded.name)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        progress = st.empty()
+        report = import_processes(
+            user_id,
+            uploaded,
+            fmt,
+            company=st.session_state.get("user_profile", {}),
+            analyze=analyze,
+            on_progress=lambda r: progress.info(f"Zapisano {r.imported} z {r.rows} wierszy...")
+        )
+        progress.empty()
+        if report.file_error:
+            st.error(f"Import przerwany: {report.file_error}. Zapisano {report.imported} procesów.")
+        if report.imported:
+            queued = f", zlecono {report.queued} analiz AI" if report.queued else ""
+            st.success(f"Zaimportowano {report.imported} procesów{queued}.")
+        if report.errors:
+            st.warning(f"Pominięto {len(report.errors)} wierszy z błędami:")
+            st.dataframe(
+                [{"Linia": error.line, "Błąd": error.message} for error in report.errors[:500]],
+                use_container_width=True
+            )
+
 def edit_process_form():
     st.subheader("Edytuj proces")
-    supabase = st.session_state.get("supabase")
-    user_id = st.session_state.user_data["id"] if st.session_state.user_data else None
-    process_id = st.session_state.get("edit_process_id")
-    if not (supabase and user_id and process_id):
+    user_id = st.session_state.user_data["id"] if st.session_state.get("user_data") else None
+    process_id = st.session_state.get("edit_process_id") or (st.session_state.get("current_process") or {}).get("id")
+    if not (user_id and process_id):
         st.error("Brak danych do edycji procesu.")
         return
-    # Pobierz dane procesu
-    processes = get_user_processes(supabase, user_id)
-    process = next((p for p in processes if p["id"] == process_id), None)
+    # Pobierz pełne dane procesu (lista dashboardu ma tylko kolumny skrócone)
+    process = get_repository().get_process(user_id, process_id)
     if not process:
         st.error("Nie znaleziono procesu do edycji.")
         return
@@ -271,7 +335,7 @@ def edit_process_form():
             # Aktualizuj cele usprawnienia
             updated_data["form_data"]["improvement_goals"] = [g.strip() for g in new_goals.split(",") if g.strip()]
             try:
-                update_process(process_id, updated_data)
+                get_repository().update_process(user_id, process_id, updated_data)
                 st.success("Proces został zaktualizowany.")
                 st.session_state.page = "dashboard"
                 st.rerun()
@@ -1,12 +1,24 @@
 """
 Moduł wizualizacji dla SmartFlow.
 """
+import math
+import time
+import dataclasses
 import streamlit as st
 import pandas as pd
-from typing import List, Dict, Any
-import database.supabase_client as supabase_client
+from typing import List, Dict, Any, Iterator, Optional
+from ai.analysis_jobs import AnalysisJob, FAILED, get_analysis_jobs
+from ai.resilience import is_degraded
+from analytics.portfolio import numeric_value, portfolio_summary, totals_from_stats
+from analytics.prescore import prescore_rows
+from database.page_loader import PageData, get_page_loader
+from database.repository import get_repository
+from database.sync import load_more, load_snapshot, sync_snapshot
 import json
 
+# Liczba procesów na stronę dashboardu
+DASHBOARD_PAGE_SIZE = 20
+
 def show_dashboard():
     """Dashboard z listą procesów użytkownika"""
     st.subheader("Twoje procesy")
@@ -21,11 +33,166 @@ def show_dashboard():
     if not user or not user.get("id"):
         st.warning("Brak informacji o użytkowniku. Zaloguj się ponownie.")
         return
-    processes = supabase_client.get_user_processes(user["id"])
+    query = st.text_input("Szukaj procesów", placeholder="np. faktury, Zapier, \"obsługa klienta\"", key="process_search").strip()
+    if query:
+        show_search_results(user["id"], query)
+        return
+    data = load_dashboard_data(user["id"])
+    if not data.ready("processes"):
+        st.warning("Nie udało się wczytać listy procesów. Odśwież stronę za chwilę.")
+        return
+    processes, has_more = data.get("processes")
+    if "processes" in data.timed_out or "processes" in data.errors:
+        st.caption("Lista z poprzedniego odświeżenia - synchronizacja zmian nie powiodła się na czas.")
     if not processes:
         show_empty_dashboard()
     else:
-        show_processes_list(processes)
+        show_portfolio_summary(processes, data.get("stats"))
+        show_processes_list(processes, data.get("jobs"))
+        if has_more and st.button("Załaduj więcej", use_container_width=True):
+            load_more_processes(user["id"])
+            st.rerun()
+        # Odświeżaj, dopóki trwają analizy w tle
+        if any(job.active for job in data.get("jobs", {}).values()):
+            time.sleep(1)
+            st.rerun()
+
+def show_search_results(user_id: str, query: str):
+    """
+    Wyniki wyszukiwania pełnotekstowego - ranking i stronicowanie w bazie.
+    Pobrane strony zostają w sesji, a "Więcej wyników" dociąga tylko kolejną
+    stronę (offset = liczba już wczytanych wyników).
+    """
+    state = st.session_state.get("search_results")
+    if not state or state["query"] != query or state["user_id"] != user_id:
+        try:
+            results, has_more = get_repository().search_processes(user_id, query, DASHBOARD_PAGE_SIZE)
+        except Exception as e:
+            st.error(f"Błąd wyszukiwania: {str(e)}")
+            return
+        state = st.session_state.search_results = {"user_id": user_id, "query": query, "rows": results, "has_more": has_more}
+    if not state["rows"]:
+        st.info(f"Brak procesów pasujących do: {query}")
+        return
+    st.caption(f"Wyniki wyszukiwania dla: {query}")
+    show_processes_list(state["rows"])
+    if state["has_more"] and st.button("Więcej wyników", use_container_width=True):
+        try:
+            results, has_more = get_repository().search_processes(
+                user_id, query, DASHBOARD_PAGE_SIZE, offset=len(state["rows"])
+            )
+        except Exception as e:
+            st.error(f"Błąd wyszukiwania: {str(e)}")
+            return
+        state["rows"].extend(results)
+        state["has_more"] = has_more
+        st.rerun()
+
+def load_dashboard_data(user_id: str) -> PageData:
+    """
+    Dane dashboardu wczytywane równolegle (get_page_loader): lista procesów,
+    statystyki i - raz na sesję - profil firmy. Źródło, które nie zdąży przed
+    terminem strony, jest pomijane: lista zostaje z poprzedniego przebiegu,
+    a podsumowanie liczone jest z wczytanych procesów. Zadania analiz w tle
+    (jobs) to odczyt z pamięci dla szkiców z wczytanej listy, więc dołączane
+    są po wczytaniu źródeł, a nie w puli.
+    """
+    snapshot = st.session_state.get("process_snapshot")
+    repository = get_repository()
+
+    def processes():
+        # Wątek puli pracuje na kopii - przerwany przez termin nie zmienia kopii w sesji
+        if snapshot is None or snapshot.user_id != user_id:
+            return load_snapshot(user_id, DASHBOARD_PAGE_SIZE, repository)
+        updated = dataclasses.replace(snapshot, rows=dict(snapshot.rows))
+        sync_snapshot(updated, repository=repository)
+        return updated
+
+    sources = {"processes": processes, "stats": lambda: repository.process_stats(user_id)}
+    if "user_profile" not in st.session_state:
+        sources["profile"] = lambda: repository.get_profile(user_id)
+    data = get_page_loader().load(sources)
+
+    if data.ready("processes"):
+        snapshot = st.session_state.process_snapshot = data.get("processes")
+    if snapshot is not None and snapshot.user_id == user_id:
+        processes = snapshot.processes()
+        data.values["processes"] = (processes, snapshot.cursor is not None)
+        data.values["jobs"] = get_analysis_jobs().jobs_for(p["id"] for p in processes if p.get("status") == "draft")
+    else:
+        data.values.pop("processes", None)
+    profile = data.get("profile")
+    if profile:
+        st.session_state.user_profile = {
+            key: profile[key] for key in ("company_size", "industry", "budget_range") if key in profile
+        }
+    return data
+
+def load_more_processes(user_id: str):
+    """Doładowuje kolejną stronę procesów (kursor z poprzedniej strony)"""
+    snapshot = st.session_state.get("process_snapshot")
+    if snapshot is not None and snapshot.user_id == user_id:
+        load_more(snapshot, DASHBOARD_PAGE_SIZE)
+
+def forget_loaded_process(process_id: str):
+    """Usuwa proces z lokalnej kopii i pobranych szczegółów (np. po usunięciu)"""
+    snapshot = st.session_state.get("process_snapshot")
+    if snapshot is not None:
+        snapshot.rows.pop(process_id, None)
+    search = st.session_state.get("search_results")
+    if search:
+        search["rows"] = [row for row in search["rows"] if row.get("id") != process_id]
+    details = st.session_state.get("process_details")
+    if details:
+        for key in [key for key in details if key[0] == process_id]:
+            del details[key]
+
+def load_process_details(process: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Pełny wiersz procesu dla wiersza listy - pobierany na żądanie (get_process)
+    i zapamiętywany w sesji do czasu zmiany statusu lub oceny procesu.
+    """
+    if not process.get("summary"):
+        return process
+    details = st.session_state.setdefault("process_details", {})
+    key = (process["id"], process.get("status"), process.get("potential_score"))
+    if key not in details:
+        details[key] = get_repository().get_process(st.session_state.user_data["id"], process["id"])
+    return details[key]
+
+def show_portfolio_summary(processes: List[Dict[str, Any]], stats: Optional[Dict[str, Any]] = None):
+    """
+    Sumy oszczędności, kosztów i zwrotu dla wszystkich przeanalizowanych procesów
+    (agregacja w bazie; bez statystyk z bazy - z procesów wczytanych na dashboard)
+    """
+    totals = totals_from_stats(stats) if stats else portfolio_summary(processes)
+    if not totals["analyzed"]:
+        return
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric(
+            "Oszczędność czasu",
+            f"{totals['hours_saved_monthly']:,.0f}h/miesiąc",
+            delta=f"z {totals['monthly_hours']:,.0f}h pracy",
+            delta_color="off"
+        )
+    with col2:
+        st.metric(
+            "Oszczędność netto",
+            f"{totals['net_monthly'] * 12:,.0f} zł/rok",
+            delta=f"narzędzia: {totals['tool_cost_monthly']:,.0f} zł/miesiąc",
+            delta_color="off"
+        )
+    with col3:
+        payback = totals["payback_months"]
+        st.metric("Okres zwrotu", f"{payback:.1f} mies." if payback != float("inf") else "brak zwrotu")
+    with col4:
+        roi = totals["annual_roi"]
+        st.metric("Roczny ROI", f"{roi:.0%}" if roi == roi else "–")
+    scores = ""
+    if stats and stats.get("avg_score") is not None:
+        scores = f" · średnia ocena {float(stats['avg_score']):.1f}/10 (najwyższa {stats['max_score']}/10)"
+    st.caption(f"Portfel: {totals['analyzed']} z {totals['processes']} procesów przeanalizowanych przez AI{scores}")
 
 def show_empty_dashboard():
     """Dashboard gdy brak procesów"""
@@ -43,7 +210,7 @@ def show_empty_dashboard():
             st.session_state.page = "new_process"
             st.rerun()
 
-def show_processes_list(processes: List[Dict[str, Any]]):
+def show_processes_list(processes: List[Dict[str, Any]], jobs: Optional[Dict[str, AnalysisJob]] = None):
     """Lista procesów w formie tabeli z akcjami CRUD"""
     st.markdown("---")
     if not processes or len(processes) == 0:
@@ -53,34 +220,20 @@ def show_processes_list(processes: List[Dict[str, Any]]):
     # Konwersja do DataFrame
     df = pd.DataFrame(processes)
 
-    # Dodaj skrócony opis do 500 znaków, nie tnąc wyrazów
-    def short_desc(desc):
-        if not desc:
-            return ""
-        if len(desc) <= 500:
-            return desc
-        cut = desc[:500].rsplit(' ', 1)[0]
-        return cut + "…"
-    df['OpisShort'] = df['description'].apply(short_desc)
-    df['OpisLong'] = df['description']
-
-    # Dodaj skróconą analizę AI (jako tekst JSON)
-    def ai_short(ai):
+    # Lista zawiera tylko skrócony opis (description_preview) i skrót analizy;
+    # pełne kolumny pobierane są dopiero po rozwinięciu "Pokaż więcej"
+    def ai_brief(ai):
         if not ai:
             return ""
-        # Jeśli to string, spróbuj sparsować
-        if isinstance(ai, str):
-            try:
-                ai_obj = json.loads(ai)
-            except Exception:
-                return ai[:500] + ("…" if len(ai) > 500 else "")
-        else:
-            ai_obj = ai
-        text = json.dumps(ai_obj, ensure_ascii=False, indent=2)
-        if len(text) <= 500:
-            return text
-        cut = text[:500].rsplit(' ', 1)[0]
-        return cut + "…"
+        savings = ai.get('mozliwe_oszczednosci') or {}
+        # Kwoty od AI bywają tekstem ("1 200 zł") albo null - "—", gdy nie da się ich odczytać
+        hours = numeric_value(savings.get('czas_godziny_miesiecznie'))
+        money = numeric_value(savings.get('oszczednosci_pieniadze_miesiecznie'))
+        return (
+            f"Oszczędność: {'—' if math.isnan(hours) else f'{hours:g}'}h/miesiąc, "
+            f"{'—' if math.isnan(money) else f'{money:,.0f}'} zł/miesiąc\n"
+            f"Rekomendacje: {len(ai.get('rekomendacje') or [])}"
+        )
     def ai_long(ai):
         if not ai:
             return ""
@@ -92,13 +245,23 @@ def show_processes_list(processes: List[Dict[str, Any]]):
         else:
             ai_obj = ai
         return json.dumps(ai_obj, ensure_ascii=False, indent=2)
-    df['AIShort'] = df['ai_analysis'].apply(ai_short)
-    df['AILong'] = df['ai_analysis'].apply(ai_long)
+    df['OpisShort'] = df['description_preview'].fillna("")
+    df['AIShort'] = df['ai_analysis'].apply(ai_brief)
     
     # Formatowanie kolumn
-    df['Ocena'] = df['potential_score'].apply(lambda x: f"{x}/10")
+    df['Ocena'] = df['potential_score'].apply(lambda x: f"{int(x)}/10" if pd.notna(x) else "–")
+    # Szkice bez analizy AI: wstępna ocena lokalna, oznaczona "~"
+    drafts = [p for p in processes if p.get("potential_score") is None]
+    if drafts:
+        provisional = prescore_rows(drafts)
+        df['Ocena'] = [
+            f"~{provisional[pid]}/10" if pid in provisional else score
+            for pid, score in zip(df['id'], df['Ocena'])
+        ]
     df['Data'] = pd.to_datetime(df['created_at']).dt.strftime('%d.%m.%Y')
     df['Status'] = df['status'].apply(lambda x: "Przeanalizowany" if x == "analyzed" else "Oczekuje")
+    if jobs is None:
+        jobs = get_analysis_jobs().jobs_for(df.loc[df['status'] == "draft", 'id'])
     
     # Nagłówki w kolumnach (dodano 'Analiza AI')
     header_cols = st.columns([2, 3, 3, 1, 1, 1, 2])
@@ -123,38 +286,61 @@ def show_processes_list(processes: List[Dict[str, Any]]):
         with cols[0]:
             st.markdown(f"<div style='text-align: left;'>{row['title']}</div>", unsafe_allow_html=True)
         with cols[1]:
-            if row['OpisLong'] and len(row['OpisLong']) > 500:
-                st.markdown(f"<div style='text-align: left;'>{row['OpisShort']}</div>", unsafe_allow_html=True)
-                with st.expander("Pokaż więcej", expanded=False):
-                    st.markdown(f"<div style='text-align: left;'>{row['OpisLong']}</div>", unsafe_allow_html=True)
-            else:
-                st.markdown(f"<div style='text-align: left;'>{row['OpisLong']}</div>", unsafe_allow_html=True)
+            st.markdown(f"<div style='text-align: left;'>{row['OpisShort']}</div>", unsafe_allow_html=True)
+            if row['OpisShort'].endswith("…") and st.toggle("Pokaż więcej", key=f"more_desc_{row['id']}"):
+                details = load_process_details(processes[idx]) or {}
+                st.markdown(f"<div style='text-align: left;'>{details.get('description', '')}</div>", unsafe_allow_html=True)
         with cols[2]:
-            if row['AILong'] and len(row['AILong']) > 500:
-                st.markdown(f"<div style='text-align: left; white-space: pre-wrap;'>{row['AIShort']}</div>", unsafe_allow_html=True)
-                with st.expander("Pokaż więcej", expanded=False):
-                    st.markdown(f"<div style='text-align: left; white-space: pre-wrap;'>{row['AILong']}</div>", unsafe_allow_html=True)
-            else:
-                st.markdown(f"<div style='text-align: left; white-space: pre-wrap;'>{row['AILong']}</div>", unsafe_allow_html=True)
+            st.markdown(f"<div style='text-align: left; white-space: pre-wrap;'>{row['AIShort']}</div>", unsafe_allow_html=True)
+            if row['AIShort'] and st.toggle("Pokaż więcej", key=f"more_ai_{row['id']}"):
+                details = load_process_details(processes[idx]) or {}
+                st.markdown(f"<div style='text-align: left; white-space: pre-wrap;'>{ai_long(details.get('ai_analysis'))}</div>", unsafe_allow_html=True)
         with cols[3]:
             st.markdown(f"<div style='text-align: center;'>{row['Ocena']}</div>", unsafe_allow_html=True)
         with cols[4]:
             st.markdown(f"<div style='text-align: center;'>{row['Data']}</div>", unsafe_allow_html=True)
         with cols[5]:
-            st.markdown(f"<div style='text-align: center;'>{row['Status']}</div>", unsafe_allow_html=True)
+            if row['status'] == "draft":
+                show_analysis_progress(processes[idx], jobs.get(row['id']))
+            else:
+                st.markdown(f"<div style='text-align: center;'>{row['Status']}</div>", unsafe_allow_html=True)
         with cols[6]:
             colA, colB = st.columns(2)
             with colA:
                 if st.button(f"Edytuj", key=f"edit_{row['id']}"):
-                    st.session_state.current_process = processes[idx]
+                    st.session_state.current_process = load_process_details(processes[idx])
                     st.session_state.page = "edit_process"
                     st.rerun()
             with colB:
                 if st.button(f"Usuń", key=f"delete_{row['id']}"):
-                    supabase_client.soft_delete_process(row['id'])
+                    get_repository().soft_delete_process(st.session_state.user_data["id"], row['id'])
+                    forget_loaded_process(row['id'])
                     st.success(f"Proces '{row['title']}' został usunięty.")
                     st.rerun()
 
+def show_analysis_progress(process: Dict[str, Any], job: Optional[AnalysisJob]):
+    """Status szkicu: postęp analizy w tle, błąd z możliwością ponowienia lub przycisk analizy"""
+    if job is not None and job.active:
+        st.progress(job.progress, text=f"Analiza {int(job.progress * 100)}%")
+        return
+    if job is not None and job.status == FAILED:
+        st.markdown("<div style='text-align: center; color: red;'>Błąd analizy</div>", unsafe_allow_html=True)
+        label = "Ponów"
+    else:
+        st.markdown("<div style='text-align: center;'>Oczekuje</div>", unsafe_allow_html=True)
+        label = "Analizuj"
+    if st.button(label, key=f"analyze_{process['id']}"):
+        process = load_process_details(process)
+        if process is None:
+            st.error("Nie znaleziono procesu.")
+            return
+        get_analysis_jobs().submit(process['id'], {
+            "title": process.get("title"),
+            "description": process.get("description"),
+            "form_data": process.get("form_data") or {}
+        })
+        st.rerun()
+
 def show_results():
     """Wyświetla wyniki analizy AI"""
     if not st.session_state.current_analysis:
@@ -189,35 +375,117 @@ def show_results():
     # Plan wdrożenia  
     show_implementation_plan(ai_results)
 
-def show_key_metrics(ai_results: Dict[str, Any]):
-    """Wyświetla kluczowe metryki analizy"""
+def show_streaming_results(
+    title: str,
+    partial_results: Iterator[Dict[str, Any]],
+    provisional: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Wyświetla wyniki analizy na bieżąco, w miarę napływania kolejnych pól
+    odpowiedzi AI. Do czasu ich nadejścia metryki pokazują wstępną ocenę
+    (provisional). Zwraca ostatni (pełny) wynik.
+    """
+    st.subheader(f"Analiza: {title}")
+    st.markdown("---")
+    metrics_slot = st.empty()
+    recommendations_slot = st.empty()
+    plan_slot = st.empty()
+    
+    ai_results: Dict[str, Any] = {}
+    rendered: Dict[str, Any] = {}
+    if provisional:
+        with metrics_slot.container():
+            show_key_metrics({}, partial=True, provisional=provisional)
+    for ai_results in partial_results:
+        metric_fields = (ai_results.get('ocena_potencjalu'), ai_results.get('mozliwe_oszczednosci'))
+        if rendered.get('metrics') != metric_fields:
+            rendered['metrics'] = metric_fields
+            with metrics_slot.container():
+                show_key_metrics(ai_results, partial=True, provisional=provisional)
+        recommendations = ai_results.get('rekomendacje')
+        if recommendations and rendered.get('rekomendacje') != recommendations:
+            rendered['rekomendacje'] = recommendations
+            with recommendations_slot.container():
+                show_recommendations(ai_results)
+        plan_fields = (ai_results.get('plan_wdrozenia'), ai_results.get('uwagi'))
+        if ai_results.get('plan_wdrozenia') and rendered.get('plan') != plan_fields:
+            rendered['plan'] = plan_fields
+            with plan_slot.container():
+                show_implementation_plan(ai_results)
+    
+    if is_degraded(ai_results):
+        # Wynik zastępczy (usługa AI niedostępna) - nie pokazujemy go jako analizy
+        if provisional:
+            with metrics_slot.container():
+                show_key_metrics({}, partial=True, provisional=provisional)
+        else:
+            metrics_slot.empty()
+        recommendations_slot.empty()
+        plan_slot.empty()
+        return ai_results
+    
+    # Ostatni wynik jest pełny - odśwież wszystkie sekcje jego zawartością
+    with metrics_slot.container():
+        show_key_metrics(ai_results)
+    with recommendations_slot.container():
+        show_recommendations(ai_results)
+    with plan_slot.container():
+        show_implementation_plan(ai_results)
+    return ai_results
+
+def show_key_metrics(
+    ai_results: Dict[str, Any],
+    partial: bool = False,
+    provisional: Optional[Dict[str, Any]] = None
+):
+    """
+    Wyświetla kluczowe metryki analizy (partial=True: brakujące pola jako
+    oczekujące albo - jeśli podano provisional - jako wstępna ocena lokalna)
+    """
     st.subheader("Podsumowanie analizy")
     
     col1, col2, col3 = st.columns(3)
+    savings_pending = partial and 'mozliwe_oszczednosci' not in ai_results
+    estimate = (provisional or {}).get('mozliwe_oszczednosci', {})
     
     with col1:
-        score = ai_results.get('ocena_potencjalu', 0)
-        st.metric(
-            "Ocena potencjału",
-            f"{score}/10",
-            delta=f"{'Wysoki' if score >= 7 else 'Średni' if score >= 4 else 'Niski'} potencjał"
-        )
+        if partial and 'ocena_potencjalu' not in ai_results and provisional:
+            st.metric("Ocena potencjału", f"~{provisional['ocena_potencjalu']}/10", delta="wstępna ocena", delta_color="off")
+        elif partial and 'ocena_potencjalu' not in ai_results:
+            st.metric("Ocena potencjału", "…")
+        else:
+            score = ai_results.get('ocena_potencjalu', 0)
+            st.metric(
+                "Ocena potencjału",
+                f"{score}/10",
+                delta=f"{'Wysoki' if score >= 7 else 'Średni' if score >= 4 else 'Niski'} potencjał"
+            )
     
     with col2:
-        time_savings = ai_results.get('mozliwe_oszczednosci', {}).get('czas_godziny_miesiecznie', 0)
-        st.metric(
-            "Oszczędność czasu",
-            f"{time_savings}h/miesiąc",
-            delta=f"{time_savings * 12}h/rok"
-        )
+        if savings_pending and estimate:
+            st.metric("Oszczędność czasu", f"~{estimate['czas_godziny_miesiecznie']:.0f}h/miesiąc", delta="szacunek", delta_color="off")
+        elif savings_pending:
+            st.metric("Oszczędność czasu", "…")
+        else:
+            time_savings = ai_results.get('mozliwe_oszczednosci', {}).get('czas_godziny_miesiecznie', 0)
+            st.metric(
+                "Oszczędność czasu",
+                f"{time_savings}h/miesiąc",
+                delta=f"{time_savings * 12}h/rok"
+            )
     
     with col3:
-        cost_savings = ai_results.get('mozliwe_oszczednosci', {}).get('oszczednosci_pieniadze_miesiecznie', 0)
-        st.metric(
-            "Oszczędność kosztów",
-            f"{cost_savings:,.0f} zł/miesiąc",
-            delta=f"{cost_savings * 12:,.0f} zł/rok"
-        )
+        if savings_pending and estimate:
+            st.metric("Oszczędność kosztów", f"~{estimate['oszczednosci_pieniadze_miesiecznie']:,.0f} zł/miesiąc", delta="szacunek", delta_color="off")
+        elif savings_pending:
+            st.metric("Oszczędność kosztów", "…")
+        else:
+            cost_savings = ai_results.get('mozliwe_oszczednosci', {}).get('oszczednosci_pieniadze_miesiecznie', 0)
+            st.metric(
+                "Oszczędność kosztów",
+                f"{cost_savings:,.0f} zł/miesiąc",
+                delta=f"{cost_savings * 12:,.0f} zł/rok"
+            )
 
 def show_recommendations(ai_results: Dict[str, Any]):
     """Wyświetla rekomendacje narzędzi"""
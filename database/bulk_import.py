@@ -0,0 +1,226 @@
+"""
+Moduł importu wielu procesów z pliku CSV/JSONL dla SmartFlow.
+
+Plik jest czytany strumieniowo, wiersz po wierszu; poprawne wiersze trafiają
+do bazy paczkami (jeden INSERT wielu wierszy na paczkę), błędne są pomijane
+i raportowane z numerem linii. Opcjonalnie po zapisie paczki zlecane są
+analizy AI w kolejce ai.analysis_jobs.
+"""
+import io
+import os
+import csv
+import json
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional, Tuple
+
+from database.repository import Repository, get_repository
+from database.validation import (
+    FREQUENCY_OPTIONS, PARTICIPANTS_OPTIONS, validate_process_fields, validate_process_options
+)
+
+# Wartości domyślne pól opcjonalnych - jak w formularzu
+DEFAULT_FREQUENCY = FREQUENCY_OPTIONS[0]
+DEFAULT_PARTICIPANTS = PARTICIPANTS_OPTIONS[0]
+DEFAULT_DURATION = 2.0
+DEFAULT_GOALS = ["szybkość"]
+
+# Nazwy kolumn akceptowane zamiennie
+COLUMN_ALIASES = {
+    "name": ("name", "title", "nazwa"),
+    "description": ("description", "opis"),
+    "frequency": ("frequency", "czestotliwosc"),
+    "participants": ("participants", "uczestnicy"),
+    "duration": ("duration", "czas"),
+    "improvement_goals": ("improvement_goals", "cele")
+}
+
+
+@dataclass
+class RowError:
+    """Błąd jednego wiersza pliku"""
+    line: int
+    message: str
+
+
+@dataclass
+class ImportReport:
+    """Wynik importu: id zapisanych procesów, błędy wierszy, liczba zleconych analiz"""
+    rows: int = 0
+    process_ids: List[str] = field(default_factory=list)
+    errors: List[RowError] = field(default_factory=list)
+    queued: int = 0
+    # Błąd całego pliku (kodowanie, składnia CSV) - import przerwany po zapisaniu process_ids
+    file_error: Optional[str] = None
+
+    @property
+    def imported(self) -> int:
+        return len(self.process_ids)
+
+
+def detect_format(filename: str) -> str:
+    """Format pliku po rozszerzeniu: csv albo jsonl"""
+    extension = filename.lower().rsplit(".", 1)[-1]
+    if extension == "csv":
+        return "csv"
+    if extension in ("jsonl", "ndjson"):
+        return "jsonl"
+    raise ValueError(f"Nieobsługiwany format pliku: {filename} (dozwolone: .csv, .jsonl)")
+
+
+def _text_stream(stream: IO) -> IO[str]:
+    # Pliki z st.file_uploader są binarne - dekodowanie odbywa się w locie
+    if isinstance(stream.read(0), bytes):
+        return io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    return stream
+
+
+def iter_records(stream: IO, fmt: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Kolejne rekordy pliku jako (numer linii, rekord, błąd parsowania)"""
+    text = _text_stream(stream)
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Niepoprawny JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "Wiersz JSONL musi być obiektem"
+            continue
+        yield line_number, record, None
+
+
+def _field(record: Dict[str, Any], name: str) -> Any:
+    for alias in COLUMN_ALIASES[name]:
+        value = record.get(alias)
+        if value not in (None, ""):
+            return value.strip() if isinstance(value, str) else value
+    return None
+
+
+def _duration(value: Any) -> Any:
+    if value is None:
+        return DEFAULT_DURATION
+    if isinstance(value, str):
+        try:
+            return float(value.replace(",", "."))
+        except ValueError:
+            return value
+    return value
+
+
+def _goals(value: Any) -> List[Any]:
+    if value is None:
+        return list(DEFAULT_GOALS)
+    if isinstance(value, str):
+        # W CSV cele rozdzielone średnikiem (przecinek bywa separatorem kolumn)
+        return [goal.strip() for goal in value.split(";") if goal.strip()]
+    return value if isinstance(value, list) else [value]
+
+
+def build_process(record: Dict[str, Any], company: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Dane procesu w kształcie z formularza oraz błędy walidacji ({} = poprawny)"""
+    name = _field(record, "name")
+    description = _field(record, "description")
+    frequency = _field(record, "frequency") or DEFAULT_FREQUENCY
+    participants = _field(record, "participants") or DEFAULT_PARTICIPANTS
+    duration = _duration(_field(record, "duration"))
+    goals = _goals(_field(record, "improvement_goals"))
+
+    errors = validate_process_fields(name, description)
+    errors.update(validate_process_options(frequency, participants, duration, goals))
+    process_data = {
+        "title": name,
+        "description": description,
+        "form_data": {
+            "company": company or {},
+            "process": {
+                "name": name,
+                "frequency": frequency,
+                "participants": participants,
+                "duration": duration,
+                "description": description
+            },
+            "improvement_goals": goals
+        }
+    }
+    return process_data, errors
+
+
+def _flush(
+    user_id: str,
+    chunk: List[Tuple[int, Dict[str, Any]]],
+    report: ImportReport,
+    analyze: bool,
+    jobs: Any,
+    repository: Repository
+) -> None:
+    try:
+        process_ids = repository.create_draft_processes(user_id, [process for _, process in chunk])
+    except Exception as e:
+        report.errors.extend(RowError(line, f"Błąd zapisu: {e}") for line, _ in chunk)
+        return
+    report.process_ids.extend(process_ids)
+    if analyze:
+        for process_id, (_, process) in zip(process_ids, chunk):
+            jobs.submit(process_id, process)
+            report.queued += 1
+
+
+def import_processes(
+    user_id: str,
+    stream: IO,
+    fmt: str,
+    company: Optional[Dict[str, Any]] = None,
+    chunk_size: Optional[int] = None,
+    analyze: bool = False,
+    on_progress: Optional[Callable[[ImportReport], None]] = None,
+    jobs: Any = None,
+    repository: Optional[Repository] = None
+) -> ImportReport:
+    """
+    Importuje procesy z pliku CSV/JSONL jako szkice. W pamięci jest naraz tylko
+    jedna paczka wierszy (chunk_size, domyślnie SMARTFLOW_IMPORT_CHUNK_SIZE);
+    analyze=True zleca analizę AI każdego zapisanego procesu.
+    """
+    chunk_size = chunk_size or int(os.getenv("SMARTFLOW_IMPORT_CHUNK_SIZE", 100))
+    repository = repository or get_repository()
+    if analyze and jobs is None:
+        from ai.analysis_jobs import get_analysis_jobs
+        jobs = get_analysis_jobs()
+
+    report = ImportReport()
+    chunk: List[Tuple[int, Dict[str, Any]]] = []
+    line = 0
+    try:
+        for line, record, parse_error in iter_records(stream, fmt):
+            report.rows += 1
+            if parse_error:
+                report.errors.append(RowError(line, parse_error))
+                continue
+            process_data, errors = build_process(record, company)
+            if errors:
+                report.errors.append(RowError(line, "; ".join(errors.values())))
+                continue
+            chunk.append((line, process_data))
+            if len(chunk) >= chunk_size:
+                _flush(user_id, chunk, report, analyze, jobs, repository)
+                chunk = []
+                if on_progress:
+                    on_progress(report)
+    except UnicodeDecodeError:
+        report.file_error = f"Plik nie jest zapisany w kodowaniu UTF-8 (błąd po linii {line})"
+    except csv.Error as e:
+        report.file_error = f"Niepoprawny plik CSV po linii {line}: {e}"
+    # Wiersze odczytane przed błędem pliku też są zapisywane
+    if chunk:
+        _flush(user_id, chunk, report, analyze, jobs, repository)
+    if on_progress:
+        on_progress(report)
+    return report
@@ -0,0 +1,94 @@
+"""
+Moduł równoległego wczytywania danych strony dla SmartFlow.
+
+Strona (np. dashboard) potrzebuje kilku niezależnych zapytań - profilu, listy
+procesów, statystyk. PageLoader wykonuje je naraz we wspólnej puli wątków,
+więc czas strony to czas najwolniejszego zapytania, a nie suma wszystkich.
+Po upływie terminu strony (SMARTFLOW_PAGE_DEADLINE_SECONDS) zwraca to, co
+zdążyło się wczytać; brakujące źródła strona pokazuje w wersji zastępczej.
+"""
+import os
+import time
+import logging
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PageData:
+    """Wyniki źródeł strony: wartości, błędy i źródła, które nie zdążyły przed terminem"""
+    values: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    timed_out: List[str] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.values.get(name, default)
+
+    def ready(self, name: str) -> bool:
+        """Czy źródło zwróciło wartość (bez błędu i przed terminem)"""
+        return name in self.values
+
+    @property
+    def complete(self) -> bool:
+        return not self.errors and not self.timed_out
+
+
+class PageLoader:
+    """Pula wątków wykonująca zapytania strony równolegle, z terminem dla całej strony"""
+
+    def __init__(self, max_workers: Optional[int] = None, deadline: Optional[float] = None):
+        self.max_workers = max_workers or int(os.getenv("SMARTFLOW_PAGE_LOADER_WORKERS", 8))
+        self.deadline = deadline if deadline is not None else float(os.getenv("SMARTFLOW_PAGE_DEADLINE_SECONDS", 5))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="smartflow-page")
+
+    def load(self, sources: Dict[str, Callable[[], Any]], deadline: Optional[float] = None) -> PageData:
+        """
+        Wykonuje źródła równolegle i czeka najwyżej deadline sekund. Źródło, które
+        nie zdążyło, kończy się w tle, a jego wynik jest pomijany.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        started = time.monotonic()
+        # Każde źródło dostaje własną kopię kontekstu (m.in. token użytkownika dla RLS)
+        futures = {
+            self._executor.submit(contextvars.copy_context().run, source): name
+            for name, source in sources.items()
+        }
+        done, pending = wait(futures, timeout=deadline)
+
+        data = PageData()
+        for future in done:
+            name = futures[future]
+            try:
+                data.values[name] = future.result()
+            except Exception as e:
+                logger.warning("Błąd wczytywania danych strony (%s): %s", name, e)
+                data.errors[name] = str(e)
+        for future in pending:
+            future.cancel()
+            data.timed_out.append(futures[future])
+        if data.timed_out:
+            logger.warning("Przekroczono termin strony (%.1fs): %s", deadline, ", ".join(sorted(data.timed_out)))
+        data.elapsed = time.monotonic() - started
+        return data
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_loader: Optional[PageLoader] = None
+_loader_lock = threading.Lock()
+
+
+def get_page_loader() -> PageLoader:
+    """Zwraca pulę wczytywania stron współdzieloną przez wszystkie sesje"""
+    global _loader
+    with _loader_lock:
+        if _loader is None:
+            _loader = PageLoader()
+    return _loader
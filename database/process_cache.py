@@ -0,0 +1,144 @@
+"""
+Moduł pamięci podręcznej procesów dla SmartFlow.
+
+Strony listy procesów, pojedyncze procesy i statystyki dashboardu są
+zapamiętywane per użytkownik (zakres = sesja użytkownika, czyli to, co użytkownik
+widzi przez RLS) i zwracane bez zapytania do bazy przy kolejnych przebiegach
+skryptu Streamlit. Zapisy
+w database.supabase_client unieważniają dokładnie te wpisy, których dotyczą;
+TTL jest tylko zabezpieczeniem przed zmianami z innych procesów.
+"""
+import os
+import copy
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Page = Tuple[List[Dict[str, Any]], Optional[Tuple[str, str]]]
+
+
+class ProcessCache:
+    """Pamięć read-through dla stron listy i pojedynczych procesów"""
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else float(os.getenv("SMARTFLOW_PROCESS_CACHE_TTL", 30))
+        self.max_entries = max_entries or int(os.getenv("SMARTFLOW_PROCESS_CACHE_SIZE", 1024))
+        self._lock = threading.Lock()
+        # (zakres, user_id, limit, kursor) -> (wygasa, wiersze, następny kursor)
+        self._pages: "OrderedDict[Tuple, Tuple[float, List[Dict[str, Any]], Optional[Tuple[str, str]]]]" = OrderedDict()
+        # (zakres, process_id) -> (wygasa, wiersz)
+        self._processes: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # zakres -> (wygasa, statystyki); zakres nie zna użytkownika, więc każdy zapis czyści wszystkie
+        self._stats: "OrderedDict[Optional[str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # Zmieniana przy każdym unieważnieniu - odczyt rozpoczęty przed zapisem nie trafia do pamięci
+        self._generation = 0
+
+    def get_page(
+        self,
+        scope: Optional[str],
+        user_id: str,
+        limit: int,
+        cursor: Optional[Tuple[str, str]],
+        load: Callable[[], Page]
+    ) -> Page:
+        """Strona listy z pamięci albo z load() (wynik jest zapamiętywany)"""
+        key = (scope, user_id, limit, tuple(cursor) if cursor else None)
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._pages.move_to_end(key)
+                return copy.deepcopy(entry[1]), entry[2]
+            generation = self._generation
+        rows, next_cursor = load()
+        with self._lock:
+            if generation == self._generation:
+                self._pages[key] = (time.monotonic() + self.ttl, copy.deepcopy(rows), next_cursor)
+                self._evict(self._pages)
+        return rows, next_cursor
+
+    def get_process(
+        self,
+        scope: Optional[str],
+        process_id: str,
+        load: Callable[[], Optional[Dict[str, Any]]]
+    ) -> Optional[Dict[str, Any]]:
+        """Pełny wiersz procesu z pamięci albo z load() (brak wiersza nie jest zapamiętywany)"""
+        key = (scope, process_id)
+        with self._lock:
+            entry = self._processes.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._processes.move_to_end(key)
+                return copy.deepcopy(entry[1])
+            generation = self._generation
+        row = load()
+        with self._lock:
+            if row is not None and generation == self._generation:
+                self._processes[key] = (time.monotonic() + self.ttl, copy.deepcopy(row))
+                self._evict(self._processes)
+        return row
+
+    def get_stats(self, scope: Optional[str], load: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Statystyki dashboardu z pamięci albo z load()"""
+        with self._lock:
+            entry = self._stats.get(scope)
+            if entry is not None and entry[0] > time.monotonic():
+                self._stats.move_to_end(scope)
+                return copy.deepcopy(entry[1])
+            generation = self._generation
+        stats = load()
+        with self._lock:
+            if generation == self._generation:
+                self._stats[scope] = (time.monotonic() + self.ttl, copy.deepcopy(stats))
+                self._evict(self._stats)
+        return stats
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Nowy proces użytkownika - jego strony listy są nieaktualne"""
+        with self._lock:
+            self._generation += 1
+            self._stats.clear()
+            for key in [key for key in self._pages if key[1] == user_id]:
+                del self._pages[key]
+
+    def invalidate_process(self, process_id: str, deleted: bool = False) -> None:
+        """
+        Zmieniony proces: usuwa jego wiersz i strony, na których występuje.
+        Dla usuniętego procesu strony zostają, a wiersz znika z nich od razu.
+        """
+        with self._lock:
+            self._generation += 1
+            self._stats.clear()
+            for key in [key for key in self._processes if key[1] == process_id]:
+                del self._processes[key]
+            for key, (expires, rows, next_cursor) in list(self._pages.items()):
+                if not any(row.get("id") == process_id for row in rows):
+                    continue
+                if deleted:
+                    self._pages[key] = (expires, [row for row in rows if row.get("id") != process_id], next_cursor)
+                else:
+                    del self._pages[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._pages.clear()
+            self._processes.clear()
+            self._stats.clear()
+
+    def _evict(self, entries: "OrderedDict") -> None:
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+
+_cache: Optional[ProcessCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_process_cache() -> ProcessCache:
+    """Zwraca pamięć procesów współdzieloną przez wszystkie sesje"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ProcessCache()
+    return _cache
@@ -0,0 +1,184 @@
+"""
+Moduł repozytorium danych dla SmartFlow.
+
+Interfejs Repository opisuje wszystkie operacje na użytkownikach, profilach
+i procesach używane przez interfejs i zadania w tle. Implementacje:
+- SupabaseRepository - baza Supabase (database.supabase_client, RLS),
+- SQLiteRepository (database.sqlite_repository) - lokalna baza SQLite dla
+  trybu demo, wdrożeń na jednym serwerze i testów bez sieci.
+get_repository() wybiera implementację według SMARTFLOW_REPOSITORY, a bez
+konfiguracji Supabase - SQLite.
+"""
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from database import supabase_client
+
+Cursor = Optional[Tuple[str, str]]
+
+DEFAULT_SQLITE_PATH = ".cache/smartflow.sqlite3"
+
+
+class Repository(ABC):
+    """Operacje na danych SmartFlow niezależne od bazy"""
+
+    # ---------------- Użytkownicy i profile ----------------
+
+    @abstractmethod
+    def create_user(self, email: str, password: str) -> Dict[str, Any]:
+        """Rejestracja użytkownika; zwraca {id, email}"""
+
+    @abstractmethod
+    def authenticate(self, email: str, password: str) -> Tuple[Dict[str, Any], Optional[supabase_client.AuthSession]]:
+        """Logowanie; zwraca ({id, email}, sesja z tokenami lub None), ValueError przy złych danych"""
+
+    @abstractmethod
+    def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Profil firmy użytkownika"""
+
+    @abstractmethod
+    def save_profile(self, user_id: str, profile_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Zapis profilu firmy (jeden na użytkownika)"""
+
+    # ---------------- Procesy ----------------
+
+    @abstractmethod
+    def save_process(self, user_id: str, process_data: Dict[str, Any]) -> str:
+        """Zapis przeanalizowanego procesu (status analyzed); zwraca id"""
+
+    @abstractmethod
+    def create_draft_process(self, user_id: str, process_data: Dict[str, Any]) -> str:
+        """Zapis szkicu procesu przed analizą AI; zwraca id"""
+
+    @abstractmethod
+    def create_draft_processes(self, user_id: str, processes: List[Dict[str, Any]]) -> List[str]:
+        """Zapis wielu szkiców naraz; zwraca id w kolejności wejścia"""
+
+    @abstractmethod
+    def get_process(self, user_id: str, process_id: str) -> Optional[Dict[str, Any]]:
+        """Pełny wiersz procesu użytkownika (bez usuniętych); None dla cudzego procesu"""
+
+    @abstractmethod
+    def list_processes(self, user_id: str, limit: int = 20, cursor: Cursor = None) -> Tuple[List[Dict[str, Any]], Cursor]:
+        """Strona listy procesów (kolumny skrócone, od najnowszych); kursor keyset (created_at, id)"""
+
+    @abstractmethod
+    def process_changes(self, user_id: str, since: str, after_id: Optional[str] = None, limit: int = 500) -> List[Dict[str, Any]]:
+        """Wiersze zmienione po znaczniku (updated_at, id), z usuniętymi (deleted_at)"""
+
+    @abstractmethod
+    def update_process(self, user_id: str, process_id: str, process_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Aktualizacja pól procesu użytkownika"""
+
+    @abstractmethod
+    def complete_process_analysis(self, process_id: str, ai_analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Zapis wyniku analizy AI i zmiana statusu na analyzed"""
+
+    @abstractmethod
+    def soft_delete_process(self, user_id: str, process_id: str) -> bool:
+        """Usunięcie procesu użytkownika (ustawienie deleted_at)"""
+
+    @abstractmethod
+    def search_processes(self, user_id: str, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Dict[str, Any]], bool]:
+        """Wyszukiwanie pełnotekstowe od najtrafniejszych; zwraca (wiersze, czy_są_kolejne)"""
+
+    @abstractmethod
+    def process_stats(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Statystyki dashboardu (kształt jak RPC get_process_stats); None gdy niedostępne"""
+
+
+class SupabaseRepository(Repository):
+    """Repozytorium w Supabase - zapytania idą przez database.supabase_client (RLS po tokenie)"""
+
+    def create_user(self, email: str, password: str) -> Dict[str, Any]:
+        response = supabase_client.create_auth_client().auth.sign_up({"email": email, "password": password})
+        if not response.user:
+            raise ValueError("Błąd podczas tworzenia użytkownika")
+        return {"id": response.user.id, "email": response.user.email}
+
+    def authenticate(self, email: str, password: str) -> Tuple[Dict[str, Any], Optional[supabase_client.AuthSession]]:
+        response = supabase_client.create_auth_client().auth.sign_in_with_password({"email": email, "password": password})
+        if not response.user:
+            raise ValueError("Nieprawidłowe dane logowania")
+        # Z refresh tokenem - sesja jest odnawiana po wygaśnięciu JWT
+        session = supabase_client.AuthSession.from_gotrue(response.session) if response.session else None
+        return {"id": response.user.id, "email": response.user.email}, session
+
+    def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return supabase_client.get_profile(user_id)
+
+    def save_profile(self, user_id: str, profile_data: Dict[str, Any]) -> Dict[str, Any]:
+        return supabase_client.save_profile(user_id, profile_data)
+
+    def save_process(self, user_id: str, process_data: Dict[str, Any]) -> str:
+        return supabase_client.save_process(user_id, process_data)
+
+    def create_draft_process(self, user_id: str, process_data: Dict[str, Any]) -> str:
+        return supabase_client.create_draft_process(user_id, process_data)
+
+    def create_draft_processes(self, user_id: str, processes: List[Dict[str, Any]]) -> List[str]:
+        return supabase_client.create_draft_processes(user_id, processes)
+
+    # Zapytania Supabase ogranicza do użytkownika RLS (token sesji), user_id nie jest potrzebny
+    def get_process(self, user_id: str, process_id: str) -> Optional[Dict[str, Any]]:
+        return supabase_client.get_process(process_id)
+
+    def list_processes(self, user_id: str, limit: int = 20, cursor: Cursor = None) -> Tuple[List[Dict[str, Any]], Cursor]:
+        return supabase_client.get_user_processes_page(user_id, limit, cursor)
+
+    def process_changes(self, user_id: str, since: str, after_id: Optional[str] = None, limit: int = 500) -> List[Dict[str, Any]]:
+        return supabase_client.get_process_changes(since, after_id, limit)
+
+    def update_process(self, user_id: str, process_id: str, process_data: Dict[str, Any]) -> Dict[str, Any]:
+        return supabase_client.update_process(process_id, process_data)
+
+    def complete_process_analysis(self, process_id: str, ai_analysis: Dict[str, Any]) -> Dict[str, Any]:
+        return supabase_client.complete_process_analysis(process_id, ai_analysis)
+
+    def soft_delete_process(self, user_id: str, process_id: str) -> bool:
+        return supabase_client.soft_delete_process(process_id)
+
+    def search_processes(self, user_id: str, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Dict[str, Any]], bool]:
+        return supabase_client.search_processes(query, limit, offset)
+
+    def process_stats(self, user_id: str) -> Optional[Dict[str, Any]]:
+        # Funkcja SQL filtruje po auth.uid() - bez tokenu użytkownika nie ma czego liczyć
+        if not supabase_client.get_access_token():
+            return None
+        return supabase_client.get_process_stats()
+
+
+_repository: Optional[Repository] = None
+_repository_lock = threading.Lock()
+
+
+def _backend() -> str:
+    backend = os.getenv("SMARTFLOW_REPOSITORY")
+    if backend:
+        return backend
+    return "supabase" if os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_ANON_KEY") else "sqlite"
+
+
+def get_repository() -> Repository:
+    """Zwraca repozytorium współdzielone przez wszystkie sesje (supabase albo sqlite)"""
+    global _repository
+    with _repository_lock:
+        if _repository is None:
+            backend = _backend()
+            if backend == "sqlite":
+                from database.sqlite_repository import SQLiteRepository
+                _repository = SQLiteRepository(os.getenv("SMARTFLOW_SQLITE_PATH", DEFAULT_SQLITE_PATH))
+            elif backend == "supabase":
+                _repository = SupabaseRepository()
+            else:
+                raise ValueError(f"Nieznany backend repozytorium: {backend} (dozwolone: supabase, sqlite)")
+    return _repository
+
+
+def set_repository(repository: Optional[Repository]) -> None:
+    """Podmienia repozytorium (np. w testach); None = ponowny wybór przy następnym get_repository()"""
+    global _repository
+    with _repository_lock:
+        _repository = repository
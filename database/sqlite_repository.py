@@ -0,0 +1,437 @@
+"""
+Moduł lokalnego repozytorium SQLite dla SmartFlow.
+
+Schemat odwzorowuje supabase_setup.sql: te same tabele i ograniczenia
+(enumy jako CHECK), te same indeksy (częściowe WHERE deleted_at IS NULL),
+trigger updated_at i miękkie usuwanie. Kolumny wyliczane (description_preview,
+recommendation_costs) i konfiguracja wyszukiwania smartflow_pl (simple +
+unaccent) są funkcjami Pythona rejestrowanymi w połączeniu; wyszukiwanie
+pełnotekstowe korzysta z FTS5. RLS nie ma odpowiednika - filtr po user_id
+jest w każdym zapytaniu listy, wyszukiwania i statystyk.
+"""
+import os
+import re
+import json
+import uuid
+import hashlib
+import secrets
+import sqlite3
+import threading
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from analytics.portfolio import compute_portfolio, portfolio_frame
+from database.repository import Cursor, Repository
+from database.supabase_client import AuthSession, summary_row
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS profiles (
+    id TEXT PRIMARY KEY,
+    user_id TEXT UNIQUE NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    company_size TEXT NOT NULL CHECK (company_size IN ('5-10 osób', '11-25 osób', '26-50 osób')),
+    industry TEXT NOT NULL CHECK (industry IN ('Marketing', 'Księgowość', 'Handel', 'Produkcja', 'Usługi')),
+    budget_range TEXT NOT NULL CHECK (budget_range IN ('do 500 zł/miesiąc', '500-2000 zł/miesiąc', 'powyżej 2000 zł/miesiąc')),
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS processes (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    title TEXT NOT NULL CHECK (length(title) <= 255),
+    description TEXT,
+    form_data TEXT NOT NULL CHECK (json_valid(form_data)),
+    ai_analysis TEXT CHECK (ai_analysis IS NULL OR json_valid(ai_analysis)),
+    potential_score INTEGER CHECK (potential_score >= 1 AND potential_score <= 10),
+    status TEXT DEFAULT 'draft' NOT NULL CHECK (status IN ('draft', 'analyzed', 'implemented')),
+    deleted_at TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_profiles_user_id ON profiles(user_id);
+CREATE INDEX IF NOT EXISTS idx_processes_user_id ON processes(user_id);
+CREATE INDEX IF NOT EXISTS idx_processes_created_at ON processes(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_processes_status ON processes(status) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_processes_active ON processes(user_id, created_at) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_processes_changes ON processes(user_id, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_processes_potential_score ON processes(potential_score) WHERE potential_score IS NOT NULL;
+
+CREATE TRIGGER IF NOT EXISTS profiles_updated_at AFTER UPDATE ON profiles
+    FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE profiles SET updated_at = utc_now() WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS processes_updated_at AFTER UPDATE ON processes
+    FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE processes SET updated_at = utc_now() WHERE id = NEW.id;
+END;
+
+-- Odpowiednik search_vector: tytuł, opis i rekomendacje po unaccent
+CREATE VIRTUAL TABLE IF NOT EXISTS processes_fts USING fts5(
+    process_id UNINDEXED, title, description, recommendations,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS processes_fts_insert AFTER INSERT ON processes
+BEGIN
+    INSERT INTO processes_fts (process_id, title, description, recommendations)
+    VALUES (NEW.id, unaccent(NEW.title), unaccent(NEW.description), unaccent(recommendations_text(NEW.ai_analysis)));
+END;
+
+CREATE TRIGGER IF NOT EXISTS processes_fts_update AFTER UPDATE OF title, description, ai_analysis ON processes
+BEGIN
+    DELETE FROM processes_fts WHERE process_id = OLD.id;
+    INSERT INTO processes_fts (process_id, title, description, recommendations)
+    VALUES (NEW.id, unaccent(NEW.title), unaccent(NEW.description), unaccent(recommendations_text(NEW.ai_analysis)));
+END;
+
+CREATE TRIGGER IF NOT EXISTS processes_fts_delete AFTER DELETE ON processes
+BEGIN
+    DELETE FROM processes_fts WHERE process_id = OLD.id;
+END;
+"""
+
+# Kolumny listy - jak PROCESS_LIST_COLUMNS w supabase_client.py
+LIST_COLUMNS = """
+    id, title, status, potential_score, created_at, updated_at,
+    description_preview(description) AS description_preview,
+    json_extract(form_data, '$.process.frequency') AS frequency,
+    json_extract(form_data, '$.process.participants') AS participants,
+    json_extract(form_data, '$.process.duration') AS duration,
+    json_extract(form_data, '$.company') AS company,
+    json_extract(form_data, '$.improvement_goals') AS improvement_goals,
+    json_extract(ai_analysis, '$.mozliwe_oszczednosci') AS savings,
+    recommendation_costs(ai_analysis) AS recommendation_costs
+"""
+
+_JSON_LIST_COLUMNS = ("company", "improvement_goals", "savings", "recommendation_costs")
+_JSON_COLUMNS = ("form_data", "ai_analysis")
+_PROCESS_COLUMNS = ("title", "description", "form_data", "ai_analysis", "potential_score", "status", "deleted_at")
+
+PASSWORD_ITERATIONS = 200_000
+
+_UNACCENT = str.maketrans("łŁ", "lL")
+
+
+def unaccent(text: Optional[str]) -> str:
+    """Tekst bez polskich znaków (jak rozszerzenie unaccent)"""
+    plain = unicodedata.normalize("NFKD", (text or "").translate(_UNACCENT))
+    return "".join(ch for ch in plain if not unicodedata.combining(ch))
+
+
+def description_preview(description: Optional[str]) -> Optional[str]:
+    """Skrócony opis do 500 znaków, bez ucinania wyrazów"""
+    if description is None or len(description) <= 500:
+        return description
+    return re.sub(r"\s+\S*$", "", description[:500]) + "…"
+
+
+def _recommendations(analysis: Optional[str]) -> List[Dict[str, Any]]:
+    try:
+        recommendations = (json.loads(analysis) or {}).get("rekomendacje") if analysis else None
+    except (ValueError, AttributeError):
+        return []
+    return [rec for rec in recommendations if isinstance(rec, dict)] if isinstance(recommendations, list) else []
+
+
+def recommendation_costs(analysis: Optional[str]) -> str:
+    return json.dumps([
+        {"koszt_miesiecznie": rec.get("koszt_miesiecznie"), "czas_wdrozenia": rec.get("czas_wdrozenia")}
+        for rec in _recommendations(analysis)
+    ])
+
+
+def recommendations_text(analysis: Optional[str]) -> str:
+    return " ".join(f"{rec.get('narzedzie') or ''} {rec.get('opis') or ''}" for rec in _recommendations(analysis))
+
+
+def fts_query(query: str) -> Optional[str]:
+    """Zapytanie w składni websearch (słowa, "fraza", -wykluczenie) jako wyrażenie FTS5"""
+    positive, negative = [], []
+    for token in re.findall(r'-?"[^"]*"|\S+', query):
+        excluded = token.startswith("-")
+        words = re.findall(r"\w+", unaccent(token.lstrip("-").strip('"')).lower())
+        if words:
+            (negative if excluded else positive).append('"' + " ".join(words) + '"')
+    if not positive:
+        return None
+    return " AND ".join(positive) + "".join(f" NOT {phrase}" for phrase in negative)
+
+
+def _hash_password(password: str, salt: Optional[bytes] = None) -> str:
+    salt = salt or secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, PASSWORD_ITERATIONS)
+    return f"pbkdf2_sha256${PASSWORD_ITERATIONS}${salt.hex()}${digest.hex()}"
+
+
+def _check_password(password: str, stored: str) -> bool:
+    _, iterations, salt, digest = stored.split("$")
+    candidate = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt), int(iterations))
+    return secrets.compare_digest(candidate.hex(), digest)
+
+
+def _format(moment: datetime) -> str:
+    # Stały format z mikrosekundami - porównanie tekstowe jest chronologiczne
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+class SQLiteRepository(Repository):
+    """Repozytorium w lokalnym pliku SQLite (albo w pamięci dla path=":memory:")"""
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._lock = threading.RLock()
+        self._last_moment: Optional[datetime] = None
+        directory = os.path.dirname(path) if path != ":memory:" else ""
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.create_function("utc_now", 0, self._now)
+        self._conn.create_function("unaccent", 1, unaccent, deterministic=True)
+        self._conn.create_function("description_preview", 1, description_preview, deterministic=True)
+        self._conn.create_function("recommendation_costs", 1, recommendation_costs, deterministic=True)
+        self._conn.create_function("recommendations_text", 1, recommendations_text, deterministic=True)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode = WAL")
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def _now(self) -> str:
+        # Ściśle rosnący - kolejne zapisy mają różne updated_at nawet w tej samej mikrosekundzie
+        with self._lock:
+            moment = datetime.now(timezone.utc)
+            if self._last_moment is not None and moment <= self._last_moment:
+                moment = self._last_moment + timedelta(microseconds=1)
+            self._last_moment = moment
+            return _format(moment)
+
+    def _query(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    def _row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        for column in _JSON_COLUMNS:
+            if column in row:
+                row[column] = _decode(row[column])
+        return row
+
+    def _summary(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        for column in _JSON_LIST_COLUMNS:
+            row[column] = _decode(row[column])
+        return summary_row(row)
+
+    # ---------------- Użytkownicy i profile ----------------
+
+    def create_user(self, email: str, password: str) -> Dict[str, Any]:
+        user = {"id": str(uuid.uuid4()), "email": email.strip().lower()}
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT INTO users (id, email, password_hash, created_at) VALUES (?, ?, ?, ?)",
+                    (user["id"], user["email"], _hash_password(password), self._now())
+                )
+        except sqlite3.IntegrityError:
+            raise ValueError("Użytkownik o tym adresie email już istnieje")
+        return user
+
+    def authenticate(self, email: str, password: str) -> Tuple[Dict[str, Any], Optional[AuthSession]]:
+        rows = self._query("SELECT id, email, password_hash FROM users WHERE email = ?", (email.strip().lower(),))
+        if not rows or not _check_password(password, rows[0]["password_hash"]):
+            raise ValueError("Nieprawidłowe dane logowania")
+        return {"id": rows[0]["id"], "email": rows[0]["email"]}, None
+
+    def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT * FROM profiles WHERE user_id = ?", (user_id,))
+        return rows[0] if rows else None
+
+    def save_profile(self, user_id: str, profile_data: Dict[str, Any]) -> Dict[str, Any]:
+        now = self._now()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO profiles (id, user_id, company_size, industry, budget_range, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    company_size = excluded.company_size,
+                    industry = excluded.industry,
+                    budget_range = excluded.budget_range,
+                    updated_at = excluded.updated_at
+                """,
+                (str(uuid.uuid4()), user_id, profile_data.get("company_size"), profile_data.get("industry"),
+                 profile_data.get("budget_range"), now, now)
+            )
+        return self.get_profile(user_id)
+
+    # ---------------- Procesy ----------------
+
+    def _insert(self, user_id: str, processes: List[Dict[str, Any]], status: str) -> List[str]:
+        rows = []
+        for process_data in processes:
+            analysis = process_data.get("ai_analysis") if status == "analyzed" else None
+            now = self._now()
+            rows.append((
+                str(uuid.uuid4()), user_id, process_data.get("title"), process_data.get("description"),
+                json.dumps(process_data.get("form_data") or {}, ensure_ascii=False),
+                json.dumps(analysis, ensure_ascii=False) if analysis is not None else None,
+                (analysis or {}).get("ocena_potencjalu"), status, now, now
+            ))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO processes (id, user_id, title, description, form_data, ai_analysis,
+                                       potential_score, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows
+            )
+        return [row[0] for row in rows]
+
+    def save_process(self, user_id: str, process_data: Dict[str, Any]) -> str:
+        return self._insert(user_id, [process_data], "analyzed")[0]
+
+    def create_draft_process(self, user_id: str, process_data: Dict[str, Any]) -> str:
+        return self._insert(user_id, [process_data], "draft")[0]
+
+    def create_draft_processes(self, user_id: str, processes: List[Dict[str, Any]]) -> List[str]:
+        return self._insert(user_id, processes, "draft") if processes else []
+
+    def get_process(self, user_id: str, process_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT * FROM processes WHERE id = ? AND user_id = ? AND deleted_at IS NULL", (process_id, user_id)
+        )
+        return self._row(rows[0]) if rows else None
+
+    def list_processes(self, user_id: str, limit: int = 20, cursor: Cursor = None) -> Tuple[List[Dict[str, Any]], Cursor]:
+        sql = f"SELECT {LIST_COLUMNS} FROM processes WHERE user_id = ? AND deleted_at IS NULL"
+        params: List[Any] = [user_id]
+        if cursor:
+            sql += " AND (created_at, id) < (?, ?)"
+            params.extend(cursor)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+        rows = [self._summary(row) for row in self._query(sql, params)]
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, (rows[-1]["created_at"], rows[-1]["id"])
+
+    def process_changes(self, user_id: str, since: str, after_id: Optional[str] = None, limit: int = 500) -> List[Dict[str, Any]]:
+        since = _format(datetime.fromisoformat(since.replace("Z", "+00:00")))
+        rows = self._query(
+            f"""
+            SELECT {LIST_COLUMNS}, deleted_at FROM processes
+            WHERE user_id = ? AND (updated_at, id) > (?, ?)
+            ORDER BY updated_at, id LIMIT ?
+            """,
+            (user_id, since, after_id or "", limit)
+        )
+        return [self._summary(row) for row in rows]
+
+    def update_process(self, user_id: str, process_id: str, process_data: Dict[str, Any]) -> Dict[str, Any]:
+        return self._update_process(process_id, process_data, user_id)
+
+    def _update_process(self, process_id: str, process_data: Dict[str, Any], user_id: Optional[str] = None) -> Dict[str, Any]:
+        # Bez RLS - zakres użytkownika w samym zapytaniu; user_id=None tylko dla zadań w tle (wynik analizy)
+        fields = {key: value for key, value in process_data.items() if key in _PROCESS_COLUMNS}
+        if not fields:
+            raise ValueError("Brak pól do aktualizacji procesu")
+        values = [
+            json.dumps(value, ensure_ascii=False) if key in _JSON_COLUMNS and value is not None else value
+            for key, value in fields.items()
+        ]
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        sql = f"UPDATE processes SET {assignments}, updated_at = ? WHERE id = ? AND deleted_at IS NULL"
+        params = [*values, self._now(), process_id]
+        if user_id is not None:
+            sql += " AND user_id = ?"
+            params.append(user_id)
+        with self._lock, self._conn:
+            updated = self._conn.execute(sql, params).rowcount
+        if not updated:
+            raise ValueError("Błąd podczas aktualizacji procesu")
+        return self._row(self._query("SELECT * FROM processes WHERE id = ?", (process_id,))[0])
+
+    def complete_process_analysis(self, process_id: str, ai_analysis: Dict[str, Any]) -> Dict[str, Any]:
+        return self._update_process(process_id, {
+            "ai_analysis": ai_analysis,
+            "potential_score": ai_analysis.get("ocena_potencjalu"),
+            "status": "analyzed"
+        })
+
+    def soft_delete_process(self, user_id: str, process_id: str) -> bool:
+        now = self._now()
+        with self._lock, self._conn:
+            deleted = self._conn.execute(
+                "UPDATE processes SET deleted_at = ?, updated_at = ? WHERE id = ? AND user_id = ? AND deleted_at IS NULL",
+                (now, now, process_id, user_id)
+            ).rowcount
+        return deleted > 0
+
+    def search_processes(self, user_id: str, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Dict[str, Any]], bool]:
+        match = fts_query(query)
+        if match is None:
+            return [], False
+        # Wagi kolumn jak setweight A/B/C; bm25 - im mniejszy, tym trafniejszy
+        rows = self._query(
+            f"""
+            WITH hits AS (
+                SELECT process_id, bm25(processes_fts, 0, 1.0, 0.4, 0.2) AS score
+                FROM processes_fts WHERE processes_fts MATCH ?
+            )
+            SELECT {LIST_COLUMNS}, -score AS rank
+            FROM hits JOIN processes ON processes.id = hits.process_id
+            WHERE user_id = ? AND deleted_at IS NULL
+            ORDER BY rank DESC, created_at DESC, id DESC
+            LIMIT ? OFFSET ?
+            """,
+            (match, user_id, limit + 1, offset)
+        )
+        rows = [self._summary(row) for row in rows]
+        return rows[:limit], len(rows) > limit
+
+    def process_stats(self, user_id: str) -> Optional[Dict[str, Any]]:
+        counts = self._query(
+            "SELECT status, count(*) AS n FROM processes WHERE user_id = ? AND deleted_at IS NULL GROUP BY status",
+            (user_id,)
+        )
+        scores = self._query(
+            "SELECT avg(potential_score) AS avg_score, max(potential_score) AS max_score "
+            "FROM processes WHERE user_id = ? AND deleted_at IS NULL",
+            (user_id,)
+        )[0]
+        rows = [
+            self._row(row) for row in
+            self._query("SELECT form_data, ai_analysis FROM processes WHERE user_id = ? AND deleted_at IS NULL", (user_id,))
+        ]
+        totals = compute_portfolio(portfolio_frame(rows))["totals"]
+        return {
+            "total": sum(row["n"] for row in counts),
+            "by_status": {row["status"]: row["n"] for row in counts},
+            "avg_score": round(scores["avg_score"], 2) if scores["avg_score"] is not None else None,
+            "max_score": scores["max_score"],
+            **{key: totals[key] for key in (
+                "monthly_hours", "analyzed", "hours_saved_monthly", "money_saved_monthly", "tool_cost_monthly", "setup_cost"
+            )}
+        }
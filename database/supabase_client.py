@@ -2,31 +2,219 @@
 Moduł konfiguracji klienta Supabase dla SmartFlow.
 """
 import os
-from typing import Dict, Any, Optional, List
-from supabase import create_client, Client
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List, Tuple
+import httpx
+from postgrest import SyncPostgrestClient
+from supabase import create_client, Client, ClientOptions
 from dotenv import load_dotenv
+from database.process_cache import get_process_cache
 
 # Wczytanie zmiennych środowiskowych
 load_dotenv()
 
-# Konfiguracja klienta Supabase
+# Konfiguracja klienta Supabase - jeden klient na proces (i konfigurację)
 supabase: Optional[Client] = None
+_supabase_config: Optional[Tuple[str, str]] = None
+_lock = threading.Lock()
 
-def init_supabase() -> Client:
-    """Inicjalizuje klienta Supabase"""
+# Odświeżanie sesji z wyprzedzeniem (s przed wygaśnięciem JWT)
+TOKEN_REFRESH_MARGIN = float(os.getenv("SUPABASE_TOKEN_REFRESH_MARGIN", 60))
+
+
+@dataclass
+class AuthSession:
+    """
+    Sesja Supabase Auth zalogowanego użytkownika. Ten sam obiekt trafia do stanu
+    sesji Streamlit i (przez kontekst) do wątków zadań, więc odświeżenie podmienia
+    tokeny w miejscu i widzą je wszyscy.
+    """
+    access_token: str
+    refresh_token: Optional[str] = None
+    expires_at: Optional[float] = None
+    # Klucz klienta PostgREST w pamięci - stały mimo rotacji tokenów
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @classmethod
+    def from_gotrue(cls, session: Any) -> "AuthSession":
+        return cls(session.access_token, session.refresh_token, session.expires_at)
+
+    def expiring(self) -> bool:
+        return self.expires_at is not None and time.time() >= self.expires_at - TOKEN_REFRESH_MARGIN
+
+
+# Sesja zalogowanego użytkownika w bieżącym kontekście (przebieg skryptu, wątek zadania)
+_session: ContextVar[Optional[AuthSession]] = ContextVar("supabase_session", default=None)
+
+# Klienci PostgREST działający w imieniu użytkownika (RLS), z pulą połączeń każdy
+_user_clients: "OrderedDict[Tuple[str, str], SyncPostgrestClient]" = OrderedDict()
+MAX_USER_CLIENTS = int(os.getenv("SUPABASE_MAX_USER_CLIENTS", 256))
+
+# Kolumny listy procesów: bez pełnego opisu, form_data i ai_analysis - tylko pola
+# potrzebne do wyświetlenia wiersza, wstępnej oceny i sum portfela
+# (description_preview i recommendation_costs to kolumny wyliczane w SQL)
+PROCESS_LIST_COLUMNS = ",".join([
+    "id", "title", "status", "potential_score", "created_at", "updated_at", "description_preview",
+    "frequency:form_data->process->>frequency",
+    "participants:form_data->process->>participants",
+    "duration:form_data->process->>duration",
+    "company:form_data->company",
+    "improvement_goals:form_data->improvement_goals",
+    "savings:ai_analysis->mozliwe_oszczednosci",
+    "recommendation_costs"
+])
+
+def _timeout() -> float:
+    return float(os.getenv("SUPABASE_TIMEOUT", 10))
+
+def _config() -> Tuple[str, str]:
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_ANON_KEY")
-    
+
     if not url or not key:
         raise ValueError("Brak konfiguracji Supabase w zmiennych środowiskowych")
-    
-    return create_client(url, key)
+
+    return url, key
+
+def init_supabase() -> Client:
+    """Zwraca współdzielonego klienta Supabase (tworzonego raz, bez sesji użytkownika)"""
+    global supabase, _supabase_config
+    config = _config()
+    with _lock:
+        if supabase is None or _supabase_config != config:
+            supabase = create_client(*config, options=ClientOptions(
+                postgrest_client_timeout=_timeout(),
+                auto_refresh_token=False,
+                persist_session=False
+            ))
+            _supabase_config = config
+    return supabase
+
+def create_auth_client() -> Client:
+    """Osobny klient do logowania/rejestracji - sesja nie trafia do współdzielonego klienta"""
+    return create_client(*_config(), options=ClientOptions(
+        postgrest_client_timeout=_timeout(),
+        auto_refresh_token=False,
+        persist_session=False
+    ))
+
+def set_session(session: Optional[AuthSession]) -> None:
+    """Ustawia sesję użytkownika dla zapytań w bieżącym kontekście (None = klucz anon)"""
+    _session.set(session)
+
+def get_session() -> Optional[AuthSession]:
+    return _session.get()
+
+def set_access_token(token: Optional[str]) -> None:
+    """Jak set_session, ale z samym tokenem (bez możliwości odświeżenia)"""
+    set_session(AuthSession(token, id=token) if token else None)
+
+def get_access_token() -> Optional[str]:
+    """Token bieżącej sesji - odświeżony, jeśli zaraz wygaśnie"""
+    session = _session.get()
+    if session is None:
+        return None
+    if session.expiring():
+        refresh_session(session, session.access_token)
+    return session.access_token
+
+def refresh_session(session: AuthSession, stale_token: Optional[str] = None) -> bool:
+    """
+    Odnawia tokeny sesji refresh tokenem Supabase Auth; False, gdy sesji nie da
+    się odnowić. Refresh token jest jednorazowy, więc przy stale_token odświeża
+    tylko wtedy, gdy inny wątek nie zrobił tego wcześniej.
+    """
+    with session.lock:
+        if stale_token is not None and session.access_token != stale_token:
+            return True
+        if not session.refresh_token:
+            return False
+        try:
+            response = create_auth_client().auth.refresh_session(session.refresh_token)
+        except Exception as e:
+            print(f"Błąd odświeżania sesji: {str(e)}")
+            return False
+        if not response.session:
+            return False
+        session.access_token = response.session.access_token
+        session.refresh_token = response.session.refresh_token
+        session.expires_at = response.session.expires_at
+    return True
+
+
+class _SessionTransport(httpx.BaseTransport):
+    """Nagłówek Authorization z bieżącego tokenu sesji; po 401 (wygasły JWT) odświeża sesję i ponawia raz"""
+
+    def __init__(self, session: AuthSession):
+        self.session = session
+        self._transport = httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        token = self.session.access_token
+        request.headers["Authorization"] = f"Bearer {token}"
+        response = self._transport.handle_request(request)
+        if response.status_code == 401 and refresh_session(self.session, token):
+            response.close()
+            request.headers["Authorization"] = f"Bearer {self.session.access_token}"
+            response = self._transport.handle_request(request)
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+def _user_postgrest(session: AuthSession) -> SyncPostgrestClient:
+    """Klient PostgREST działający w imieniu użytkownika (z pamięci LRU, jeden na sesję)"""
+    url, key = _supabase_config or _config()
+    cache_key = (url, session.id)
+    with _lock:
+        client = _user_clients.get(cache_key)
+        if client is not None:
+            _user_clients.move_to_end(cache_key)
+            return client
+        # Token w nagłówku podąża za sesją - odświeżenie nie wymaga nowego klienta
+        client = SyncPostgrestClient(
+            f"{url}/rest/v1",
+            headers={"apiKey": key},
+            timeout=_timeout(),
+            http_client=httpx.Client(timeout=_timeout(), follow_redirects=True, transport=_SessionTransport(session))
+        )
+        _user_clients[cache_key] = client
+        evicted = []
+        while len(_user_clients) > MAX_USER_CLIENTS:
+            evicted.append(_user_clients.popitem(last=False)[1])
+    for old in evicted:
+        old.session.close()
+    return client
+
+def _cache_scope() -> Optional[str]:
+    """Zakres pamięci procesów - sesja użytkownika (stały mimo odświeżania tokenu)"""
+    session = _session.get()
+    return session.id if session else None
+
+def _table(name: str):
+    """Zapytanie do tabeli - z tokenem użytkownika (RLS), jeśli jest w kontekście"""
+    client = init_supabase()
+    if get_access_token():
+        return _user_postgrest(_session.get()).from_(name)
+    return client.table(name)
+
+def _rpc(name: str, params: Dict[str, Any]):
+    """Wywołanie funkcji SQL - z tokenem użytkownika, jeśli jest w kontekście"""
+    client = init_supabase()
+    if get_access_token():
+        return _user_postgrest(_session.get()).rpc(name, params)
+    return client.rpc(name, params)
 
 def get_user(email: str) -> Optional[Dict[str, Any]]:
     """Pobieranie użytkownika po emailu"""
-    client = init_supabase()
-    
-    response = client.table("users").select("*").eq("email", email).execute()
+    response = _table("users").select("*").eq("email", email).execute()
     
     if response.data:
         return response.data[0]
@@ -34,10 +222,8 @@ def get_user(email: str) -> Optional[Dict[str, Any]]:
 
 def create_user(email: str, password: str) -> Dict[str, Any]:
     """Tworzenie nowego użytkownika"""
-    client = init_supabase()
-    
     # Rejestracja w Supabase Auth
-    auth_response = client.auth.sign_up({
+    auth_response = create_auth_client().auth.sign_up({
         "email": email,
         "password": password
     })
@@ -52,7 +238,7 @@ def create_user(email: str, password: str) -> Dict[str, Any]:
         "created_at": auth_response.user.created_at
     }
     
-    response = client.table("users").insert(profile_data).execute()
+    response = _table("users").insert(profile_data).execute()
     
     if not response.data:
         raise ValueError("Błąd podczas tworzenia profilu użytkownika")
@@ -61,23 +247,34 @@ def create_user(email: str, password: str) -> Dict[str, Any]:
 
 def update_user_profile(user_id: str, profile_data: Dict[str, Any]) -> Dict[str, Any]:
     """Aktualizacja profilu użytkownika"""
-    client = init_supabase()
-    
-    response = client.table("users").update(profile_data).eq("id", user_id).execute()
+    response = _table("users").update(profile_data).eq("id", user_id).execute()
     
     if not response.data:
         raise ValueError("Błąd podczas aktualizacji profilu użytkownika")
     
     return response.data[0]
 
+def get_profile(user_id: str) -> Optional[Dict[str, Any]]:
+    """Profil firmy użytkownika (tabela profiles)"""
+    response = _table("profiles").select("*").eq("user_id", user_id).execute()
+    return response.data[0] if response.data else None
+
+def save_profile(user_id: str, profile_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Zapisuje profil firmy użytkownika (jeden profil na użytkownika)"""
+    response = _table("profiles").upsert({**profile_data, "user_id": user_id}, on_conflict="user_id").execute()
+
+    if not response.data:
+        raise ValueError("Błąd podczas zapisu profilu firmy")
+
+    return response.data[0]
+
 def create_process(user_id: str, process_data: Dict[str, Any]) -> Dict[str, Any]:
     """Tworzenie nowego procesu"""
-    client = init_supabase()
-    
     # Dodanie user_id do danych procesu
     process_data["user_id"] = user_id
     
-    response = client.table("processes").insert(process_data).execute()
+    response = _table("processes").insert(process_data).execute()
+    get_process_cache().invalidate_user(user_id)
     
     if not response.data:
         raise ValueError("Błąd podczas tworzenia procesu")
@@ -87,18 +284,90 @@ def create_process(user_id: str, process_data: Dict[str, Any]) -> Dict[str, Any]
 def get_user_processes(user_id: str) -> List[Dict]:
     """Pobiera procesy użytkownika"""
     try:
-        client = init_supabase()
-        result = client.table("processes").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
+        result = _table("processes").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
         return result.data
     except Exception as e:
         print(f"Błąd pobierania procesów: {str(e)}")
         return []
 
+def summary_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Wiersz listy w kształcie pełnego wiersza (form_data/ai_analysis tylko z polami z listy)"""
+    savings = row.pop("savings", None)
+    costs = row.pop("recommendation_costs", None)
+    row["form_data"] = {
+        "process": {
+            "frequency": row.pop("frequency", None),
+            "participants": row.pop("participants", None),
+            "duration": row.pop("duration", None),
+            "description": row.get("description_preview")
+        },
+        "company": row.pop("company", None) or {},
+        "improvement_goals": row.pop("improvement_goals", None) or []
+    }
+    row["ai_analysis"] = {"mozliwe_oszczednosci": savings, "rekomendacje": costs or []} if savings is not None else None
+    # Pełne kolumny (opis, form_data, ai_analysis) tylko przez get_process
+    row["summary"] = True
+    return row
+
+def get_process(process_id: str) -> Optional[Dict[str, Any]]:
+    """Pobiera jeden proces ze wszystkimi kolumnami (opis, form_data, ai_analysis); z pamięci procesów"""
+    return get_process_cache().get_process(_cache_scope(), process_id, lambda: _fetch_process(process_id))
+
+def _fetch_process(process_id: str) -> Optional[Dict[str, Any]]:
+    result = _table("processes").select("*").eq("id", process_id).is_("deleted_at", "null").limit(1).execute()
+    return result.data[0] if result.data else None
+
+def get_user_processes_page(
+    user_id: str,
+    limit: int = 20,
+    cursor: Optional[Tuple[str, str]] = None
+) -> Tuple[List[Dict], Optional[Tuple[str, str]]]:
+    """Strona procesów użytkownika (od najnowszych, PROCESS_LIST_COLUMNS); cursor = (created_at, id) ostatniego wiersza poprzedniej strony"""
+    return get_process_cache().get_page(
+        _cache_scope(), user_id, limit, cursor,
+        lambda: _fetch_user_processes_page(user_id, limit, cursor)
+    )
+
+def _fetch_user_processes_page(
+    user_id: str,
+    limit: int,
+    cursor: Optional[Tuple[str, str]]
+) -> Tuple[List[Dict], Optional[Tuple[str, str]]]:
+    query = _table("processes").select(PROCESS_LIST_COLUMNS).eq("user_id", user_id).is_("deleted_at", "null")
+    if cursor:
+        # Keyset: wiersze starsze niż kursor; id rozstrzyga remisy created_at
+        created_at, process_id = cursor
+        query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{process_id}")')
+    # Zakres po indeksie idx_processes_active (user_id, created_at) WHERE deleted_at IS NULL
+    result = query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1).execute()
+    rows = [summary_row(row) for row in result.data or []]
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1]["created_at"], rows[-1]["id"])
+
+def get_process_changes(since: str, after_id: Optional[str] = None, limit: int = 500) -> List[Dict]:
+    """Procesy użytkownika zmienione po znaczniku (updated_at, id), od najstarszych; usunięte mają deleted_at (RPC get_process_changes)"""
+    result = _rpc("get_process_changes", {"since": since, "after_id": after_id, "max_rows": limit}).execute()
+    return [summary_row(row) for row in result.data or []]
+
+def search_processes(query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Dict], bool]:
+    """Wyszukiwanie pełnotekstowe procesów użytkownika (RPC search_processes, od najtrafniejszych); zwraca (wiersze, czy_są_kolejne)"""
+    result = _rpc("search_processes", {"query": query, "result_limit": limit + 1, "result_offset": offset}).execute()
+    rows = [summary_row(row) for row in result.data or []]
+    return rows[:limit], len(rows) > limit
+
+def get_process_stats() -> Dict[str, Any]:
+    """Statystyki procesów zalogowanego użytkownika (RPC get_process_stats - jedno zapytanie, agregacja w bazie)"""
+    return get_process_cache().get_stats(
+        _cache_scope(),
+        lambda: _rpc("get_process_stats", {}).execute().data or {}
+    )
+
 def update_process(process_id: str, process_data: Dict[str, Any]) -> Dict[str, Any]:
     """Aktualizacja procesu"""
-    client = init_supabase()
-    
-    response = client.table("processes").update(process_data).eq("id", process_id).execute()
+    response = _table("processes").update(process_data).eq("id", process_id).execute()
+    get_process_cache().invalidate_process(process_id)
     
     if not response.data:
         raise ValueError("Błąd podczas aktualizacji procesu")
@@ -108,8 +377,7 @@ def update_process(process_id: str, process_data: Dict[str, Any]) -> Dict[str, A
 def save_process(user_id: str, process_data: Dict) -> str:
     """Zapisuje proces do bazy danych"""
     try:
-        client = init_supabase()
-        result = client.table("processes").insert({
+        result = _table("processes").insert({
             "user_id": user_id,
             "title": process_data.get("title"),
             "description": process_data.get("description"),
@@ -118,18 +386,68 @@ def save_process(user_id: str, process_data: Dict) -> str:
             "potential_score": process_data.get("ai_analysis", {}).get("ocena_potencjalu"),
             "status": "analyzed"
         }).execute()
+        get_process_cache().invalidate_user(user_id)
         
         return result.data[0]["id"]
     except Exception as e:
         raise Exception(f"Błąd zapisywania procesu: {str(e)}")
 
+def _draft_row(user_id: str, process_data: Dict) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "title": process_data.get("title"),
+        "description": process_data.get("description"),
+        "form_data": process_data.get("form_data"),
+        "status": "draft"
+    }
+
+def create_draft_process(user_id: str, process_data: Dict) -> str:
+    """Zapisuje proces jako szkic (status draft) przed analizą AI"""
+    try:
+        result = _table("processes").insert(_draft_row(user_id, process_data)).execute()
+        get_process_cache().invalidate_user(user_id)
+
+        return result.data[0]["id"]
+    except Exception as e:
+        raise Exception(f"Błąd zapisywania procesu: {str(e)}")
+
+def create_draft_processes(user_id: str, processes: List[Dict]) -> List[str]:
+    """Zapisuje wiele szkiców jednym zapytaniem (INSERT wielu wierszy); zwraca id w kolejności wejścia"""
+    if not processes:
+        return []
+    try:
+        result = _table("processes").insert([_draft_row(user_id, p) for p in processes]).execute()
+    finally:
+        get_process_cache().invalidate_user(user_id)
+
+    if len(result.data or []) != len(processes):
+        raise ValueError("Błąd podczas zapisu procesów")
+
+    return [row["id"] for row in result.data]
+
+def complete_process_analysis(process_id: str, ai_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Zapisuje wynik analizy AI i oznacza proces jako przeanalizowany"""
+    response = _table("processes").update({
+        "ai_analysis": ai_analysis,
+        "potential_score": ai_analysis.get("ocena_potencjalu"),
+        "status": "analyzed"
+    }).eq("id", process_id).execute()
+    get_process_cache().invalidate_process(process_id)
+
+    if not response.data:
+        raise ValueError("Błąd podczas zapisu analizy procesu")
+
+    return response.data[0]
+
 def delete_process(process_id: str, user_id: str) -> bool:
     """Usuwa proces (soft delete)"""
     try:
-        client = init_supabase()
-        result = client.table("processes").update({
+        result = _table("processes").update({
             "deleted_at": "now()"
         }).eq("id", process_id).eq("user_id", user_id).execute()
+        if result.data:
+            # Optymistycznie: wiersz znika z zapamiętanych stron bez ponownego zapytania
+            get_process_cache().invalidate_process(process_id, deleted=True)
         
         return len(result.data) > 0
     except Exception as e:
@@ -139,10 +457,11 @@ def delete_process(process_id: str, user_id: str) -> bool:
 def soft_delete_process(process_id: str) -> bool:
     """Usuwa proces (soft delete) - uproszczona wersja"""
     try:
-        client = init_supabase()
-        result = client.table("processes").update({
+        result = _table("processes").update({
             "deleted_at": "now()"
         }).eq("id", process_id).execute()
+        if result.data:
+            get_process_cache().invalidate_process(process_id, deleted=True)
         
         return len(result.data) > 0
     except Exception as e:
@@ -0,0 +1,117 @@
+"""
+Moduł synchronizacji przyrostowej procesów dla SmartFlow.
+
+Dashboard trzyma lokalną kopię wczytanych stron listy (ProcessSnapshot) i przy
+każdym odświeżeniu pobiera tylko wiersze zmienione od ostatniego znacznika
+updated_at (Repository.process_changes), łącznie z usuniętymi (tombstone).
+Znacznik jest cofany o SMARTFLOW_SYNC_OVERLAP_SECONDS, bo updated_at to czas
+startu transakcji - zapis zatwierdzony później mógłby mieć starszy znacznik;
+powtórnie pobrane wiersze scalają się bez zmian.
+"""
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from database.repository import Repository, get_repository
+
+# Znacznik, gdy kopia nie zawiera jeszcze żadnego wiersza
+EPOCH = "1970-01-01T00:00:00+00:00"
+
+
+def _timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _key(row: Dict[str, Any]) -> Tuple[datetime, str]:
+    return _timestamp(row["created_at"]), row["id"]
+
+
+@dataclass
+class ProcessSnapshot:
+    """Wczytane procesy użytkownika, kursor kolejnej strony i znacznik synchronizacji"""
+    user_id: str
+    rows: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # (created_at, id) ostatniego wczytanego wiersza; None = wczytano wszystkie
+    cursor: Optional[Tuple[str, str]] = None
+    # Największe widziane updated_at
+    watermark: Optional[str] = None
+
+    def processes(self) -> List[Dict[str, Any]]:
+        """Procesy od najnowszych - kolejność jak w zapytaniu stronicowanym"""
+        return sorted(self.rows.values(), key=_key, reverse=True)
+
+    def in_range(self, row: Dict[str, Any]) -> bool:
+        """Czy wiersz mieści się w zakresie już wczytanych stron (nowsze od kursora)"""
+        if self.cursor is None:
+            return True
+        return _key(row) >= (_timestamp(self.cursor[0]), self.cursor[1])
+
+    def add_page(self, rows: Iterable[Dict[str, Any]], cursor: Optional[Tuple[str, str]]) -> None:
+        for row in rows:
+            self.rows[row["id"]] = row
+            self._advance(row)
+        self.cursor = cursor
+
+    def apply_changes(self, changes: Iterable[Dict[str, Any]]) -> int:
+        """Scala zmienione wiersze; zwraca liczbę faktycznych zmian w kopii"""
+        applied = 0
+        for row in changes:
+            self._advance(row)
+            current = self.rows.get(row["id"])
+            if row.get("deleted_at"):
+                if self.rows.pop(row["id"], None) is not None:
+                    applied += 1
+                continue
+            if current is not None and current.get("updated_at") == row.get("updated_at"):
+                continue
+            # Zmiany starszych, jeszcze niewczytanych wierszy przyjdą z kolejną stroną
+            if current is not None or self.in_range(row):
+                row.pop("deleted_at", None)
+                self.rows[row["id"]] = row
+                applied += 1
+        return applied
+
+    def _advance(self, row: Dict[str, Any]) -> None:
+        updated_at = row.get("updated_at")
+        if updated_at and (self.watermark is None or _timestamp(updated_at) > _timestamp(self.watermark)):
+            self.watermark = updated_at
+
+
+def load_snapshot(user_id: str, page_size: int, repository: Optional[Repository] = None) -> ProcessSnapshot:
+    """Nowa kopia z pierwszą stroną procesów"""
+    snapshot = ProcessSnapshot(user_id=user_id)
+    rows, cursor = (repository or get_repository()).list_processes(user_id, page_size)
+    snapshot.add_page(rows, cursor)
+    return snapshot
+
+
+def load_more(snapshot: ProcessSnapshot, page_size: int, repository: Optional[Repository] = None) -> None:
+    """Doładowuje kolejną stronę (kursor keyset z poprzedniej strony)"""
+    if snapshot.cursor is None:
+        return
+    rows, cursor = (repository or get_repository()).list_processes(snapshot.user_id, page_size, snapshot.cursor)
+    snapshot.add_page(rows, cursor)
+
+
+def sync_snapshot(
+    snapshot: ProcessSnapshot,
+    batch_size: Optional[int] = None,
+    repository: Optional[Repository] = None
+) -> int:
+    """Pobiera i scala zmiany od znacznika; zwraca liczbę zmian w kopii"""
+    repository = repository or get_repository()
+    batch_size = batch_size or int(os.getenv("SMARTFLOW_SYNC_BATCH_SIZE", 500))
+    overlap = timedelta(seconds=float(os.getenv("SMARTFLOW_SYNC_OVERLAP_SECONDS", 5)))
+    if snapshot.watermark:
+        since = (_timestamp(snapshot.watermark) - overlap).astimezone(timezone.utc).isoformat()
+    else:
+        since = EPOCH
+    after_id: Optional[str] = None
+    applied = 0
+    while True:
+        changes = repository.process_changes(snapshot.user_id, since, after_id, batch_size)
+        applied += snapshot.apply_changes(changes)
+        if len(changes) < batch_size:
+            return applied
+        since, after_id = changes[-1]["updated_at"], changes[-1]["id"]
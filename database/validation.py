@@ -0,0 +1,43 @@
+"""
+Moduł reguł walidacji procesów dla SmartFlow.
+
+Te same reguły obowiązują w formularzu (show_process_form) i przy imporcie
+wielu procesów z pliku (database.bulk_import).
+"""
+from typing import Any, Dict, List
+
+DESCRIPTION_MIN_CHARS = 50
+DESCRIPTION_MAX_CHARS = 3000
+
+FREQUENCY_OPTIONS = ["codziennie", "raz w tygodniu", "raz w miesiącu"]
+PARTICIPANTS_OPTIONS = ["1 osoba", "2-3 osoby", "4 lub więcej"]
+IMPROVEMENT_GOAL_OPTIONS = ["szybkość", "mniej błędów", "mniej nudnej pracy", "oszczędność pieniędzy"]
+DURATION_MIN_HOURS = 0.5
+DURATION_MAX_HOURS = 40.0
+
+
+def validate_process_fields(name: Any, description: Any) -> Dict[str, str]:
+    """Błędy pól wymaganych formularza: {pole: komunikat}, pusty słownik = poprawne"""
+    errors: Dict[str, str] = {}
+    if not isinstance(name, str) or not name.strip():
+        errors["process_name"] = "Wypełnij nazwę procesu"
+    if not isinstance(description, str) or len(description.strip()) < DESCRIPTION_MIN_CHARS:
+        errors["description"] = f"Wypełnij opis procesu (min. {DESCRIPTION_MIN_CHARS} znaków)"
+    elif len(description) > DESCRIPTION_MAX_CHARS:
+        errors["description"] = f"Opis procesu może mieć najwyżej {DESCRIPTION_MAX_CHARS} znaków"
+    return errors
+
+
+def validate_process_options(frequency: Any, participants: Any, duration: Any, improvement_goals: List[Any]) -> Dict[str, str]:
+    """Błędy pól wyboru (w formularzu wymusza je widget, przy imporcie trzeba je sprawdzić)"""
+    errors: Dict[str, str] = {}
+    if frequency not in FREQUENCY_OPTIONS:
+        errors["frequency"] = f"Nieznana częstotliwość: {frequency} (dozwolone: {', '.join(FREQUENCY_OPTIONS)})"
+    if participants not in PARTICIPANTS_OPTIONS:
+        errors["participants"] = f"Nieznana liczba uczestników: {participants} (dozwolone: {', '.join(PARTICIPANTS_OPTIONS)})"
+    if not isinstance(duration, (int, float)) or not DURATION_MIN_HOURS <= duration <= DURATION_MAX_HOURS:
+        errors["duration"] = f"Czas trwania musi być liczbą od {DURATION_MIN_HOURS} do {DURATION_MAX_HOURS} godzin"
+    unknown = [goal for goal in improvement_goals if goal not in IMPROVEMENT_GOAL_OPTIONS]
+    if unknown:
+        errors["improvement_goals"] = f"Nieznane cele usprawnienia: {', '.join(map(str, unknown))}"
+    return errors
@@ -3,13 +3,19 @@ Moduł integracji z OpenAI do analizy procesów.
 """
 
 from .ai import (
+    ProcessAnalysis,
     analyze_process,
+    calculate_savings,
     generate_recommendations,
-    calculate_savings
+    get_analysis,
+    invalidate_analysis
 )
 
 __all__ = [
+    'ProcessAnalysis',
     'analyze_process',
+    'calculate_savings',
     'generate_recommendations',
-    'calculate_savings'
+    'get_analysis',
+    'invalidate_analysis'
 ] 
\ No newline at end of file
@@ -3,16 +3,25 @@ Implementacja funkcji analizy procesów z wykorzystaniem OpenAI.
 """
 
 from typing import Dict, List, Optional
-import os
+from collections import OrderedDict
+import copy
 import json
+import hashlib
+import logging
+import threading
 from openai import OpenAI
 from dotenv import load_dotenv
+from ai.client import get_openai_client
+from ai.schema import parse_analysis, response_format_for
+from ai.model_router import get_model_router
 
 # Wczytanie zmiennych środowiskowych
 load_dotenv()
 
-# Inicjalizacja klienta OpenAI
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = logging.getLogger(__name__)
+
+# Klient OpenAI - domyślnie współdzielony klient z pulą połączeń (ai.client)
+client: Optional[OpenAI] = None
 
 SYSTEM_PROMPT = """
 Jesteś ekspertem od usprawniania pracy w małych firmach (5-50 osób). 
@@ -26,67 +35,194 @@ Zawsze podawaj konkretne narzędzia (Zapier, n8n, Airtable) zamiast ogólnych ra
 Odpowiadaj po polsku w strukturalnym formacie JSON.
 """
 
-def analyze_process(process_data: Dict) -> Dict:
+EMPTY_SAVINGS = {
+    "czas_godziny_miesiecznie": 0,
+    "oszczednosci_pieniadze_miesiecznie": 0
+}
+
+# Maksymalna liczba zapamiętanych uchwytów analiz
+MAX_CACHED_ANALYSES = 128
+
+def _empty_analysis() -> Dict:
+    return {
+        "ocena_potencjalu": 0,
+        "mozliwe_oszczednosci": dict(EMPTY_SAVINGS),
+        "rekomendacje": [],
+        "plan_wdrozenia": []
+    }
+
+def _input_key(process_data: Dict) -> str:
+    """Klucz treści danych wejściowych - zmiana danych daje nowy klucz"""
+    payload = json.dumps(process_data, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _request_analysis(process_data: Dict) -> Dict:
     """
-    Analiza procesu biznesowego z wykorzystaniem AI.
+    Wykonanie zapytania do OpenAI (bez zapamiętywania).
     
     Args:
         process_data: Dane procesu do analizy
         
     Returns:
         Dict z wynikami analizy
-    """
-    try:
-        # Przygotowanie promptu
-        user_prompt = f"""
-        Przeanalizuj poniższy proces biznesowy i zaproponuj usprawnienia:
-        
-        Firma:
-        - Wielkość: {process_data['company']['size']}
-        - Branża: {process_data['company']['industry']}
-        - Budżet: {process_data['company']['budget']}
-        
-        Proces:
-        - Nazwa: {process_data['process']['name']}
-        - Częstotliwość: {process_data['process']['frequency']}
-        - Uczestnicy: {process_data['process']['participants']}
-        - Czas: {process_data['process']['duration']} godzin
-        - Opis: {process_data['process']['description']}
-        
-        Cele usprawnienia: {', '.join(process_data['improvement_goal'])}
         
-        Zwróć odpowiedź w formacie JSON zawierającą:
-        - ocena_potencjalu (1-10)
-        - mozliwe_oszczednosci (czas_godziny_miesiecznie, oszczednosci_pieniadze_miesiecznie)
-        - rekomendacje (lista narzędzi z czasem_wdrozenia, koszt_miesiecznie, opis)
-        - plan_wdrozenia (lista kroków)
-        """
-        
-        # Wywołanie API OpenAI
-        response = client.chat.completions.create(
-            model="gpt-4",
+    Raises:
+        ValueError: gdy odpowiedź nie zawiera poprawnego JSON
+    """
+    # Przygotowanie promptu
+    user_prompt = f"""
+    Przeanalizuj poniższy proces biznesowy i zaproponuj usprawnienia:
+    
+    Firma:
+    - Wielkość: {process_data['company']['size']}
+    - Branża: {process_data['company']['industry']}
+    - Budżet: {process_data['company']['budget']}
+    
+    Proces:
+    - Nazwa: {process_data['process']['name']}
+    - Częstotliwość: {process_data['process']['frequency']}
+    - Uczestnicy: {process_data['process']['participants']}
+    - Czas: {process_data['process']['duration']} godzin
+    - Opis: {process_data['process']['description']}
+    
+    Cele usprawnienia: {', '.join(process_data['improvement_goal'])}
+    
+    Zwróć odpowiedź w formacie JSON zawierającą:
+    - ocena_potencjalu (1-10)
+    - mozliwe_oszczednosci (czas_godziny_miesiecznie, oszczednosci_pieniadze_miesiecznie)
+    - rekomendacje (lista narzędzi z czasem_wdrozenia, koszt_miesiecznie, opis)
+    - plan_wdrozenia (lista kroków)
+    """
+    
+    # Wywołanie API OpenAI - od najtańszego modelu, eskalacja tylko gdy potrzebna
+    router = get_model_router()
+    tier = router.initial_tier(process_data)
+    escalations = []
+    best = None
+    openai_client = client or get_openai_client()
+    while True:
+        params = {}
+        response_format = response_format_for(router.tiers[tier])
+        if response_format:
+            params["response_format"] = response_format
+        response = openai_client.chat.completions.create(
+            model=router.tiers[tier],
             messages=[
                 {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt}
             ],
-            temperature=0.7
+            temperature=0.7,
+            **params
         )
         
-        # Parsowanie odpowiedzi
-        result = json.loads(response.choices[0].message.content)
-        return result
+        # Parsowanie odpowiedzi (odporne na blok markdown i ucięcie) z konwersją typów do schematu
+        parsed = parse_analysis(response.choices[0].message.content)
+        if parsed.data:
+            best = (parsed, tier)
+        reason = router.escalation_reason(parsed, response.choices[0].finish_reason)
+        next_tier = router.next_tier(tier)
+        if reason is None or next_tier is None:
+            break
+        escalations.append(f"{router.tiers[tier]}: {reason}")
+        tier = next_tier
+    
+    if best is None:
+        raise ValueError("Odpowiedź AI nie zawiera poprawnego JSON")
+    parsed, tier = best
+    router.log_served(tier, escalations)
+    if parsed.truncated:
+        logger.warning("Odpowiedź AI ucięta - odzyskano pola: %s", ", ".join(parsed.salvaged_fields))
+    return parsed.data
+
+class ProcessAnalysis:
+    """
+    Uchwyt analizy procesu - zapytanie do AI wykonywane jest raz, przy pierwszym
+    odczycie, a wynik udostępniany przez leniwe właściwości.
+    """
+
+    def __init__(self, process_data: Dict):
+        self.process_data = copy.deepcopy(process_data)
+        self.key = _input_key(process_data)
+        self._result: Optional[Dict] = None
+        self._lock = threading.Lock()
+
+    @property
+    def result(self) -> Dict:
+        """Pełny wynik analizy (przy błędzie - wynik zerowy, który nie jest zapamiętywany)"""
+        with self._lock:
+            if self._result is None:
+                try:
+                    self._result = _request_analysis(self.process_data)
+                except Exception as e:
+                    print(f"Błąd analizy procesu: {e}")
+                    return _empty_analysis()
+            return self._result
+
+    @property
+    def recommendations(self) -> List[Dict]:
+        return self.result.get("rekomendacje", [])
+
+    @property
+    def savings(self) -> Dict:
+        return self.result.get("mozliwe_oszczednosci", dict(EMPTY_SAVINGS))
+
+    @property
+    def score(self) -> int:
+        return self.result.get("ocena_potencjalu", 0)
+
+    @property
+    def plan(self) -> List[str]:
+        return self.result.get("plan_wdrozenia", [])
+
+_analyses: "OrderedDict[str, ProcessAnalysis]" = OrderedDict()
+_analyses_lock = threading.Lock()
+
+def get_analysis(process_data: Dict) -> ProcessAnalysis:
+    """
+    Pobranie (lub utworzenie) uchwytu analizy dla danych procesu.
+    
+    Args:
+        process_data: Dane procesu
+        
+    Returns:
+        Uchwyt współdzielony przez wszystkie wywołania z identycznymi danymi
+    """
+    key = _input_key(process_data)
+    with _analyses_lock:
+        handle = _analyses.get(key)
+        if handle is None:
+            handle = ProcessAnalysis(process_data)
+            _analyses[key] = handle
+            if len(_analyses) > MAX_CACHED_ANALYSES:
+                _analyses.popitem(last=False)
+        else:
+            _analyses.move_to_end(key)
+        return handle
+
+def invalidate_analysis(process_data: Optional[Dict] = None) -> None:
+    """
+    Usunięcie zapamiętanej analizy.
+    
+    Args:
+        process_data: Dane procesu; None czyści wszystkie analizy
+    """
+    with _analyses_lock:
+        if process_data is None:
+            _analyses.clear()
+        else:
+            _analyses.pop(_input_key(process_data), None)
+
+def analyze_process(process_data: Dict) -> Dict:
+    """
+    Analiza procesu biznesowego z wykorzystaniem AI.
+    
+    Args:
+        process_data: Dane procesu do analizy
         
-    except Exception as e:
-        print(f"Błąd analizy procesu: {e}")
-        return {
-            "ocena_potencjalu": 0,
-            "mozliwe_oszczednosci": {
-                "czas_godziny_miesiecznie": 0,
-                "oszczednosci_pieniadze_miesiecznie": 0
-            },
-            "rekomendacje": [],
-            "plan_wdrozenia": []
-        }
+    Returns:
+        Dict z wynikami analizy
+    """
+    return get_analysis(process_data).result
 
 def generate_recommendations(process_data: Dict) -> List[Dict]:
     """
@@ -98,12 +234,7 @@ def generate_recommendations(process_data: Dict) -> List[Dict]:
     Returns:
         Lista rekomendacji
     """
-    try:
-        analysis = analyze_process(process_data)
-        return analysis.get("rekomendacje", [])
-    except Exception as e:
-        print(f"Błąd generowania rekomendacji: {e}")
-        return []
+    return get_analysis(process_data).recommendations
 
 def calculate_savings(process_data: Dict) -> Dict:
     """
@@ -115,15 +246,4 @@ def calculate_savings(process_data: Dict) -> Dict:
     Returns:
         Dict z oszczędnościami czasu i pieniędzy
     """
-    try:
-        analysis = analyze_process(process_data)
-        return analysis.get("mozliwe_oszczednosci", {
-            "czas_godziny_miesiecznie": 0,
-            "oszczednosci_pieniadze_miesiecznie": 0
-        })
-    except Exception as e:
-        print(f"Błąd obliczania oszczędności: {e}")
-        return {
-            "czas_godziny_miesiecznie": 0,
-            "oszczednosci_pieniadze_miesiecznie": 0
-        } 
\ No newline at end of file
+    return get_analysis(process_data).savings
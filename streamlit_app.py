@@ -23,9 +23,10 @@ TEST_USER_PASSWORD = "test123456"
 
 import streamlit as st
 from components.auth import show_auth_page
-from components.forms import show_process_form, edit_process_form
+from components.forms import show_process_form, show_import_form, edit_process_form
 from components.visualizations import show_dashboard, show_user_processes, show_results
-from database.supabase_client import init_supabase, get_user_processes
+from database.repository import SupabaseRepository, get_repository
+from database.supabase_client import refresh_session, set_session
 from ai.openai_service import OpenAIService
 
 # Konfiguracja strony
@@ -47,23 +48,40 @@ if "process_data" not in st.session_state:
 if "demo_mode" not in st.session_state:
     st.session_state.demo_mode = False
 
-# Inicjalizacja klienta Supabase
-try:
-    supabase = init_supabase()
-    st.session_state.demo_mode = False
-except ValueError as e:
-    st.session_state.demo_mode = True
-    supabase = None
+# Inicjalizacja repozytorium danych - bez konfiguracji Supabase lokalna baza SQLite (tryb demo)
+repository = get_repository()
+st.session_state.demo_mode = not isinstance(repository, SupabaseRepository)
+if st.session_state.demo_mode and not st.session_state.get("demo_account_ready"):
+    # Konto testowe z ekranu logowania w lokalnej bazie
+    try:
+        repository.create_user(TEST_USER_EMAIL, TEST_USER_PASSWORD)
+    except ValueError:
+        pass
+    st.session_state.demo_account_ready = True
+
+# Zapytania w tym przebiegu skryptu wykonujemy jako zalogowany użytkownik (RLS)
+auth_session = st.session_state.get("auth_session")
+set_session(auth_session)
+if auth_session is not None and auth_session.expiring() and not refresh_session(auth_session, auth_session.access_token):
+    # Sesji nie da się odnowić (np. unieważniony refresh token) - wymagane ponowne logowanie
+    st.session_state.authenticated = False
+    st.session_state.user_data = None
+    st.session_state.auth_session = None
+    set_session(None)
 
 # ======================================
 # 🧪 AUTO-LOGIN dla testowania
 # ======================================
 if DEMO_AUTO_LOGIN and not st.session_state.authenticated:
     st.session_state.authenticated = True
-    st.session_state.user_data = {
-        "id": "demo-user-12345",  # Mock ID dla testów
-        "email": TEST_USER_EMAIL
-    }
+    if st.session_state.demo_mode:
+        # Lokalna baza wymaga istniejącego użytkownika (klucz obcy w processes)
+        st.session_state.user_data, _ = repository.authenticate(TEST_USER_EMAIL, TEST_USER_PASSWORD)
+    else:
+        st.session_state.user_data = {
+            "id": "demo-user-12345",  # Mock ID dla testów
+            "email": TEST_USER_EMAIL
+        }
     # Dodaj informację o trybie testowym
     st.sidebar.info(f"🧪 **TRYB TESTOWY**\nAuto-login: {TEST_USER_EMAIL}")
 # ======================================
@@ -74,6 +92,8 @@ if not st.session_state.authenticated:
 else:
     # Nawigacja
     st.sidebar.title("SmartFlow")
+    if st.session_state.demo_mode:
+        st.sidebar.info("💾 **Tryb demo** - dane w lokalnej bazie SQLite")
     
     # Sprawdź czy są wyniki analizy do wyświetlenia
     if st.session_state.get("current_analysis") and st.session_state.current_analysis.get("ai_analysis"):
@@ -93,6 +113,7 @@ else:
         show_results()
     elif page == "Nowa Analiza":
         show_process_form()
+        show_import_form()
     elif page == "Moje Procesy":
         show_user_processes()
     elif page == "Ustawienia":
@@ -101,6 +122,8 @@ else:
             st.session_state.authenticated = False
             st.session_state.current_page = "auth"
             st.session_state.user_data = None
+            st.session_state.auth_session = None
+            set_session(None)
             st.rerun()
     elif page == "edit_process":
         edit_process_form()
\ No newline at end of file
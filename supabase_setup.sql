@@ -70,7 +70,10 @@ CREATE INDEX idx_profiles_user_id ON profiles(user_id);
 CREATE INDEX idx_processes_user_id ON processes(user_id);
 CREATE INDEX idx_processes_created_at ON processes(created_at DESC);
 CREATE INDEX idx_processes_status ON processes(status) WHERE deleted_at IS NULL;
+-- Używany przez stronicowanie keyset dashboardu (kursor: created_at, id)
 CREATE INDEX idx_processes_active ON processes(user_id, created_at) WHERE deleted_at IS NULL;
+-- Używany przez synchronizację przyrostową (znacznik: updated_at, id), obejmuje usunięte wiersze
+CREATE INDEX idx_processes_changes ON processes(user_id, updated_at, id);
 
 -- Indeksy JSONB
 CREATE INDEX idx_processes_form_data ON processes USING GIN(form_data);
@@ -147,8 +150,247 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql SECURITY DEFINER;
 
+-- Liczba z pola JSONB (liczba albo tekst, np. "1 200 zł"); NULL gdy brak
+CREATE OR REPLACE FUNCTION jsonb_numeric(value JSONB)
+RETURNS NUMERIC AS $$
+    SELECT CASE jsonb_typeof(value)
+        WHEN 'number' THEN (value #>> '{}')::numeric
+        WHEN 'string' THEN replace(substring(replace(value #>> '{}', ' ', '') FROM '-?\d+(?:[.,]\d+)?'), ',', '.')::numeric
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Statystyki dashboardu zalogowanego użytkownika w jednym zapytaniu:
+-- liczby procesów wg statusu, ocena średnia/maksymalna oraz sumy portfela
+-- (te same reguły co analytics/portfolio.py: stawka wg wielkości firmy,
+-- 8h pracy na tydzień wdrożenia, domyślnie 2 tygodnie na rekomendację)
+CREATE OR REPLACE FUNCTION get_process_stats()
+RETURNS JSONB AS $$
+    WITH active AS (
+        SELECT
+            p.id,
+            p.status,
+            p.potential_score,
+            p.ai_analysis,
+            jsonb_numeric(p.ai_analysis->'mozliwe_oszczednosci'->'czas_godziny_miesiecznie') AS hours_saved,
+            jsonb_numeric(p.ai_analysis->'mozliwe_oszczednosci'->'oszczednosci_pieniadze_miesiecznie') AS money_saved,
+            CASE p.form_data->'company'->>'company_size'
+                WHEN '5-10 osób' THEN 120
+                WHEN '26-50 osób' THEN 180
+                ELSE 150
+            END AS hourly_rate,
+            (CASE p.form_data->'process'->>'frequency'
+                WHEN 'codziennie' THEN 21
+                WHEN 'raz w tygodniu' THEN 4.33
+                WHEN 'raz w miesiącu' THEN 1
+            END)
+            * jsonb_numeric(p.form_data->'process'->'duration')
+            * (CASE p.form_data->'process'->>'participants'
+                WHEN '1 osoba' THEN 1
+                WHEN '2-3 osoby' THEN 2.5
+                WHEN '4 lub więcej' THEN 4
+            END) AS monthly_hours
+        FROM processes p
+        WHERE p.user_id = auth.uid() AND p.deleted_at IS NULL
+    ),
+    recommendations AS (
+        SELECT
+            a.id,
+            SUM(COALESCE(jsonb_numeric(r->'koszt_miesiecznie'), 0)) AS tool_cost,
+            SUM(COALESCE(
+                CASE w.m[2]
+                    WHEN 'mies' THEN replace(w.m[1], ',', '.')::numeric * 4.33
+                    WHEN 'dni' THEN replace(w.m[1], ',', '.')::numeric / 7
+                    WHEN 'dzie' THEN replace(w.m[1], ',', '.')::numeric / 7
+                    ELSE replace(w.m[1], ',', '.')::numeric
+                END, 2)) AS weeks
+        FROM active a
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(a.ai_analysis->'rekomendacje') = 'array'
+                 THEN a.ai_analysis->'rekomendacje' ELSE '[]'::jsonb END
+        ) AS r
+        CROSS JOIN LATERAL (
+            SELECT regexp_match(r->>'czas_wdrozenia', '(\d+(?:[.,]\d+)?)\s*(tydz|tyg|mies|dni|dzie)') AS m
+        ) AS w
+        WHERE jsonb_typeof(r) = 'object'
+        GROUP BY a.id
+    ),
+    analyzed AS (
+        SELECT
+            COALESCE(a.hours_saved, 0) AS hours_saved,
+            COALESCE(a.money_saved, COALESCE(a.hours_saved, 0) * a.hourly_rate) AS money_saved,
+            COALESCE(r.tool_cost, 0) AS tool_cost,
+            COALESCE(r.weeks, 0) * 8 * a.hourly_rate AS setup_cost
+        FROM active a
+        LEFT JOIN recommendations r ON r.id = a.id
+        WHERE a.hours_saved IS NOT NULL OR a.money_saved IS NOT NULL
+    )
+    SELECT jsonb_build_object(
+        'total', (SELECT count(*) FROM active),
+        'by_status', (
+            SELECT COALESCE(jsonb_object_agg(status, n), '{}'::jsonb)
+            FROM (SELECT status, count(*) AS n FROM active GROUP BY status) s
+        ),
+        'avg_score', (SELECT round(avg(potential_score), 2) FROM active),
+        'max_score', (SELECT max(potential_score) FROM active),
+        'monthly_hours', (SELECT COALESCE(sum(monthly_hours), 0) FROM active),
+        'analyzed', (SELECT count(*) FROM analyzed),
+        'hours_saved_monthly', (SELECT COALESCE(sum(hours_saved), 0) FROM analyzed),
+        'money_saved_monthly', (SELECT COALESCE(sum(money_saved), 0) FROM analyzed),
+        'tool_cost_monthly', (SELECT COALESCE(sum(tool_cost), 0) FROM analyzed),
+        'setup_cost', (SELECT COALESCE(sum(setup_cost), 0) FROM analyzed)
+    );
+$$ LANGUAGE sql STABLE;
+
+-- Kolumny wyliczane dla widoków listy (PostgREST: select=description_preview,...)
+-- Skrócony opis do 500 znaków, bez ucinania wyrazów
+CREATE OR REPLACE FUNCTION description_preview(processes)
+RETURNS TEXT AS $$
+    SELECT CASE
+        WHEN length($1.description) <= 500 THEN $1.description
+        ELSE regexp_replace(left($1.description, 500), '\s+\S*$', '') || '…'
+    END;
+$$ LANGUAGE sql STABLE;
+
+-- Koszty i czasy wdrożenia rekomendacji (bez opisów) dla kalkulatora portfela
+CREATE OR REPLACE FUNCTION recommendation_costs(processes)
+RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+        'koszt_miesiecznie', r->'koszt_miesiecznie',
+        'czas_wdrozenia', r->'czas_wdrozenia'
+    )), '[]'::jsonb)
+    FROM jsonb_array_elements(
+        CASE WHEN jsonb_typeof($1.ai_analysis->'rekomendacje') = 'array'
+             THEN $1.ai_analysis->'rekomendacje' ELSE '[]'::jsonb END
+    ) AS r;
+$$ LANGUAGE sql STABLE;
+
+-- Zmiany procesów zalogowanego użytkownika po znaczniku (updated_at, id), od najstarszych,
+-- razem z usuniętymi wierszami (deleted_at ustawione = tombstone). SECURITY DEFINER,
+-- bo polityka RLS ukrywa usunięte wiersze - filtr po auth.uid() jest tutaj
+CREATE OR REPLACE FUNCTION get_process_changes(since TIMESTAMPTZ, after_id UUID DEFAULT NULL, max_rows INTEGER DEFAULT 500)
+RETURNS TABLE (
+    id UUID,
+    title VARCHAR,
+    status process_status_enum,
+    potential_score INTEGER,
+    created_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ,
+    deleted_at TIMESTAMPTZ,
+    description_preview TEXT,
+    frequency TEXT,
+    participants TEXT,
+    duration TEXT,
+    company JSONB,
+    improvement_goals JSONB,
+    savings JSONB,
+    recommendation_costs JSONB
+) AS $$
+    SELECT
+        p.id,
+        p.title,
+        p.status,
+        p.potential_score,
+        p.created_at,
+        p.updated_at,
+        p.deleted_at,
+        description_preview(p),
+        p.form_data->'process'->>'frequency',
+        p.form_data->'process'->>'participants',
+        p.form_data->'process'->>'duration',
+        p.form_data->'company',
+        p.form_data->'improvement_goals',
+        p.ai_analysis->'mozliwe_oszczednosci',
+        recommendation_costs(p)
+    FROM processes p
+    WHERE p.user_id = auth.uid()
+      AND (p.updated_at, p.id) > (since, COALESCE(after_id, '00000000-0000-0000-0000-000000000000'::uuid))
+    ORDER BY p.updated_at, p.id
+    LIMIT max_rows;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- =====================================================
+-- 6. WYSZUKIWANIE PEŁNOTEKSTOWE
+-- =====================================================
+
+-- Konfiguracja dla tekstów po polsku: Postgres nie ma wbudowanego słownika
+-- polskiego (stemming wymagałby słowników ispell, niedostępnych w Supabase),
+-- więc bazą jest 'simple', a unaccent pozwala szukać bez polskich znaków
+-- ("zolw" znajduje "żółw")
+CREATE EXTENSION IF NOT EXISTS unaccent;
+-- (CREATE TEXT SEARCH CONFIGURATION nie ma IF NOT EXISTS - stąd blok DO,
+-- żeby skrypt dało się uruchomić ponownie)
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'smartflow_pl') THEN
+        CREATE TEXT SEARCH CONFIGURATION smartflow_pl (COPY = simple);
+    END IF;
+END $$;
+ALTER TEXT SEARCH CONFIGURATION smartflow_pl
+    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple;
+
+-- Nazwy i opisy narzędzi z rekomendacji AI jako tekst do indeksowania
+CREATE OR REPLACE FUNCTION recommendations_text(analysis JSONB)
+RETURNS TEXT AS $$
+    SELECT COALESCE(string_agg(concat_ws(' ', r->>'narzedzie', r->>'opis'), ' '), '')
+    FROM jsonb_array_elements(
+        CASE WHEN jsonb_typeof(analysis->'rekomendacje') = 'array'
+             THEN analysis->'rekomendacje' ELSE '[]'::jsonb END
+    ) AS r
+    WHERE jsonb_typeof(r) = 'object';
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Wektor wyszukiwania: tytuł (waga A), opis (B), rekomendacje AI (C)
+ALTER TABLE processes ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('smartflow_pl'::regconfig, COALESCE(title, '')), 'A') ||
+        setweight(to_tsvector('smartflow_pl'::regconfig, COALESCE(description, '')), 'B') ||
+        setweight(to_tsvector('smartflow_pl'::regconfig, recommendations_text(ai_analysis)), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_processes_search ON processes USING GIN(search_vector);
+
+-- Wyszukiwanie procesów zalogowanego użytkownika, od najtrafniejszych;
+-- kolumny jak w liście dashboardu (PROCESS_LIST_COLUMNS w supabase_client.py)
+CREATE OR REPLACE FUNCTION search_processes(query TEXT, result_limit INTEGER DEFAULT 20, result_offset INTEGER DEFAULT 0)
+RETURNS TABLE (
+    id UUID,
+    title VARCHAR,
+    status process_status_enum,
+    potential_score INTEGER,
+    created_at TIMESTAMPTZ,
+    description_preview TEXT,
+    frequency TEXT,
+    participants TEXT,
+    duration TEXT,
+    company JSONB,
+    improvement_goals JSONB,
+    savings JSONB,
+    recommendation_costs JSONB,
+    rank REAL
+) AS $$
+    SELECT
+        p.id,
+        p.title,
+        p.status,
+        p.potential_score,
+        p.created_at,
+        description_preview(p),
+        p.form_data->'process'->>'frequency',
+        p.form_data->'process'->>'participants',
+        p.form_data->'process'->>'duration',
+        p.form_data->'company',
+        p.form_data->'improvement_goals',
+        p.ai_analysis->'mozliwe_oszczednosci',
+        recommendation_costs(p),
+        ts_rank(p.search_vector, q) AS rank
+    FROM processes p, websearch_to_tsquery('smartflow_pl', query) AS q
+    WHERE p.user_id = auth.uid() AND p.deleted_at IS NULL AND p.search_vector @@ q
+    ORDER BY rank DESC, p.created_at DESC, p.id DESC
+    LIMIT result_limit OFFSET result_offset;
+$$ LANGUAGE sql STABLE;
+
 -- =====================================================
--- 6. TESTOWE DANE (OPCJONALNE)
+-- 7. TESTOWE DANE (OPCJONALNE)
 -- =====================================================
 
 -- Dodaj przykładowe dane tylko jeśli chcesz przetestować strukturę
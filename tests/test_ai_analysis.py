@@ -0,0 +1,43 @@
+"""
+Testy jednostkowe dla modułu src/ai/ai.py (współdzielony uchwyt analizy)
+"""
+import pytest
+from unittest.mock import MagicMock
+
+PROCESS = {
+    "company": {"size": "5-10 osób", "industry": "Handel", "budget": "do 500 zł/miesiąc"},
+    "process": {"name": "Faktury", "frequency": "codziennie", "participants": "1 osoba", "duration": 1, "description": "Ręczne wystawianie"},
+    "improvement_goal": ["szybkość"]
+}
+
+@pytest.fixture
+def ai_module(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    from src.ai import ai
+    ai.invalidate_analysis()
+    message = MagicMock()
+    message.content = '{"ocena_potencjalu": 7, "mozliwe_oszczednosci": {"czas_godziny_miesiecznie": 5}, "rekomendacje": [{"narzedzie": "n8n"}], "plan_wdrozenia": ["Krok 1"]}'
+    client = MagicMock()
+    client.chat.completions.create.return_value.choices = [MagicMock(message=message)]
+    monkeypatch.setattr(ai, "client", client)
+    return ai
+
+def test_full_view_uses_single_completion(ai_module):
+    assert ai_module.analyze_process(PROCESS)["ocena_potencjalu"] == 7
+    assert ai_module.generate_recommendations(PROCESS) == [{"narzedzie": "n8n"}]
+    assert ai_module.calculate_savings(PROCESS) == {"czas_godziny_miesiecznie": 5}
+    assert ai_module.client.chat.completions.create.call_count == 1
+
+def test_changed_input_triggers_new_analysis(ai_module):
+    ai_module.analyze_process(PROCESS)
+    changed = dict(PROCESS, improvement_goal=["mniej błędów"])
+    ai_module.get_analysis(changed).score
+    assert ai_module.client.chat.completions.create.call_count == 2
+    ai_module.invalidate_analysis(PROCESS)
+    ai_module.get_analysis(PROCESS).plan
+    assert ai_module.client.chat.completions.create.call_count == 3
+
+def test_failed_analysis_is_not_memoized(ai_module):
+    ai_module.client.chat.completions.create.side_effect = [RuntimeError("timeout"), ai_module.client.chat.completions.create.return_value]
+    assert ai_module.analyze_process(PROCESS)["ocena_potencjalu"] == 0
+    assert ai_module.analyze_process(PROCESS)["ocena_potencjalu"] == 7
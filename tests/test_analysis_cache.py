@@ -0,0 +1,53 @@
+"""
+Testy jednostkowe dla modułu ai/analysis_cache.py
+"""
+import pytest
+from unittest.mock import MagicMock
+from ai.analysis_cache import AnalysisCache, make_cache_key
+from ai.openai_service import OpenAIService
+
+def test_cache_key_ignores_whitespace_but_not_model():
+    key = make_cache_key("Opis  procesu\n", "gpt-4o-mini", "1")
+    assert key == make_cache_key("Opis procesu", "gpt-4o-mini", "1")
+    assert key != make_cache_key("Opis procesu", "gpt-4", "1")
+    assert key != make_cache_key("Opis procesu", "gpt-4o-mini", "2")
+
+def test_cache_hit_miss_and_persistence(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = AnalysisCache(path=path)
+    assert cache.get("k") is None
+    cache.set("k", {"ocena_potencjalu": 7})
+    assert cache.get("k") == {"ocena_potencjalu": 7}
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    # Nowa instancja (np. po restarcie serwera) widzi te same dane
+    assert AnalysisCache(path=path).get("k") == {"ocena_potencjalu": 7}
+
+def test_cache_lru_eviction(tmp_path):
+    cache = AnalysisCache(path=str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    cache.get("a")
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.stats()["size"] == 2
+
+def test_cache_ttl_expiry(tmp_path, monkeypatch):
+    cache = AnalysisCache(path=str(tmp_path / "cache.sqlite3"), ttl_seconds=10)
+    cache.set("k", {"v": 1})
+    real_time = __import__("time").time
+    monkeypatch.setattr("ai.analysis_cache.time.time", lambda: real_time() + 11)
+    assert cache.get("k") is None
+
+def test_service_serves_repeated_analysis_from_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    service = OpenAIService(cache=AnalysisCache(path=str(tmp_path / "cache.sqlite3")))
+    message = MagicMock()
+    message.content = '{"ocena_potencjalu": 9, "mozliwe_oszczednosci": {}, "rekomendacje": [], "plan_wdrozenia": []}'
+    service.client = MagicMock()
+    service.client.chat.completions.create.return_value.choices = [MagicMock(message=message)]
+    process_data = {"form_data": {"process": {"name": "Faktury"}}}
+    assert service.analyze_process(process_data)["ocena_potencjalu"] == 9
+    assert service.analyze_process(process_data)["ocena_potencjalu"] == 9
+    assert service.client.chat.completions.create.call_count == 1
@@ -0,0 +1,84 @@
+"""
+Testy jednostkowe dla modułu ai/analysis_jobs.py
+"""
+import threading
+import pytest
+from ai.analysis_jobs import AnalysisJobQueue, DONE, FAILED
+from ai.resilience import with_meta
+
+ANALYSIS = {
+    "ocena_potencjalu": 7,
+    "mozliwe_oszczednosci": {"czas_godziny_miesiecznie": 10},
+    "rekomendacje": [],
+    "plan_wdrozenia": ["Krok 1"]
+}
+
+class FakeService:
+    def __init__(self, final, gate=None):
+        self.final = final
+        self.gate = gate
+
+    def analyze_process(self, process_data, stream=False):
+        yield {"ocena_potencjalu": 7}
+        if self.gate:
+            self.gate.wait(5)
+        yield self.final
+
+def test_job_completes_and_saves_result():
+    saved = {}
+    queue = AnalysisJobQueue(
+        max_workers=2,
+        service_factory=lambda: FakeService(with_meta(ANALYSIS, source="live")),
+        on_complete=lambda process_id, analysis: saved.update({process_id: analysis})
+    )
+    queue.submit("p1", {"title": "Faktury"})
+    job = queue.wait("p1", timeout=5)
+    assert job.status == DONE and job.progress == 1.0
+    assert saved["p1"] == ANALYSIS
+    queue.shutdown()
+
+def test_degraded_result_fails_job_without_saving():
+    saved = {}
+    queue = AnalysisJobQueue(
+        max_workers=1,
+        service_factory=lambda: FakeService(with_meta(ANALYSIS, source="mock", degraded=True, reason="timeout")),
+        on_complete=lambda process_id, analysis: saved.update({process_id: analysis})
+    )
+    queue.submit("p1", {})
+    job = queue.wait("p1", timeout=5)
+    assert job.status == FAILED
+    assert "timeout" in job.error
+    assert saved == {}
+    queue.shutdown()
+
+def test_resubmitting_active_job_returns_same_job_and_reports_progress():
+    gate = threading.Event()
+    queue = AnalysisJobQueue(
+        max_workers=1,
+        service_factory=lambda: FakeService(with_meta(ANALYSIS, source="live"), gate),
+        on_complete=lambda process_id, analysis: None
+    )
+    first = queue.submit("p1", {})
+    assert queue.submit("p1", {}) is first
+    gate.set()
+    queue.wait("p1", timeout=5)
+    assert queue.jobs_for(["p1", "p2"]) == {"p1": first}
+    queue.shutdown()
+
+
+def test_running_job_exposes_latest_partial_result():
+    gate = threading.Event()
+    queue = AnalysisJobQueue(
+        max_workers=1,
+        service_factory=lambda: FakeService(with_meta(ANALYSIS, source="live"), gate),
+        on_complete=lambda process_id, analysis: None
+    )
+    job = queue.submit("p1", {})
+    for _ in range(100):
+        if job.partial:
+            break
+        threading.Event().wait(0.01)
+    assert job.partial == {"ocena_potencjalu": 7} and job.active
+    gate.set()
+    assert queue.wait("p1", timeout=5).partial["plan_wdrozenia"] == ["Krok 1"]
+    queue.shutdown()
@@ -0,0 +1,51 @@
+"""
+Testy jednostkowe dla AsyncOpenAIService (analiza wsadowa)
+"""
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from ai.openai_service import AsyncOpenAIService
+
+def make_service(monkeypatch, delays, failing=()):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    service = AsyncOpenAIService(use_cache=False)
+    state = {"active": 0, "peak": 0}
+
+    async def fake_create(**params):
+        name = params["messages"][1]["content"].split("Nazwa: ")[1].split("\n")[0]
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(delays[name])
+        state["active"] -= 1
+        if name in failing:
+            raise RuntimeError("timeout")
+        message = MagicMock()
+        message.content = '{"ocena_potencjalu": %d}' % len(name)
+        return MagicMock(choices=[MagicMock(message=message)])
+
+    service.client = MagicMock()
+    service.client.chat.completions.create = fake_create
+    return service, state
+
+def process(name):
+    return {"form_data": {"process": {"name": name}}}
+
+def test_analyze_many_yields_as_completed_and_bounds_concurrency(monkeypatch):
+    service, state = make_service(monkeypatch, {"a": 0.05, "bb": 0.01, "ccc": 0.03, "dddd": 0.01})
+
+    async def collect():
+        return [item async for item in service.analyze_many(
+            [process("a"), process("bb"), process("ccc"), process("dddd")], max_concurrency=2)]
+
+    items = asyncio.run(collect())
+    assert [item.index for item in items][0] == 1
+    assert sorted(item.index for item in items) == [0, 1, 2, 3]
+    assert state["peak"] <= 2
+
+def test_analyze_many_ordered_reports_failures_without_aborting(monkeypatch):
+    service, _ = make_service(monkeypatch, {"a": 0.02, "bb": 0.0, "ccc": 0.01}, failing=("bb",))
+    items = asyncio.run(service.analyze_many_ordered([process("a"), process("bb"), process("ccc")]))
+    assert [item.index for item in items] == [0, 1, 2]
+    assert items[0].result["ocena_potencjalu"] == 1
+    assert not items[1].ok and "timeout" in items[1].error
+    assert items[2].result["ocena_potencjalu"] == 3
@@ -0,0 +1,77 @@
+"""
+Testy importu procesów z pliku database/bulk_import.py
+"""
+import io
+import json
+from types import SimpleNamespace
+from database import bulk_import
+
+DESCRIPTION = "Wystawianie faktur ręcznie w Excelu, sprawdzanie płatności i wysyłka emailem."
+
+
+def fake_insert(calls):
+    def insert(user_id, processes):
+        calls.append(len(processes))
+        return [f"p{sum(calls) - len(processes) + i}" for i in range(len(processes))]
+    return insert
+
+
+def test_csv_import_streams_in_chunks_and_reports_row_errors():
+    calls = []
+    repository = SimpleNamespace(create_draft_processes=fake_insert(calls))
+    lines = ["name,description,frequency,duration,improvement_goals"]
+    lines += [f"Proces {i},\"{DESCRIPTION}\",codziennie,\"1,5\",szybkość;mniej błędów" for i in range(5)]
+    lines += [f",\"{DESCRIPTION}\",codziennie,2,", "Krótki,za krótki opis,codziennie,2,", f"Zła,\"{DESCRIPTION}\",co godzinę,2,"]
+    stream = io.BytesIO("\n".join(lines).encode("utf-8"))
+
+    report = bulk_import.import_processes("user-1", stream, "csv", chunk_size=2, repository=repository)
+
+    assert calls == [2, 2, 1]
+    assert report.rows == 8 and report.imported == 5
+    assert [error.line for error in report.errors] == [7, 8, 9]
+    assert "nazwę" in report.errors[0].message and "min. 50" in report.errors[1].message
+    assert "częstotliwość" in report.errors[2].message
+
+
+def test_jsonl_import_queues_analyses_and_keeps_going_after_failed_chunk():
+    def insert(user_id, processes):
+        if processes[0]["title"] == "Zły zapis":
+            raise ValueError("timeout")
+        return [f"id-{p['title']}" for p in processes]
+
+    submitted = []
+
+    class Jobs:
+        def submit(self, process_id, process_data):
+            submitted.append((process_id, process_data["form_data"]["process"]["duration"]))
+    records = [
+        {"title": "Zły zapis", "description": DESCRIPTION},
+        {"name": "A", "description": DESCRIPTION, "duration": 3},
+        "nie obiekt"
+    ]
+    stream = io.StringIO("\n".join(json.dumps(r) for r in records) + "\n{zepsuty\n")
+
+    report = bulk_import.import_processes("user-1", stream, "jsonl", chunk_size=1, analyze=True, jobs=Jobs(),
+                                          repository=SimpleNamespace(create_draft_processes=insert))
+
+    assert report.process_ids == ["id-A"] and submitted == [("id-A", 3)] and report.queued == 1
+    assert [error.line for error in report.errors] == [1, 3, 4]
+    assert "timeout" in report.errors[0].message
+
+
+def test_undecodable_or_malformed_file_keeps_saved_rows_and_reports_file_error():
+    calls = []
+    repository = SimpleNamespace(create_draft_processes=fake_insert(calls))
+    ascii_description = "Wystawianie faktur recznie w Excelu i wysylka emailem do klientow."
+    rows = [f"Proces {i},{ascii_description}" for i in range(300)]
+    cp1250 = "\n".join(["name,description"] + rows + [f"Księgowość,\"{DESCRIPTION}\""]).encode("cp1250")
+
+    report = bulk_import.import_processes("user-1", io.BytesIO(cp1250), "csv", chunk_size=10, repository=repository)
+
+    assert report.file_error and "UTF-8" in report.file_error
+    assert 0 < report.imported == sum(calls) == report.rows < 300
+
+    malformed = io.StringIO("\n".join(["name,description"] + rows[:3] + ["Duży,\"" + "x" * 200000 + "\""]))
+    report = bulk_import.import_processes("user-1", malformed, "csv", chunk_size=10, repository=repository)
+
+    assert report.imported == 3 and "field limit" in report.file_error
@@ -0,0 +1,197 @@
+"""
+Testy lokalnego serwera tools/fake_services.py (OpenAI + Supabase)
+"""
+import pytest
+from tools.fake_services import LatencyModel, ErrorInjector, start_in_thread
+from ai.openai_service import OpenAIService
+from ai.resilience import RetryPolicy, is_degraded
+from database import supabase_client
+from database.process_cache import get_process_cache
+from database.repository import set_repository
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    server, base_url = start_in_thread(seed=1)
+    monkeypatch.setenv("OPENAI_BASE_URL", f"{base_url}/v1")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-fake")
+    monkeypatch.setenv("SUPABASE_URL", base_url)
+    monkeypatch.setenv("SUPABASE_ANON_KEY", "fake.fake.fake")
+    get_process_cache().clear()
+    # Repozytorium wybierane od nowa - z SUPABASE_URL będzie to Supabase (serwer testowy)
+    set_repository(None)
+    yield server
+    set_repository(None)
+    server.shutdown()
+
+PROCESS = {"title": "Faktury", "description": "Wystawianie faktur ręcznie w Excelu i wysyłka emailem do klientów co tydzień."}
+
+def test_latency_and_errors_are_deterministic_with_seed():
+    import random
+    first = [LatencyModel("uniform:10:20", random.Random(3)).sample() for _ in range(3)]
+    second = [LatencyModel("uniform:10:20", random.Random(3)).sample() for _ in range(3)]
+    assert first == second and all(0.01 <= value <= 0.02 for value in first)
+    assert ErrorInjector("500=1.0").draw() == "500"
+    assert ErrorInjector("").draw() is None
+
+def test_openai_analysis_and_stream(fake_server):
+    service = OpenAIService(use_cache=False)
+    result = service.analyze_process(PROCESS)
+    assert result["ocena_potencjalu"] == 8
+    assert result["_meta"]["source"] == "live"
+
+    partials = list(service.analyze_process(dict(PROCESS, title="Stream"), stream=True))
+    assert len(partials) > 1
+    assert partials[-1]["plan_wdrozenia"]
+
+def test_openai_error_injection_degrades(fake_server):
+    fake_server.state.openai_errors = ErrorInjector("500=1.0")
+    service = OpenAIService(use_cache=False, retry_policy=RetryPolicy(max_attempts=2, base_delay=0))
+    before = fake_server.state.requests
+    result = service.analyze_process(dict(PROCESS, title="Błąd"))
+    assert is_degraded(result)
+    assert fake_server.state.requests - before == 2
+
+def test_postgrest_roundtrip(fake_server):
+    process_id = supabase_client.save_process("user-1", {**PROCESS, "ai_analysis": {"ocena_potencjalu": 6}})
+    supabase_client.save_process("user-2", {**PROCESS, "ai_analysis": {"ocena_potencjalu": 3}})
+    processes = supabase_client.get_user_processes("user-1")
+    assert [p["id"] for p in processes] == [process_id]
+    assert processes[0]["potential_score"] == 6
+
+    assert supabase_client.delete_process(process_id, "user-1")
+    client = supabase_client.init_supabase()
+    active = client.table("processes").select("id").eq("user_id", "user-1").is_("deleted_at", "null").execute()
+    assert active.data == []
+
+def test_keyset_pagination_walks_all_rows_once(fake_server):
+    ids = [supabase_client.save_process("user-p", {**PROCESS, "ai_analysis": {"ocena_potencjalu": 5}}) for _ in range(7)]
+    supabase_client.save_process("user-other", {**PROCESS, "ai_analysis": {"ocena_potencjalu": 5}})
+    seen, cursor, pages = [], None, 0
+    while True:
+        page, cursor = supabase_client.get_user_processes_page("user-p", limit=3, cursor=cursor)
+        seen.extend(row["id"] for row in page)
+        pages += 1
+        if cursor is None:
+            break
+    assert pages == 3
+    assert sorted(seen) == sorted(ids) and len(seen) == len(set(seen))
+
+def test_list_page_is_projected_and_details_load_on_demand(fake_server):
+    analysis = {
+        "ocena_potencjalu": 7,
+        "mozliwe_oszczednosci": {"czas_godziny_miesiecznie": 12, "oszczednosci_pieniadze_miesiecznie": 1800},
+        "rekomendacje": [{"narzedzie": "Zapier", "opis": "x" * 400, "koszt_miesiecznie": 100, "czas_wdrozenia": "2 tygodnie"}],
+        "plan_wdrozenia": ["Krok 1"]
+    }
+    long_description = "ręczne przepisywanie faktur " * 40
+    process_id = supabase_client.save_process("user-s", {**PROCESS, "description": long_description, "ai_analysis": analysis})
+
+    rows, cursor = supabase_client.get_user_processes_page("user-s")
+    assert cursor is None and rows[0]["summary"]
+    row = rows[0]
+    assert "description" not in row and row["description_preview"].endswith("…")
+    assert len(row["description_preview"]) <= 501
+    assert row["ai_analysis"]["rekomendacje"] == [{"koszt_miesiecznie": 100, "czas_wdrozenia": "2 tygodnie"}]
+    assert row["ai_analysis"]["mozliwe_oszczednosci"]["czas_godziny_miesiecznie"] == 12
+
+    details = supabase_client.get_process(process_id)
+    assert details["description"] == long_description
+    assert details["ai_analysis"] == analysis
+
+def test_process_stats_rpc_returns_counts_and_portfolio_totals(fake_server):
+    from analytics.portfolio import portfolio_summary, totals_from_stats
+    session = supabase_client.create_auth_client().auth.sign_up({"email": "stats@example.com", "password": "haslo-123"})
+    user_id = session.user.id
+    supabase_client.set_access_token(session.session.access_token)
+    try:
+        form_data = {"company": {"company_size": "11-25 osób"}, "process": {"frequency": "codziennie", "participants": "1 osoba", "duration": 2}}
+        analysis = {
+            "ocena_potencjalu": 8,
+            "mozliwe_oszczednosci": {"czas_godziny_miesiecznie": 20, "oszczednosci_pieniadze_miesiecznie": 3000},
+            "rekomendacje": [{"narzedzie": "Zapier", "koszt_miesiecznie": 100, "czas_wdrozenia": "1 miesiąc"}]
+        }
+        supabase_client.save_process(user_id, {**PROCESS, "form_data": form_data, "ai_analysis": analysis})
+        supabase_client.create_draft_process(user_id, {**PROCESS, "form_data": form_data})
+        supabase_client.save_process("someone-else", {**PROCESS, "ai_analysis": analysis})
+
+        stats = supabase_client.get_process_stats()
+        assert stats["total"] == 2 and stats["by_status"] == {"analyzed": 1, "draft": 1}
+        assert stats["avg_score"] == 8 and stats["max_score"] == 8
+        rows = supabase_client.get_user_processes(user_id)
+        assert totals_from_stats(stats) == portfolio_summary(rows)
+    finally:
+        supabase_client.set_access_token(None)
+
+def test_search_processes_ranks_title_matches_first(fake_server):
+    session = supabase_client.create_auth_client().auth.sign_up({"email": "search@example.com", "password": "haslo-123"})
+    user_id = session.user.id
+    supabase_client.set_access_token(session.session.access_token)
+    try:
+        in_title = supabase_client.save_process(user_id, {"title": "Faktury sprzedażowe", "description": "Ręczne wystawianie dokumentów."})
+        in_tools = supabase_client.save_process(user_id, {
+            "title": "Zamówienia", "description": "Przepisywanie zamówień z emaili.",
+            "ai_analysis": {"rekomendacje": [{"narzedzie": "Zapier", "opis": "Automatyczne faktury z zamówień"}]}
+        })
+        supabase_client.save_process(user_id, {"title": "Urlopy", "description": "Wnioski urlopowe w arkuszu."})
+        supabase_client.save_process("someone-else", {"title": "Faktury", "description": "Cudze faktury."})
+
+        rows, has_more = supabase_client.search_processes("faktury")
+        assert [row["id"] for row in rows] == [in_title, in_tools] and not has_more
+        assert rows[0]["summary"] and "description" not in rows[0]
+
+        # Bez polskich znaków i z wykluczeniem
+        rows, _ = supabase_client.search_processes("sprzedazowe")
+        assert [row["id"] for row in rows] == [in_title]
+        rows, _ = supabase_client.search_processes("faktury -zapier")
+        assert [row["id"] for row in rows] == [in_title]
+
+        rows, has_more = supabase_client.search_processes("faktury", limit=1)
+        assert len(rows) == 1 and has_more
+    finally:
+        supabase_client.set_access_token(None)
+
+def test_delta_sync_transfers_only_changed_rows(fake_server):
+    from database.sync import load_snapshot, sync_snapshot
+    session = supabase_client.create_auth_client().auth.sign_up({"email": "sync@example.com", "password": "haslo-123"})
+    user_id = session.user.id
+    supabase_client.set_access_token(session.session.access_token)
+    try:
+        kept = supabase_client.save_process(user_id, {**PROCESS, "ai_analysis": {"ocena_potencjalu": 5}})
+        removed = supabase_client.save_process(user_id, {**PROCESS, "ai_analysis": {"ocena_potencjalu": 4}})
+        snapshot = load_snapshot(user_id, 20)
+        assert set(snapshot.rows) == {kept, removed}
+
+        assert supabase_client.soft_delete_process(removed)
+        supabase_client.update_process(kept, {"title": "Nowa nazwa"})
+        added = supabase_client.save_process(user_id, PROCESS)
+
+        assert sync_snapshot(snapshot) == 3
+        assert set(snapshot.rows) == {kept, added}
+        assert snapshot.rows[kept]["title"] == "Nowa nazwa"
+        assert sync_snapshot(snapshot) == 0
+    finally:
+        supabase_client.set_access_token(None)
+
+def test_expired_session_is_refreshed_and_keeps_user_scope(fake_server):
+    from database.repository import get_repository
+    repository = get_repository()
+    repository.create_user("refresh@example.com", "haslo-123")
+    user, session = repository.authenticate("refresh@example.com", "haslo-123")
+    assert session.refresh_token
+    supabase_client.set_session(session)
+    try:
+        process_id = supabase_client.save_process(user["id"], PROCESS)
+        # JWT odrzucony przez PostgREST (401) - odświeżenie i ponowienie zapytania
+        first_token = session.access_token
+        fake_server.state.expired_tokens.add(first_token)
+        assert [p["id"] for p in supabase_client.get_user_processes(user["id"])] == [process_id]
+        assert session.access_token != first_token
+        # Token tuż przed wygaśnięciem - odświeżany z wyprzedzeniem
+        second_token, session.expires_at = session.access_token, 0
+        assert supabase_client.get_access_token() not in (None, second_token)
+        assert supabase_client.get_process_stats()["total"] == 1
+        # Unieważniony refresh token - sesji nie da się odnowić
+        fake_server.state.refresh_tokens.clear()
+        assert not supabase_client.refresh_session(session)
+    finally:
+        supabase_client.set_session(None)
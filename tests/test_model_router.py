@@ -0,0 +1,42 @@
+"""
+Testy jednostkowe dla modułu ai/model_router.py
+"""
+import pytest
+from unittest.mock import MagicMock
+from ai.model_router import ModelRouter, TRUNCATED, INVALID_SCHEMA
+from ai.response_parser import parse_response
+
+VALID = '{"ocena_potencjalu": 7, "mozliwe_oszczednosci": {}, "rekomendacje": [], "plan_wdrozenia": []}'
+
+def test_complex_process_starts_on_stronger_tier():
+    router = ModelRouter(tiers=["mini", "big"], complex_description_chars=100, complex_goals=3)
+    simple = {"form_data": {"process": {"description": "krótki", "participants": "1 osoba"}, "improvement_goals": ["szybkość"]}}
+    assert router.initial_tier(simple) == 0
+    assert router.initial_tier({"form_data": {"process": {"participants": "4 lub więcej"}}}) == 1
+    assert router.initial_tier({"form_data": {"process": {"description": "x" * 101}}}) == 1
+    assert ModelRouter(tiers=["mini"]).initial_tier({"form_data": {"process": {"participants": "4 lub więcej"}}}) == 0
+
+def test_escalation_reasons():
+    router = ModelRouter(tiers=["mini", "big"])
+    assert router.escalation_reason(parse_response(VALID)) is None
+    assert router.escalation_reason(parse_response(VALID), finish_reason="length") == TRUNCATED
+    assert router.escalation_reason(parse_response(VALID[:40])) == TRUNCATED
+    assert router.escalation_reason(parse_response('{"ocena_potencjalu": 42}')) == INVALID_SCHEMA
+
+def test_service_escalates_invalid_answer_to_next_tier(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    from ai.openai_service import OpenAIService
+
+    def completion(content):
+        choice = MagicMock(finish_reason="stop")
+        choice.message.content = content
+        return MagicMock(choices=[choice])
+
+    service = OpenAIService(use_cache=False, router=ModelRouter(tiers=["mini", "big"]))
+    service.client = MagicMock()
+    service.client.chat.completions.create.side_effect = [completion('{"ocena_potencjalu": 42}'), completion(VALID)]
+    result = service.analyze_process({"form_data": {"process": {"name": "Eskalacja"}}})
+    models = [call.kwargs["model"] for call in service.client.chat.completions.create.call_args_list]
+    assert models == ["mini", "big"]
+    assert result["_meta"]["model"] == "big"
+    assert result["_meta"]["escalations"] == ["mini: invalid_schema"]
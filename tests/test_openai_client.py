@@ -0,0 +1,38 @@
+"""
+Testy jednostkowe dla modułu ai/client.py
+"""
+import asyncio
+from ai.client import aclose_async_clients, get_async_openai_client, get_openai_client
+
+def test_sync_client_is_shared_per_configuration(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("OPENAI_MAX_CONNECTIONS", "7")
+    first = get_openai_client()
+    assert get_openai_client() is first
+    assert first.max_retries == 0
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://localhost:9/v1")
+    assert get_openai_client() is not first
+
+def test_async_client_is_shared_within_event_loop(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    async def two_clients():
+        return get_async_openai_client(), get_async_openai_client()
+
+    first, second = asyncio.run(two_clients())
+    assert first is second
+    third, _ = asyncio.run(two_clients())
+    assert third is not first
+
+
+def test_async_clients_are_closed_before_loop_ends(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    async def use_and_close():
+        client = get_async_openai_client()
+        await aclose_async_clients()
+        return client, get_async_openai_client()
+
+    closed, fresh = asyncio.run(use_and_close())
+    assert closed.is_closed() and not fresh.is_closed()
+    assert fresh is not closed
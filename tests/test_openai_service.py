@@ -35,7 +35,55 @@ def test_get_process_summary_success():
     mock_response = type('obj', (object,), {
         'choices': [type('obj', (object,), {'message': type('obj', (object,), {'content': 'Podsumowanie procesu...'})})]
     })
-    with patch('openai.ChatCompletion.create', return_value=mock_response):
+    with patch.object(openai_service, 'get_openai_client') as mock_client:
+        mock_client.return_value.chat.completions.create.return_value = mock_response
         summary = openai_service.get_process_summary(process_data)
         assert isinstance(summary, str)
-        assert 'Podsumowanie' in summary or len(summary) > 0 
\ No newline at end of file
+        assert 'Podsumowanie' in summary or len(summary) > 0 
+
+def test_extract_complete_fields_from_partial_stream():
+    from ai.response_parser import extract_complete_fields
+    partial = '```json\n{"ocena_potencjalu": 8, "mozliwe_oszczednosci": {"czas_godziny_miesiecznie": 10}, "rekomendacje": [{"narzedzie": "Zapier"}, {"narzedzie": "Air'
+    fields = extract_complete_fields(partial)
+    assert fields == {
+        "ocena_potencjalu": 8,
+        "mozliwe_oszczednosci": {"czas_godziny_miesiecznie": 10},
+        "rekomendacje": [{"narzedzie": "Zapier"}]
+    }
+    assert extract_complete_fields('{"ocena_potencjalu": 1') == {}
+
+def test_analyze_process_stream_yields_partial_results(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    service = openai_service.OpenAIService(use_cache=False)
+    pieces = ['{"ocena_potencjalu": 7,', ' "rekomendacje": [{"narzedzie": "n8n"}', ', {"narzedzie": "Make"}],', ' "mozliwe_oszczednosci": {}, "plan_wdrozenia": []}']
+    chunks = [type('obj', (object,), {'choices': [type('obj', (object,), {'finish_reason': None, 'delta': type('obj', (object,), {'content': p})})]}) for p in pieces]
+    with patch.object(service.client.chat.completions, 'create', return_value=iter(chunks)):
+        results = list(service.analyze_process({'form_data': {}}, stream=True))
+    assert results[0] == {"ocena_potencjalu": 7}
+    assert results[1]["rekomendacje"] == [{"narzedzie": "n8n"}]
+    assert results[-1]["rekomendacje"] == [{"narzedzie": "n8n"}, {"narzedzie": "Make"}]
+
+def test_get_process_summaries_batches_and_retries_only_missing():
+    from unittest.mock import MagicMock
+    import json
+    processes = [{'title': f'Proces {i}', 'description': 'Opis ' * 20} for i in range(3)]
+    def reply(content):
+        return type('obj', (object,), {'choices': [type('obj', (object,), {'message': type('obj', (object,), {'content': content})})]})
+    client = MagicMock()
+    # Pierwsza odpowiedź ucięta - brakuje p2; druga runda wysyła tylko brakujący proces
+    client.chat.completions.create.side_effect = [
+        reply('{"p0": "Podsumowanie 0", "p1": "Podsumowanie 1", "p2": "Podsum'),
+        reply(json.dumps({"p0": "Podsumowanie 2"}))
+    ]
+    summaries = openai_service.get_process_summaries(processes, client=client)
+    assert summaries == ["Podsumowanie 0", "Podsumowanie 1", "Podsumowanie 2"]
+    assert client.chat.completions.create.call_count == 2
+    retry_prompt = client.chat.completions.create.call_args.kwargs['messages'][1]['content']
+    assert 'Proces 2' in retry_prompt and 'Proces 0' not in retry_prompt
+
+def test_pack_summary_batches_respects_token_budget():
+    texts = ['x' * 4000] * 5
+    batches = openai_service.pack_summary_batches(texts, token_budget=3000)
+    assert [index for batch in batches for index in batch] == list(range(5))
+    assert all(len(batch) <= 2 for batch in batches)
+    assert openai_service.pack_summary_batches(['x' * 40000]) == [[0]]
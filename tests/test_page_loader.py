@@ -0,0 +1,42 @@
+"""
+Testy równoległego wczytywania danych strony database/page_loader.py
+"""
+import time
+import pytest
+from database import supabase_client
+from database.page_loader import PageLoader
+
+@pytest.fixture
+def loader():
+    loader = PageLoader(max_workers=4, deadline=2)
+    yield loader
+    loader.shutdown()
+
+def slow(value, seconds=0.2):
+    def source():
+        time.sleep(seconds)
+        return value
+    return source
+
+def test_sources_run_in_parallel_with_callers_token(loader):
+    supabase_client.set_access_token("token-uzytkownika")
+    try:
+        data = loader.load({
+            "profile": slow("profil"),
+            "processes": slow(["p1"]),
+            "stats": slow({"total": 1}),
+            "token": supabase_client.get_access_token
+        })
+    finally:
+        supabase_client.set_access_token(None)
+    assert data.complete and data.elapsed < 0.5
+    assert data.get("processes") == ["p1"] and data.get("token") == "token-uzytkownika"
+
+def test_deadline_returns_partial_data_and_errors(loader, caplog):
+    def broken():
+        raise ValueError("baza niedostępna")
+    data = loader.load({"fast": slow(1, 0), "slow": slow(2, 1), "broken": broken}, deadline=0.2)
+    assert data.ready("fast") and not data.ready("slow") and not data.complete
+    assert data.timed_out == ["slow"] and data.errors == {"broken": "baza niedostępna"}
+    assert data.elapsed < 0.5
+    assert "baza niedostępna" in caplog.text and "slow" in caplog.text
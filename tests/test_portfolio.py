@@ -0,0 +1,53 @@
+"""
+Testy jednostkowe dla modułu analytics/portfolio.py
+"""
+import math
+from analytics.portfolio import compute_portfolio, numeric_value, portfolio_frame, portfolio_summary
+
+ANALYZED = {
+    "form_data": {"process": {"frequency": "codziennie", "participants": "2-3 osoby", "duration": 2.0}},
+    "ai_analysis": {
+        "mozliwe_oszczednosci": {"czas_godziny_miesiecznie": 16, "oszczednosci_pieniadze_miesiecznie": 2400},
+        "rekomendacje": [
+            {"koszt_miesiecznie": 300, "czas_wdrozenia": "2 tygodnie"},
+            {"koszt_miesiecznie": 100, "czas_wdrozenia": "1 miesiąc"}
+        ]
+    }
+}
+DRAFT = {"form_data": {"process": {"frequency": "raz w tygodniu", "participants": "1 osoba", "duration": 1.0}}}
+
+def test_portfolio_totals_and_payback():
+    totals = portfolio_summary([ANALYZED, DRAFT])
+    assert totals["processes"] == 2 and totals["analyzed"] == 1
+    # 21 * 2h * 2.5 osoby + 4.33 * 1h * 1 osoba
+    assert math.isclose(totals["monthly_hours"], 105 + 4.33)
+    assert totals["tool_cost_monthly"] == 400
+    assert totals["net_monthly"] == 2000
+    # Wdrożenie: (2 + 4.33 tygodnia) * 8h * 150 zł
+    assert math.isclose(totals["setup_cost"], 6.33 * 8 * 150)
+    assert math.isclose(totals["payback_months"], totals["setup_cost"] / 2000)
+
+def test_per_process_columns_are_vectorized():
+    result = compute_portfolio(portfolio_frame([ANALYZED, DRAFT, {"ai_analysis": "nie-json"}]))
+    assert list(result["analyzed"]) == [True, False, False]
+    assert math.isinf(result["payback_months"][1])
+
+def test_empty_portfolio():
+    totals = portfolio_summary([])
+    assert totals["processes"] == 0 and math.isinf(totals["payback_months"])
+
+
+def test_text_amounts_are_parsed_like_jsonb_numeric():
+    process = {
+        "form_data": {"process": {"frequency": "codziennie", "participants": "1 osoba", "duration": "1,5"}},
+        "ai_analysis": {
+            "mozliwe_oszczednosci": {"czas_godziny_miesiecznie": "20 h", "oszczednosci_pieniadze_miesiecznie": "1 200 zł"},
+            "rekomendacje": [{"koszt_miesiecznie": "100 zł"}, {"koszt_miesiecznie": "brak"}, {"koszt_miesiecznie": True}]
+        }
+    }
+    totals = portfolio_summary([process])
+    assert math.isclose(totals["monthly_hours"], 21 * 1.5)
+    assert totals["hours_saved_monthly"] == 20 and totals["money_saved_monthly"] == 1200
+    assert totals["tool_cost_monthly"] == 100
+    assert numeric_value("1 200 zł") == 1200 and numeric_value(7) == 7
+    assert math.isnan(numeric_value(None)) and math.isnan(numeric_value("brak"))
@@ -0,0 +1,38 @@
+"""
+Testy jednostkowe dla modułu analytics/prescore.py
+"""
+from analytics.prescore import prescore, prescore_many, prescore_rows
+
+MANUAL_DAILY = {
+    "form_data": {
+        "company": {"company_size": "11-25 osób"},
+        "process": {
+            "frequency": "codziennie",
+            "participants": "2-3 osoby",
+            "duration": 2.0,
+            "description": "1. Otrzymuję zamówienie przez email\n2. Sprawdzam stan w Excelu\n3. Tworzę fakturę ręcznie"
+        },
+        "improvement_goals": ["szybkość"]
+    }
+}
+
+RARE_SHORT = {
+    "form_data": {
+        "process": {"frequency": "raz w miesiącu", "participants": "1 osoba", "duration": 0.5, "description": "Spotkanie zespołu."}
+    }
+}
+
+def test_prescore_has_analysis_shape_and_ranks_manual_work_higher():
+    high = prescore(MANUAL_DAILY)
+    low = prescore(RARE_SHORT)
+    assert 1 <= low["ocena_potencjalu"] < high["ocena_potencjalu"] <= 10
+    assert high["mozliwe_oszczednosci"]["czas_godziny_miesiecznie"] > low["mozliwe_oszczednosci"]["czas_godziny_miesiecznie"]
+    # 2h * 21 dni * 2.5 osoby = 105h miesięcznie; oszczędność to tylko część tego czasu
+    assert 0 < high["mozliwe_oszczednosci"]["czas_godziny_miesiecznie"] < 105
+
+def test_prescore_many_matches_single_and_handles_db_rows():
+    rows = [dict(MANUAL_DAILY, id="a"), dict(RARE_SHORT, id="b"), {"id": "c", "description": "krótko"}]
+    scores = prescore_many(rows)
+    assert list(scores["ocena_potencjalu"][:2]) == [prescore(MANUAL_DAILY)["ocena_potencjalu"], prescore(RARE_SHORT)["ocena_potencjalu"]]
+    assert set(prescore_rows(rows)) == {"a", "b", "c"}
+    assert prescore_many([])["ocena_potencjalu"].size == 0
@@ -0,0 +1,70 @@
+"""
+Testy pamięci procesów database/process_cache.py
+"""
+from database.process_cache import ProcessCache
+
+def counting_loader(rows, cursor=None):
+    calls = []
+    def load():
+        calls.append(1)
+        return [dict(row) for row in rows], cursor
+    return load, calls
+
+def test_page_is_loaded_once_until_invalidated():
+    cache = ProcessCache(ttl=60)
+    load, calls = counting_loader([{"id": "a"}, {"id": "b"}])
+    for _ in range(3):
+        rows, _ = cache.get_page("token", "user-1", 20, None, load)
+    assert len(calls) == 1 and [row["id"] for row in rows] == ["a", "b"]
+
+    # Zapis innego użytkownika nie unieważnia strony
+    cache.invalidate_user("user-2")
+    cache.get_page("token", "user-1", 20, None, load)
+    assert len(calls) == 1
+
+    cache.invalidate_user("user-1")
+    cache.get_page("token", "user-1", 20, None, load)
+    assert len(calls) == 2
+
+def test_deleted_process_disappears_without_reload():
+    cache = ProcessCache(ttl=60)
+    load, calls = counting_loader([{"id": "a"}, {"id": "b"}], ("2024-01-01", "b"))
+    cache.get_page("token", "user-1", 2, None, load)
+    cache.invalidate_process("a", deleted=True)
+    rows, cursor = cache.get_page("token", "user-1", 2, None, load)
+    assert len(calls) == 1
+    assert [row["id"] for row in rows] == ["b"] and cursor == ("2024-01-01", "b")
+
+    cache.invalidate_process("b")
+    cache.get_page("token", "user-1", 2, None, load)
+    assert len(calls) == 2
+
+def test_process_rows_are_scoped_copied_and_expire():
+    cache = ProcessCache(ttl=60)
+    calls = []
+    def load():
+        calls.append(1)
+        return {"id": "a", "form_data": {"improvement_goals": []}}
+    row = cache.get_process("token-1", "a", load)
+    row["form_data"]["improvement_goals"].append("zmiana")
+    assert cache.get_process("token-1", "a", load)["form_data"]["improvement_goals"] == []
+    cache.get_process("token-2", "a", load)
+    assert len(calls) == 2
+
+    expired = ProcessCache(ttl=0)
+    expired.get_process("token-1", "a", load)
+    expired.get_process("token-1", "a", load)
+    assert len(calls) == 4
+
+def test_read_started_before_write_is_not_cached():
+    cache = ProcessCache(ttl=60)
+    calls = []
+    def load():
+        calls.append(1)
+        if len(calls) == 1:
+            # Zapis w trakcie odczytu - stary wynik nie może trafić do pamięci
+            cache.invalidate_process("a")
+        return [{"id": "a"}], None
+    cache.get_page("token", "user-1", 20, None, load)
+    cache.get_page("token", "user-1", 20, None, load)
+    assert len(calls) == 2
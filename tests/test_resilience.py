@@ -0,0 +1,67 @@
+"""
+Testy jednostkowe dla modułu ai/resilience.py
+"""
+import httpx
+import openai
+import pytest
+from unittest.mock import MagicMock
+from ai import resilience
+from ai.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_resilience
+
+def make_status_error(error_class, status, headers=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return error_class("błąd", response=response, body=None)
+
+def test_classify_error():
+    assert resilience.classify_error(make_status_error(openai.RateLimitError, 429)) == resilience.RATE_LIMIT
+    assert resilience.classify_error(make_status_error(openai.InternalServerError, 503)) == resilience.SERVER_ERROR
+    assert resilience.classify_error(make_status_error(openai.AuthenticationError, 401)) == resilience.AUTH
+    assert resilience.classify_error(ValueError()) == resilience.UNKNOWN
+
+def test_retry_honors_retry_after_and_skips_non_retryable():
+    policy = RetryPolicy(max_attempts=3, max_delay=8)
+    assert policy.delay(1, make_status_error(openai.RateLimitError, 429, {"retry-after": "2"})) == 2
+    assert policy.delay(1, make_status_error(openai.RateLimitError, 429, {"retry-after": "60"})) is None
+    assert policy.delay(1, make_status_error(openai.AuthenticationError, 401)) is None
+    assert policy.delay(3, make_status_error(openai.InternalServerError, 500)) is None
+
+def test_call_with_resilience_retries_then_succeeds():
+    fn = MagicMock(side_effect=[make_status_error(openai.InternalServerError, 502), "ok"])
+    sleeps = []
+    result, attempts = call_with_resilience(fn, RetryPolicy(), CircuitBreaker(), sleep=sleeps.append)
+    assert (result, attempts) == ("ok", 2)
+    assert len(sleeps) == 1
+
+def test_circuit_breaker_fails_fast_when_open():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+    fn = MagicMock(side_effect=make_status_error(openai.InternalServerError, 500))
+    for _ in range(2):
+        with pytest.raises(openai.InternalServerError):
+            call_with_resilience(fn, RetryPolicy(max_attempts=1), breaker)
+    with pytest.raises(CircuitOpenError):
+        call_with_resilience(fn, RetryPolicy(max_attempts=1), breaker)
+    assert fn.call_count == 2
+
+def test_half_open_trial_with_non_retryable_error_closes_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+    with pytest.raises(openai.InternalServerError):
+        call_with_resilience(MagicMock(side_effect=make_status_error(openai.InternalServerError, 500)),
+                             RetryPolicy(max_attempts=1), breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(openai.BadRequestError):
+        call_with_resilience(MagicMock(side_effect=make_status_error(openai.BadRequestError, 400)),
+                             RetryPolicy(max_attempts=1), breaker)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert call_with_resilience(MagicMock(return_value="ok"), RetryPolicy(max_attempts=1), breaker) == ("ok", 1)
+
+def test_service_marks_fallback_as_degraded(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    from ai.openai_service import OpenAIService
+    service = OpenAIService(use_cache=False, retry_policy=RetryPolicy(max_attempts=1))
+    service.client = MagicMock()
+    service.client.chat.completions.create.side_effect = make_status_error(openai.AuthenticationError, 401)
+    result = service.analyze_process({"form_data": {"process": {"name": "Test degraded"}}})
+    assert resilience.is_degraded(result)
+    assert result["_meta"]["reason"] == resilience.AUTH
+    assert "_meta" not in resilience.strip_meta(result)
@@ -0,0 +1,46 @@
+"""
+Testy jednostkowe dla modułu ai/response_parser.py
+"""
+import pytest
+from ai.response_parser import IncrementalJSONParser, parse_response
+
+FULL = '{"ocena_potencjalu": 8, "mozliwe_oszczednosci": {"czas_godziny_miesiecznie": 16}, "rekomendacje": [{"narzedzie": "Zapier", "opis": "Cudzysłów \\" i {nawias}"}, {"narzedzie": "Airtable"}], "plan_wdrozenia": ["Krok 1"]}'
+
+def test_parse_complete_response_with_markdown_fence():
+    result = parse_response("Oto analiza:\n```json\n" + FULL + "\n```")
+    assert result.complete and not result.truncated
+    assert result.data["rekomendacje"][0]["opis"] == 'Cudzysłów " i {nawias}'
+
+def test_parse_truncated_response_salvages_longest_valid_prefix():
+    truncated = FULL[:FULL.index('{"narzedzie": "Airtable"}') + 10]
+    result = parse_response(truncated)
+    assert result.truncated and not result.complete
+    assert result.data == {
+        "ocena_potencjalu": 8,
+        "mozliwe_oszczednosci": {"czas_godziny_miesiecznie": 16},
+        "rekomendacje": [{"narzedzie": "Zapier", "opis": 'Cudzysłów " i {nawias}'}]
+    }
+    assert result.salvaged_fields == ["ocena_potencjalu", "mozliwe_oszczednosci", "rekomendacje"]
+    assert result.dropped_chars > 0
+
+def test_parse_response_without_json():
+    result = parse_response("Przepraszam, nie mogę pomóc.")
+    assert not result.ok
+
+def test_incremental_feed_matches_single_parse():
+    parser = IncrementalJSONParser()
+    for start in range(0, len(FULL), 7):
+        parser.feed(FULL[start:start + 7])
+    assert parser.done
+    assert parser.result().data == parse_response(FULL).data
+
+
+def test_invalid_key_escape_is_treated_as_truncated():
+    from ai.schema import parse_analysis
+    text = '{"ocena_potencjalu": 8, "a\\q": 1, "rekomendacje": []}'
+    result = parse_response(text)
+    assert result.truncated and not result.complete
+    assert result.data == {"ocena_potencjalu": 8}
+    parser = IncrementalJSONParser().feed(text[:30]).feed(text[30:])
+    assert parser.completed_fields() == {"ocena_potencjalu": 8} and not parser.done
+    assert not parse_analysis('{"a\\q": 1}').complete
@@ -0,0 +1,52 @@
+"""
+Testy jednostkowe dla modułu ai/schema.py
+"""
+import timeit
+from ai.schema import (
+    STRICT_ANALYSIS_SCHEMA,
+    coerce_analysis,
+    parse_analysis,
+    response_format_for,
+    validate_analysis
+)
+
+VALID = {
+    "ocena_potencjalu": 8,
+    "mozliwe_oszczednosci": {"czas_godziny_miesiecznie": 16, "oszczednosci_pieniadze_miesiecznie": 2400.5},
+    "rekomendacje": [{"narzedzie": "Zapier", "opis": "Automatyzacja", "koszt_miesiecznie": 300, "czas_wdrozenia": "2 tygodnie"}],
+    "plan_wdrozenia": ["Krok 1"],
+    "uwagi": []
+}
+
+def test_validator_reports_paths():
+    assert validate_analysis(VALID) == []
+    errors = validate_analysis({"ocena_potencjalu": 11, "mozliwe_oszczednosci": [], "rekomendacje": [{"koszt_miesiecznie": "dużo"}]})
+    assert "$: brak pola plan_wdrozenia" in errors
+    assert "$.ocena_potencjalu: wartość większa niż 10" in errors
+    assert "$.mozliwe_oszczednosci: oczekiwano typu object" in errors
+    assert "$.rekomendacje[0].koszt_miesiecznie: oczekiwano typu number" in errors
+
+def test_coercion_fixes_common_type_drift():
+    coerced = coerce_analysis({
+        "ocena_potencjalu": "8",
+        "mozliwe_oszczednosci": {"oszczednosci_pieniadze_miesiecznie": "2 400 zł"},
+        "rekomendacje": [{"koszt_miesiecznie": "300,50"}],
+        "plan_wdrozenia": "Jeden krok"
+    })
+    assert coerced["ocena_potencjalu"] == 8
+    assert coerced["mozliwe_oszczednosci"]["oszczednosci_pieniadze_miesiecznie"] == 2400
+    assert coerced["rekomendacje"][0]["koszt_miesiecznie"] == 300.5
+    assert coerced["plan_wdrozenia"] == ["Jeden krok"]
+    assert validate_analysis(coerced) == []
+    assert parse_analysis('{"ocena_potencjalu": 7.6}').data == {"ocena_potencjalu": 8}
+
+def test_strict_schema_and_response_format():
+    assert STRICT_ANALYSIS_SCHEMA["additionalProperties"] is False
+    assert set(STRICT_ANALYSIS_SCHEMA["required"]) == set(STRICT_ANALYSIS_SCHEMA["properties"])
+    assert "maximum" not in STRICT_ANALYSIS_SCHEMA["properties"]["ocena_potencjalu"]
+    assert response_format_for("gpt-4o-mini")["type"] == "json_schema"
+    assert response_format_for("gpt-3.5-turbo") is None
+
+def test_validation_is_fast():
+    per_call = timeit.timeit(lambda: validate_analysis(VALID), number=2000) / 2000
+    assert per_call < 1e-4
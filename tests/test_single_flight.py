@@ -0,0 +1,37 @@
+"""
+Testy jednostkowe dla modułu ai/single_flight.py
+"""
+import threading
+import time
+import pytest
+from ai.single_flight import SingleFlight
+
+def test_concurrent_calls_with_same_key_run_once():
+    flight = SingleFlight()
+    calls = []
+
+    def slow_analysis():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"ocena_potencjalu": 7}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", slow_analysis))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{"ocena_potencjalu": 7}] * 5
+    assert flight.coalesced == 4
+    assert flight.in_flight() == 0
+
+def test_leader_error_is_propagated_and_key_released():
+    flight = SingleFlight()
+
+    def failing():
+        raise RuntimeError("429")
+
+    with pytest.raises(RuntimeError):
+        flight.do("k", failing)
+    assert flight.do("k", lambda: "ok") == "ok"
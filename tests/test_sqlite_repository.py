@@ -0,0 +1,99 @@
+"""
+Testy lokalnego repozytorium database/sqlite_repository.py
+"""
+import pytest
+from database.sqlite_repository import SQLiteRepository, fts_query
+from database.sync import EPOCH, load_snapshot, sync_snapshot
+
+DESCRIPTION = "Wystawianie faktur ręcznie w Excelu, sprawdzanie płatności i wysyłka emailem do klientów."
+ANALYSIS = {
+    "ocena_potencjalu": 8,
+    "mozliwe_oszczednosci": {"czas_godziny_miesiecznie": 20, "koszty_zl_miesiecznie": 1000},
+    "rekomendacje": [{"narzedzie": "Zapier", "opis": "Automatyczna wysyłka", "koszt_miesiecznie": "100 zł"}]
+}
+
+def process(title, description=DESCRIPTION, **extra):
+    return {"title": title, "description": description, "form_data": {
+        "process": {"frequency": "codziennie", "participants": "1 osoba", "duration": 2}, "improvement_goals": ["szybkość"]
+    }, **extra}
+
+@pytest.fixture
+def repo():
+    return SQLiteRepository(":memory:")
+
+@pytest.fixture
+def user_id(repo):
+    return repo.create_user("test@smartflow.pl", "test123456")["id"]
+
+def test_users_profiles_and_constraints(repo, user_id):
+    user, token = repo.authenticate("TEST@smartflow.pl ", "test123456")
+    assert user["id"] == user_id and token is None
+    with pytest.raises(ValueError):
+        repo.authenticate("test@smartflow.pl", "złe hasło")
+    with pytest.raises(ValueError):
+        repo.create_user("test@smartflow.pl", "inne")
+    repo.save_profile(user_id, {"company_size": "5-10 osób", "industry": "Handel", "budget_range": "do 500 zł/miesiąc"})
+    assert repo.save_profile(user_id, {"company_size": "11-25 osób", "industry": "Handel",
+                                       "budget_range": "do 500 zł/miesiąc"})["company_size"] == "11-25 osób"
+    with pytest.raises(Exception):
+        repo.save_profile(user_id, {"company_size": "1000 osób", "industry": "Handel", "budget_range": "do 500 zł/miesiąc"})
+
+def test_keyset_pages_return_summary_rows(repo, user_id):
+    ids = [repo.create_draft_process(user_id, process(f"Proces {i}")) for i in range(5)]
+    analyzed = repo.save_process(user_id, process("Długi", "słowo " * 200, ai_analysis=ANALYSIS))
+
+    rows, cursor = repo.list_processes(user_id, 4)
+    assert [row["id"] for row in rows] == [analyzed] + ids[:1:-1]
+    assert rows[0]["summary"] and rows[0]["form_data"]["process"]["description"].endswith("…")
+    assert rows[0]["ai_analysis"]["rekomendacje"] == [{"koszt_miesiecznie": "100 zł", "czas_wdrozenia": None}]
+    rest, cursor = repo.list_processes(user_id, 4, cursor)
+    assert [row["id"] for row in rest] == [ids[1], ids[0]] and cursor is None
+    assert repo.get_process(user_id, analyzed)["ai_analysis"] == ANALYSIS
+    assert repo.list_processes("inny-uzytkownik", 4) == ([], None)
+
+def test_changes_include_tombstones_and_drive_sync(repo, user_id):
+    kept = repo.create_draft_process(user_id, process("Faktury"))
+    removed = repo.create_draft_process(user_id, process("Raporty"))
+    snapshot = load_snapshot(user_id, 20, repo)
+
+    assert repo.soft_delete_process(user_id, removed) and not repo.soft_delete_process(user_id, removed)
+    repo.complete_process_analysis(kept, ANALYSIS)
+    changes = repo.process_changes(user_id, EPOCH)
+    assert [row["id"] for row in changes] == [removed, kept] and changes[0]["deleted_at"]
+    assert repo.get_process(user_id, removed) is None
+
+    assert sync_snapshot(snapshot, repository=repo) == 2
+    assert list(snapshot.rows) == [kept] and snapshot.rows[kept]["status"] == "analyzed"
+
+def test_search_ranks_unaccented_matches_and_skips_deleted(repo, user_id):
+    in_title = repo.create_draft_process(user_id, process("Faktury sprzedażowe"))
+    in_description = repo.create_draft_process(user_id, process("Księgowanie", "Faktury kosztowe wprowadzane ręcznie do programu " * 2))
+    deleted = repo.create_draft_process(user_id, process("Faktury korygujące"))
+    repo.soft_delete_process(user_id, deleted)
+    repo.save_process(user_id, process("Obsługa zamówień", "Przyjmowanie zamówień telefonicznie " * 5, ai_analysis=ANALYSIS))
+
+    rows, has_more = repo.search_processes(user_id, "faktury")
+    assert [row["id"] for row in rows] == [in_title, in_description] and not has_more
+    assert [row["title"] for row in repo.search_processes(user_id, "obsluga zapier")[0]] == ["Obsługa zamówień"]
+    assert [row["id"] for row in repo.search_processes(user_id, "faktury -sprzedazowe")[0]] == [in_description]
+    assert repo.search_processes(user_id, "faktury", limit=1)[1]
+    assert fts_query('"płatności emailem" -Excel') == '"platnosci emailem" NOT "excel"'
+    assert fts_query("-tylko") is None
+
+def test_stats_match_rpc_shape(repo, user_id):
+    repo.create_draft_process(user_id, process("Szkic"))
+    repo.save_process(user_id, process("Faktury", ai_analysis=ANALYSIS))
+    stats = repo.process_stats(user_id)
+    assert stats["total"] == 2 and stats["by_status"] == {"draft": 1, "analyzed": 1}
+    assert stats["avg_score"] == 8 and stats["max_score"] == 8
+    assert stats["analyzed"] == 1 and stats["hours_saved_monthly"] == 20
+
+def test_process_by_id_is_scoped_to_owner(repo, user_id):
+    process_id = repo.create_draft_process(user_id, process("Faktury"))
+    other = repo.create_user("inny@smartflow.pl", "haslo123456")["id"]
+    assert repo.get_process(other, process_id) is None
+    with pytest.raises(ValueError):
+        repo.update_process(other, process_id, {"title": "Przejęty"})
+    assert not repo.soft_delete_process(other, process_id)
+    assert repo.get_process(user_id, process_id)["title"] == "Faktury"
+    assert repo.update_process(user_id, process_id, {"title": "Nowa"})["title"] == "Nowa"
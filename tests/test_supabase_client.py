@@ -25,4 +25,35 @@ def test_get_user_not_found():
         mock_client.table.return_value.select.return_value.eq.return_value.execute.return_value.data = []
         mock_init.return_value = mock_client
         user = supabase_client.get_user("notfound@test.com")
-        assert user is None 
\ No newline at end of file
+        assert user is None 
+
+def test_complete_process_analysis_marks_analyzed():
+    with patch.object(supabase_client, 'init_supabase') as mock_init:
+        mock_client = MagicMock()
+        mock_client.table.return_value.update.return_value.eq.return_value.execute.return_value.data = [{"id": "p1", "status": "analyzed"}]
+        mock_init.return_value = mock_client
+        row = supabase_client.complete_process_analysis("p1", {"ocena_potencjalu": 7})
+        assert row["status"] == "analyzed"
+        mock_client.table.return_value.update.assert_called_with({
+            "ai_analysis": {"ocena_potencjalu": 7},
+            "potential_score": 7,
+            "status": "analyzed"
+        })
+
+def test_init_supabase_reuses_client_and_scopes_user_token(monkeypatch):
+    import contextvars
+    monkeypatch.setenv("SUPABASE_URL", "http://localhost:54321")
+    monkeypatch.setenv("SUPABASE_ANON_KEY", "fake.fake.fake")
+    client = supabase_client.init_supabase()
+    assert supabase_client.init_supabase() is client
+
+    def as_user():
+        supabase_client.set_access_token("user-token")
+        user_client = supabase_client._user_postgrest(supabase_client.get_session())
+        assert supabase_client._user_postgrest(supabase_client.get_session()) is user_client
+        assert user_client.session._transport.session.access_token == "user-token"
+        assert supabase_client._table("processes").session is user_client.session
+
+    # Token ustawiony w jednym kontekście nie wycieka do innych
+    contextvars.copy_context().run(as_user)
+    assert supabase_client.get_access_token() is None
@@ -0,0 +1,130 @@
+"""
+Testy skryptu supabase_setup.sql na prawdziwym Postgresie.
+
+Wymagają pustej bazy z rozszerzeniem unaccent (np. lokalnego `supabase start`)
+wskazanej w SMARTFLOW_TEST_DATABASE_URL - bez niej są pomijane. Skrypt jest
+wykonywany w transakcji wycofywanej po każdym teście.
+"""
+import os
+import json
+import uuid
+from pathlib import Path
+import pytest
+from analytics.portfolio import portfolio_summary, totals_from_stats
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+DATABASE_URL = os.getenv("SMARTFLOW_TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="brak SMARTFLOW_TEST_DATABASE_URL")
+
+SETUP_SQL = Path(__file__).resolve().parent.parent / "supabase_setup.sql"
+
+# Minimalny odpowiednik schematu auth z Supabase dla zwykłego Postgresa
+AUTH_SHIM = """
+CREATE SCHEMA auth;
+CREATE TABLE auth.users (id UUID PRIMARY KEY);
+CREATE FUNCTION auth.uid() RETURNS UUID AS $$
+    SELECT NULLIF(current_setting('request.jwt.claim.sub', true), '')::uuid
+$$ LANGUAGE sql STABLE;
+"""
+
+FUNCTIONS = [
+    "soft_delete_process(uuid)", "jsonb_numeric(jsonb)", "get_process_stats()",
+    "get_process_changes(timestamptz, uuid, integer)", "description_preview(processes)",
+    "recommendation_costs(processes)", "recommendations_text(jsonb)", "search_processes(text, integer, integer)"
+]
+
+
+@pytest.fixture
+def db():
+    connection = psycopg2.connect(DATABASE_URL)
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT to_regprocedure('auth.uid()') IS NULL")
+        if cursor.fetchone()[0]:
+            cursor.execute(AUTH_SHIM)
+        cursor.execute(SETUP_SQL.read_text(encoding="utf-8"))
+        yield cursor
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+def login(cursor) -> str:
+    """Nowy użytkownik auth.users ustawiony jako zalogowany (auth.uid()) do końca transakcji"""
+    user_id = str(uuid.uuid4())
+    cursor.execute("INSERT INTO auth.users (id) VALUES (%s)", (user_id,))
+    cursor.execute(
+        "SELECT set_config('request.jwt.claim.sub', %s, true), set_config('request.jwt.claims', %s, true)",
+        (user_id, json.dumps({"sub": user_id, "role": "authenticated"}))
+    )
+    return user_id
+
+
+def insert_process(cursor, user_id, title, description="Opis procesu", form_data=None, ai_analysis=None,
+                   status="draft") -> str:
+    cursor.execute(
+        """INSERT INTO processes (user_id, title, description, form_data, ai_analysis, potential_score, status)
+           VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING id""",
+        (user_id, title, description, json.dumps(form_data or {}), json.dumps(ai_analysis) if ai_analysis else None,
+         (ai_analysis or {}).get("ocena_potencjalu"), status)
+    )
+    return str(cursor.fetchone()[0])
+
+
+def test_setup_script_creates_all_functions_on_fresh_database(db):
+    for signature in FUNCTIONS:
+        db.execute("SELECT to_regprocedure(%s) IS NOT NULL", (signature,))
+        assert db.fetchone()[0], signature
+
+
+def test_process_changes_return_summary_columns_and_tombstones(db):
+    user_id = login(db)
+    analysis = {"ocena_potencjalu": 8, "mozliwe_oszczednosci": {"czas_godziny_miesiecznie": 20},
+                "rekomendacje": [{"narzedzie": "Zapier", "opis": "Wysyłka", "koszt_miesiecznie": "100 zł"}]}
+    kept = insert_process(db, user_id, "Faktury", "słowo " * 200, {"process": {"duration": 2}}, analysis, "analyzed")
+    removed = insert_process(db, user_id, "Raporty")
+    db.execute("SELECT soft_delete_process(%s)", (removed,))
+    insert_process(db, login(db), "Cudzy proces")
+    db.execute("SELECT set_config('request.jwt.claim.sub', %s, true)", (user_id,))
+
+    db.execute("SELECT id, deleted_at, description_preview, duration, recommendation_costs "
+               "FROM get_process_changes('-infinity')")
+    rows = {str(row[0]): row[1:] for row in db.fetchall()}
+
+    assert set(rows) == {kept, removed} and rows[removed][0] and rows[kept][0] is None
+    preview, duration, costs = rows[kept][1:]
+    assert len(preview) <= 501 and preview.endswith("…") and duration == "2"
+    assert costs == [{"koszt_miesiecznie": "100 zł", "czas_wdrozenia": None}]
+
+
+def test_process_stats_match_client_side_portfolio(db):
+    user_id = login(db)
+    company = {"company_size": "5-10 osób"}
+    processes = [
+        {"form_data": {"company": company, "process": {"frequency": "codziennie", "participants": "2-3 osoby", "duration": "1,5"}},
+         "ai_analysis": {"ocena_potencjalu": 8,
+                         "mozliwe_oszczednosci": {"czas_godziny_miesiecznie": 20, "oszczednosci_pieniadze_miesiecznie": "1 200 zł"},
+                         "rekomendacje": [{"koszt_miesiecznie": "100 zł", "czas_wdrozenia": "3 tygodnie"},
+                                          {"koszt_miesiecznie": "brak", "czas_wdrozenia": "1 miesiąc"},
+                                          {"koszt_miesiecznie": 50, "czas_wdrozenia": "10 dni"},
+                                          {"koszt_miesiecznie": 20}, "nie obiekt"]}},
+        {"form_data": {"process": {"frequency": "raz w tygodniu", "participants": "4 lub więcej", "duration": 2}},
+         "ai_analysis": {"ocena_potencjalu": 5, "mozliwe_oszczednosci": {"czas_godziny_miesiecznie": "12 h"}}},
+        {"form_data": {"company": {"company_size": "26-50 osób"}, "process": {"frequency": "raz w miesiącu", "duration": 3}}},
+        {"form_data": {"process": {"frequency": "codziennie", "participants": "1 osoba", "duration": 1}},
+         "ai_analysis": {"ocena_potencjalu": 3, "rekomendacje": [{"koszt_miesiecznie": 10}]}}
+    ]
+    for position, process in enumerate(processes):
+        status = "analyzed" if process.get("ai_analysis") else "draft"
+        insert_process(db, user_id, f"Proces {position}", form_data=process["form_data"],
+                       ai_analysis=process.get("ai_analysis"), status=status)
+    insert_process(db, login(db), "Cudzy proces", form_data=processes[0]["form_data"], ai_analysis=processes[0]["ai_analysis"])
+    db.execute("SELECT set_config('request.jwt.claim.sub', %s, true)", (user_id,))
+
+    db.execute("SELECT get_process_stats()")
+    stats = db.fetchone()[0]
+
+    assert stats["total"] == 4 and stats["by_status"] == {"analyzed": 3, "draft": 1}
+    assert stats["max_score"] == 8 and stats["analyzed"] == 2
+    assert totals_from_stats(stats) == pytest.approx(portfolio_summary(processes))
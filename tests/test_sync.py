@@ -0,0 +1,49 @@
+"""
+Testy synchronizacji przyrostowej database/sync.py
+"""
+from types import SimpleNamespace
+from database import sync
+
+def row(process_id, created, updated, **extra):
+    return {"id": process_id, "created_at": f"2024-01-{created:02d}T10:00:00+00:00",
+            "updated_at": f"2024-02-{updated:02d}T10:00:00+00:00", **extra}
+
+def test_changes_merge_into_loaded_range_and_advance_watermark(monkeypatch):
+    repository = SimpleNamespace(list_processes=lambda user_id, limit, cursor=None: (
+        [row("c", 3, 1), row("b", 2, 2)], ("2024-01-02T10:00:00+00:00", "b")
+    ))
+    snapshot = sync.load_snapshot("user-1", 2, repository)
+    assert snapshot.watermark == "2024-02-02T10:00:00+00:00"
+
+    requests = []
+    def changes(user_id, since, after_id, limit):
+        requests.append(since)
+        return [
+            row("b", 2, 2),                      # powtórzony przez cofnięcie znacznika - bez zmian
+            row("a", 1, 3, title="starszy"),     # poza wczytanym zakresem - przyjdzie z kolejną stroną
+            row("c", 3, 4, title="zmieniony"),
+            row("d", 5, 5, title="nowy"),
+            row("b", 2, 6, deleted_at="2024-02-06T10:00:00+00:00")
+        ]
+    repository.process_changes = changes
+    monkeypatch.setenv("SMARTFLOW_SYNC_OVERLAP_SECONDS", "5")
+
+    assert sync.sync_snapshot(snapshot, repository=repository) == 3
+    assert requests == ["2024-02-02T09:59:55+00:00"]
+    assert [p["id"] for p in snapshot.processes()] == ["d", "c"]
+    assert snapshot.rows["c"]["title"] == "zmieniony"
+    assert snapshot.watermark == "2024-02-06T10:00:00+00:00"
+
+def test_sync_pages_through_large_change_sets():
+    snapshot = sync.ProcessSnapshot(user_id="user-1")
+    all_changes = [row(f"p{i}", i, i) for i in range(1, 6)]
+    calls = []
+    def changes(user_id, since, after_id, limit):
+        calls.append((since, after_id))
+        start = 0 if after_id is None else [c["id"] for c in all_changes].index(after_id) + 1
+        return [dict(c) for c in all_changes[start:start + limit]]
+    repository = SimpleNamespace(process_changes=changes)
+
+    assert sync.sync_snapshot(snapshot, batch_size=2, repository=repository) == 5
+    assert calls[0] == (sync.EPOCH, None) and calls[1] == ("2024-02-02T10:00:00+00:00", "p2")
+    assert len(calls) == 3 and len(snapshot.rows) == 5
@@ -0,0 +1,700 @@
+"""
+Lokalny zamiennik usług OpenAI i Supabase dla SmartFlow (testy obciążeniowe).
+
+Serwer HTTP obsługuje podzbiór API używany przez aplikację:
+- OpenAI: POST /v1/chat/completions (także stream=True, format SSE),
+- Supabase PostgREST: /rest/v1/<tabela> (GET/POST/PATCH/DELETE z filtrami
+  eq/neq/lt/lte/gt/gte/is/in, order, limit, offset) oraz /rest/v1/rpc/<funkcja>,
+- Supabase GoTrue: /auth/v1/signup, /auth/v1/token, /auth/v1/user, /auth/v1/logout.
+
+Opóźnienia są losowane z konfigurowalnego rozkładu, a błędy (429, 500, timeout)
+wstrzykiwane z zadanym prawdopodobieństwem. Przy stałym --seed przebieg jest
+deterministyczny.
+
+Użycie:
+    python -m tools.fake_services --port 8787 --openai-latency lognormal:800:0.4 \\
+        --openai-errors 429=0.05,500=0.01,timeout=0.01
+
+    OPENAI_BASE_URL=http://localhost:8787/v1 OPENAI_API_KEY=sk-fake \\
+    SUPABASE_URL=http://localhost:8787 SUPABASE_ANON_KEY=fake.fake.fake \\
+    streamlit run streamlit_app.py
+"""
+import re
+import json
+import math
+import time
+import uuid
+import random
+import hashlib
+import argparse
+import threading
+import unicodedata
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+DEFAULT_ANALYSIS = {
+    "ocena_potencjalu": 8,
+    "mozliwe_oszczednosci": {
+        "czas_godziny_miesiecznie": 16,
+        "oszczednosci_pieniadze_miesiecznie": 2400
+    },
+    "rekomendacje": [
+        {
+            "narzedzie": "Zapier + Airtable",
+            "opis": "Automatyzacja zbierania i przetwarzania danych",
+            "koszt_miesiecznie": 300,
+            "czas_wdrozenia": "2 tygodnie"
+        }
+    ],
+    "plan_wdrozenia": [
+        "Tydzień 1: Konfiguracja Airtable",
+        "Tydzień 2: Połączenie przez Zapier",
+        "Tydzień 3: Testowanie i wdrożenie"
+    ],
+    "uwagi": ["Odpowiedź z lokalnego serwera testowego"]
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class LatencyModel:
+    """
+    Rozkład opóźnień w milisekundach:
+    "0", "fixed:50", "uniform:20:200", "lognormal:<mediana>:<sigma>".
+    """
+
+    def __init__(self, spec: str = "0", rng: Optional[random.Random] = None):
+        self.spec = spec
+        self.rng = rng or random.Random()
+        parts = spec.split(":")
+        self.kind = parts[0] if len(parts) > 1 else "fixed"
+        self.params = [float(p) for p in (parts[1:] if len(parts) > 1 else parts)]
+
+    def sample(self) -> float:
+        """Losuje opóźnienie w sekundach"""
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = self.rng.uniform(self.params[0], self.params[1])
+        elif self.kind == "lognormal":
+            ms = self.rng.lognormvariate(math.log(self.params[0]), self.params[1])
+        else:
+            raise ValueError(f"Nieznany rozkład opóźnień: {self.spec}")
+        return max(0.0, ms) / 1000
+
+
+class ErrorInjector:
+    """Wstrzykiwanie błędów, np. "429=0.05,500=0.01,timeout=0.01" """
+
+    def __init__(self, spec: str = "", rng: Optional[random.Random] = None, timeout_seconds: float = 120):
+        self.rng = rng or random.Random()
+        self.timeout_seconds = timeout_seconds
+        self.rates: List[Tuple[str, float]] = []
+        for item in filter(None, spec.split(",")):
+            kind, rate = item.split("=")
+            self.rates.append((kind.strip(), float(rate)))
+
+    def draw(self) -> Optional[str]:
+        """Zwraca rodzaj błędu do wstrzyknięcia ("429", "500", "timeout") lub None"""
+        roll = self.rng.random()
+        for kind, rate in self.rates:
+            if roll < rate:
+                return kind
+            roll -= rate
+        return None
+
+
+class FakeState:
+    """Stan serwera: tabele w pamięci, użytkownicy, konfiguracja i liczniki"""
+
+    def __init__(
+        self,
+        openai_latency: str = "0",
+        supabase_latency: str = "0",
+        openai_errors: str = "",
+        supabase_errors: str = "",
+        chunk_latency: str = "0",
+        fixtures: Optional[Dict[str, Any]] = None,
+        seed: Optional[int] = None
+    ):
+        rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.rng_lock = threading.Lock()
+        self.openai_latency = LatencyModel(openai_latency, rng)
+        self.supabase_latency = LatencyModel(supabase_latency, rng)
+        self.chunk_latency = LatencyModel(chunk_latency, rng)
+        self.openai_errors = ErrorInjector(openai_errors, rng)
+        self.supabase_errors = ErrorInjector(supabase_errors, rng)
+        self.chat_fixtures: List[str] = (fixtures or {}).get("chat") or [json.dumps(DEFAULT_ANALYSIS, ensure_ascii=False)]
+        self.tables: Dict[str, List[Dict[str, Any]]] = {
+            name: list(rows) for name, rows in ((fixtures or {}).get("tables") or {}).items()
+        }
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.tokens: Dict[str, str] = {}
+        self.refresh_tokens: Dict[str, str] = {}
+        # Tokeny odrzucane przez PostgREST jak wygasły JWT (401) - do testów odświeżania sesji
+        self.expired_tokens: set = set()
+        self.requests = 0
+
+    def sample(self, latency: LatencyModel, errors: ErrorInjector) -> Tuple[float, Optional[str]]:
+        with self.rng_lock:
+            return latency.sample(), errors.draw()
+
+    def chat_content(self, prompt: str) -> str:
+        """Deterministyczny wybór odpowiedzi z fixture na podstawie treści promptu"""
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        return self.chat_fixtures[digest[0] % len(self.chat_fixtures)]
+
+
+_FILTER = re.compile(r"^(eq|neq|lt|lte|gt|gte|is|in|like|ilike)\.(.*)$", re.S)
+
+
+def _coerce(raw: str) -> Any:
+    if raw == "null":
+        return None
+    if raw in ("true", "false"):
+        return raw == "true"
+    return raw
+
+
+def _compare(value: Any, op: str, raw: str) -> bool:
+    if op == "is":
+        return value is _coerce(raw) if raw == "null" else value == _coerce(raw)
+    if op == "in":
+        return str(value) in [item.strip().strip('"') for item in raw.strip("()").split(",")]
+    if op in ("like", "ilike"):
+        pattern = "^" + re.escape(raw).replace(r"\*", ".*").replace("%", ".*") + "$"
+        return re.match(pattern, str(value or ""), re.I if op == "ilike" else 0) is not None
+    if value is None:
+        return False
+    left, right = (value, float(raw)) if isinstance(value, (int, float)) and not isinstance(value, bool) else (str(value), raw)
+    return {
+        "eq": left == right,
+        "neq": left != right,
+        "lt": left < right,
+        "lte": left <= right,
+        "gt": left > right,
+        "gte": left >= right
+    }[op]
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Dzieli listę warunków po przecinkach poza nawiasami"""
+    parts, depth, current = [], 0, ""
+    for char in text:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _match_condition(row: Dict[str, Any], condition: str) -> bool:
+    """Warunek w składni PostgREST or=(...)/and(...), np. "created_at.lt.X" """
+    if condition.startswith(("or(", "and(")):
+        name, inner = condition.split("(", 1)
+        results = [_match_condition(row, part) for part in _split_top_level(inner[:-1])]
+        return any(results) if name == "or" else all(results)
+    column, op, raw = condition.split(".", 2)
+    negate = op == "not"
+    if negate:
+        op, raw = raw.split(".", 1)
+    if raw.startswith('"') and raw.endswith('"'):
+        raw = raw[1:-1]
+    return _compare(row.get(column), op, raw) != negate
+
+
+def _row_matches(row: Dict[str, Any], filters: List[Tuple[str, str]]) -> bool:
+    for column, expression in filters:
+        if column in ("or", "and"):
+            if not _match_condition(row, f"{column}{expression}"):
+                return False
+            continue
+        negate = expression.startswith("not.")
+        match = _FILTER.match(expression[4:] if negate else expression)
+        if not match:
+            continue
+        if _compare(row.get(column), match.group(1), match.group(2)) == negate:
+            return False
+    return True
+
+
+def _description_preview(row: Dict[str, Any]) -> Optional[str]:
+    description = row.get("description")
+    if description is None or len(description) <= 500:
+        return description
+    return re.sub(r"\s+\S*$", "", description[:500]) + "…"
+
+
+def _recommendation_costs(row: Dict[str, Any]) -> List[Dict[str, Any]]:
+    recommendations = (row.get("ai_analysis") or {}).get("rekomendacje")
+    return [
+        {"koszt_miesiecznie": rec.get("koszt_miesiecznie"), "czas_wdrozenia": rec.get("czas_wdrozenia")}
+        for rec in (recommendations if isinstance(recommendations, list) else [])
+        if isinstance(rec, dict)
+    ]
+
+
+# Kolumny wyliczane (funkcje SQL przyjmujące wiersz tabeli, jak w supabase_setup.sql)
+COMPUTED_COLUMNS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "description_preview": _description_preview,
+    "recommendation_costs": _recommendation_costs
+}
+
+
+def _project(row: Dict[str, Any], select: str) -> Dict[str, Any]:
+    if not select or select == "*":
+        return dict(row)
+    projected = {}
+    for column in (c.strip() for c in select.split(",")):
+        if column == "*":
+            projected.update(row)
+        elif "->" in column:
+            # Ścieżka JSON, np. ai_analysis->mozliwe_oszczednosci->>czas_godziny_miesiecznie
+            alias, path = column.split(":", 1) if ":" in column else (None, column)
+            keys = re.split(r"->>?", path)
+            value: Any = row.get(keys[0])
+            for key in keys[1:]:
+                value = value.get(key) if isinstance(value, dict) else None
+            projected[alias or keys[-1]] = value
+        elif column:
+            alias, source = column.split(":", 1) if ":" in column else (column, column)
+            projected[alias] = COMPUTED_COLUMNS[source](row) if source in COMPUTED_COLUMNS else row.get(source)
+    return projected
+
+
+_UNACCENT = str.maketrans("łŁ", "lL")
+
+
+def _search_words(text: str) -> List[str]:
+    # Jak konfiguracja smartflow_pl: simple + unaccent
+    plain = unicodedata.normalize("NFKD", (text or "").translate(_UNACCENT))
+    return re.findall(r"\w+", "".join(ch for ch in plain if not unicodedata.combining(ch)).lower())
+
+
+def _search_rank(row: Dict[str, Any], query: str) -> float:
+    """Uproszczone websearch_to_tsquery + ts_rank: wszystkie słowa muszą wystąpić, "-słowo" wyklucza"""
+    documents = [
+        (1.0, _search_words(row.get("title"))),
+        (0.4, _search_words(row.get("description"))),
+        (0.2, _search_words(" ".join(
+            f"{rec.get('narzedzie', '')} {rec.get('opis', '')}"
+            for rec in ((row.get("ai_analysis") or {}).get("rekomendacje") or []) if isinstance(rec, dict)
+        )))
+    ]
+    rank = 0.0
+    for term in query.split():
+        excluded = term.startswith("-")
+        words = _search_words(term.lstrip("-"))
+        hits = sum(weight * doc.count(word) for word in words for weight, doc in documents)
+        if excluded and hits:
+            return 0.0
+        if not excluded:
+            if not hits:
+                return 0.0
+            rank += hits
+    return rank
+
+
+class FakeServiceHandler(BaseHTTPRequestHandler):
+    """Obsługa zapytań OpenAI / PostgREST / GoTrue"""
+
+    server_version = "SmartFlowFake/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> FakeState:
+        return self.server.state
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        query = parse_qsl(url.query, keep_blank_values=True)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"null") if length else None
+        with self.state.lock:
+            self.state.requests += 1
+
+        if url.path.startswith("/v1/"):
+            latency, error = self.state.sample(self.state.openai_latency, self.state.openai_errors)
+        else:
+            latency, error = self.state.sample(self.state.supabase_latency, self.state.supabase_errors)
+        time.sleep(latency)
+        if error and self._inject_error(error):
+            return
+
+        if url.path == "/v1/chat/completions" and method == "POST":
+            self._chat_completions(body or {})
+        elif url.path.startswith("/rest/v1/") and self._bearer() in self.state.expired_tokens:
+            self._json(401, {"code": "PGRST301", "message": "JWT expired"})
+        elif url.path.startswith("/rest/v1/rpc/") and method == "POST":
+            self._rpc(url.path[len("/rest/v1/rpc/"):], body or {})
+        elif url.path.startswith("/rest/v1/"):
+            self._rest(method, url.path[len("/rest/v1/"):], query, body)
+        elif url.path.startswith("/auth/v1/"):
+            self._auth(method, url.path[len("/auth/v1/"):], dict(query), body or {})
+        else:
+            self._json(404, {"message": f"Nieobsługiwana ścieżka: {url.path}"})
+
+    def _inject_error(self, error: str) -> bool:
+        if error == "timeout":
+            time.sleep(self.state.openai_errors.timeout_seconds)
+            self.close_connection = True
+            return True
+        if error == "429":
+            self._json(429, {"error": {"message": "Rate limit (fake)", "type": "rate_limit_error"}}, {"Retry-After": "1"})
+            return True
+        if error.isdigit():
+            self._json(int(error), {"error": {"message": f"Błąd {error} (fake)", "type": "server_error"}})
+            return True
+        return False
+
+    def _json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    # ---------------- OpenAI ----------------
+
+    def _chat_completions(self, body: Dict[str, Any]) -> None:
+        messages = body.get("messages") or []
+        prompt = messages[-1].get("content", "") if messages else ""
+        content = self.state.chat_content(prompt)
+        model = body.get("model", "gpt-4o-mini")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        if not body.get("stream"):
+            self._json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4, "total_tokens": (len(prompt) + len(content)) // 4}
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        pieces = [content[i:i + 8] for i in range(0, len(content), 8)]
+        for index, piece in enumerate(pieces + [None]):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": piece} if piece is not None else {},
+                    "finish_reason": None if piece is not None else "stop"
+                }]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            with self.state.rng_lock:
+                delay = self.state.chunk_latency.sample()
+            time.sleep(delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    # ---------------- PostgREST ----------------
+
+    def _rest(self, method: str, table: str, query: List[Tuple[str, str]], body: Any) -> None:
+        params = {key: value for key, value in query if key in ("select", "order", "limit", "offset", "on_conflict", "columns")}
+        filters = [(key, value) for key, value in query if key not in params]
+        prefer = self.headers.get("Prefer", "")
+        single = "vnd.pgrst.object" in self.headers.get("Accept", "")
+
+        with self.state.lock:
+            rows = self.state.tables.setdefault(table, [])
+            if method == "GET":
+                result = [row for row in rows if _row_matches(row, filters)]
+                for order in reversed((params.get("order") or "").split(",")):
+                    if not order:
+                        continue
+                    column, *modifiers = order.split(".")
+                    result.sort(key=lambda row: (row.get(column) is None, row.get(column) or ""), reverse="desc" in modifiers)
+                offset = int(params.get("offset") or 0)
+                limit = params.get("limit")
+                result = result[offset:offset + int(limit)] if limit else result[offset:]
+            elif method == "POST":
+                result = []
+                for item in body if isinstance(body, list) else [body]:
+                    row = {"id": str(uuid.uuid4()), "created_at": _now(), "updated_at": _now(), "deleted_at": None}
+                    if table == "processes":
+                        row["status"] = "draft"
+                    row.update(item)
+                    rows.append(row)
+                    result.append(row)
+            elif method == "PATCH":
+                result = []
+                for row in rows:
+                    if _row_matches(row, filters):
+                        row.update(body or {})
+                        row["updated_at"] = _now()
+                        result.append(row)
+            else:
+                result = [row for row in rows if _row_matches(row, filters)]
+                self.state.tables[table] = [row for row in rows if row not in result]
+            result = [_project(row, params.get("select", "*")) for row in result]
+
+        if single:
+            if len(result) != 1:
+                self._json(406, {"message": "JSON object requested, multiple (or no) rows returned", "code": "PGRST116"})
+            else:
+                self._json(200, result[0])
+            return
+        if method != "GET" and "return=representation" not in prefer:
+            self._json(201 if method == "POST" else 204, [])
+            return
+        self._json(201 if method == "POST" else 200, result, {"Content-Range": f"0-{max(len(result) - 1, 0)}/*"})
+
+    def _bearer(self) -> str:
+        return (self.headers.get("Authorization") or "").replace("Bearer ", "")
+
+    def _auth_uid(self) -> Optional[str]:
+        """Odpowiednik auth.uid(): id użytkownika z tokenu w nagłówku Authorization"""
+        email = self.state.tokens.get(self._bearer())
+        return self.state.users[email]["id"] if email else None
+
+    def _process_stats(self, user_id: Optional[str]) -> Dict[str, Any]:
+        # Te same reguły co funkcja SQL get_process_stats (kalkulator z analytics/portfolio.py)
+        from analytics.portfolio import compute_portfolio, portfolio_frame
+        with self.state.lock:
+            active = [
+                dict(row) for row in self.state.tables.get("processes", [])
+                if user_id and row.get("user_id") == user_id and row.get("deleted_at") is None
+            ]
+        totals = compute_portfolio(portfolio_frame(active))["totals"]
+        scores = [row["potential_score"] for row in active if row.get("potential_score") is not None]
+        by_status: Dict[str, int] = {}
+        for row in active:
+            by_status[row.get("status")] = by_status.get(row.get("status"), 0) + 1
+        return {
+            "total": len(active),
+            "by_status": by_status,
+            "avg_score": round(sum(scores) / len(scores), 2) if scores else None,
+            "max_score": max(scores) if scores else None,
+            **{key: totals[key] for key in (
+                "monthly_hours", "analyzed", "hours_saved_monthly", "money_saved_monthly", "tool_cost_monthly", "setup_cost"
+            )}
+        }
+
+    def _search(self, user_id: Optional[str], body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        from database.supabase_client import PROCESS_LIST_COLUMNS
+        with self.state.lock:
+            ranked = [
+                (_search_rank(row, body.get("query") or ""), row)
+                for row in self.state.tables.get("processes", [])
+                if user_id and row.get("user_id") == user_id and row.get("deleted_at") is None
+            ]
+        ranked = [(rank, row) for rank, row in ranked if rank > 0]
+        ranked.sort(key=lambda item: (item[0], item[1]["created_at"], item[1]["id"]), reverse=True)
+        offset = int(body.get("result_offset") or 0)
+        limit = int(body.get("result_limit") or 20)
+        return [
+            {**_project(row, PROCESS_LIST_COLUMNS), "rank": rank}
+            for rank, row in ranked[offset:offset + limit]
+        ]
+
+    def _changes(self, user_id: Optional[str], body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        from database.supabase_client import PROCESS_LIST_COLUMNS
+
+        def key(row: Dict[str, Any]) -> Tuple[datetime, str]:
+            return datetime.fromisoformat(row["updated_at"]), row["id"]
+
+        since = (datetime.fromisoformat(body["since"]), body.get("after_id") or "")
+        with self.state.lock:
+            changed = sorted(
+                (row for row in self.state.tables.get("processes", [])
+                 if user_id and row.get("user_id") == user_id and key(row) > since),
+                key=key
+            )
+        return [
+            {**_project(row, PROCESS_LIST_COLUMNS), "deleted_at": row.get("deleted_at")}
+            for row in changed[:int(body.get("max_rows") or 500)]
+        ]
+
+    def _rpc(self, name: str, body: Dict[str, Any]) -> None:
+        if name == "get_process_changes":
+            self._json(200, self._changes(self._auth_uid(), body))
+            return
+        if name == "search_processes":
+            self._json(200, self._search(self._auth_uid(), body))
+            return
+        if name == "get_process_stats":
+            self._json(200, self._process_stats(self._auth_uid()))
+            return
+        if name == "soft_delete_process":
+            with self.state.lock:
+                for row in self.state.tables.get("processes", []):
+                    if row.get("id") == body.get("process_id") and row.get("deleted_at") is None:
+                        row["deleted_at"] = row["updated_at"] = _now()
+                        self._json(200, True)
+                        return
+            self._json(200, False)
+            return
+        self._json(404, {"message": f"Funkcja {name} nie istnieje w serwerze testowym", "code": "PGRST202"})
+
+    # ---------------- GoTrue ----------------
+
+    def _session(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        token = f"fake.{uuid.uuid4().hex}.token"
+        refresh_token = uuid.uuid4().hex
+        with self.state.lock:
+            self.state.tokens[token] = user["email"]
+            self.state.refresh_tokens[refresh_token] = user["email"]
+        return {
+            "access_token": token,
+            "token_type": "bearer",
+            "expires_in": 3600,
+            "expires_at": int(time.time()) + 3600,
+            "refresh_token": refresh_token,
+            "user": user
+        }
+
+    def _auth(self, method: str, path: str, query: Dict[str, str], body: Dict[str, Any]) -> None:
+        if path == "signup" and method == "POST":
+            email = body.get("email", "")
+            with self.state.lock:
+                if email in self.state.users:
+                    self._json(422, {"msg": "User already registered", "error_code": "user_already_exists"})
+                    return
+                user = {
+                    "id": str(uuid.uuid4()),
+                    "aud": "authenticated",
+                    "role": "authenticated",
+                    "email": email,
+                    "created_at": _now(),
+                    "updated_at": _now(),
+                    "app_metadata": {"provider": "email"},
+                    "user_metadata": {},
+                    "password": body.get("password")
+                }
+                self.state.users[email] = user
+            self._json(200, self._session(self._public_user(user)))
+        elif path == "token" and method == "POST" and query.get("grant_type") == "refresh_token":
+            # Refresh token jest jednorazowy, jak w Supabase Auth
+            with self.state.lock:
+                email = self.state.refresh_tokens.pop(body.get("refresh_token", ""), None)
+            if not email:
+                self._json(400, {"error": "invalid_grant", "error_description": "Invalid Refresh Token"})
+                return
+            self._json(200, self._session(self._public_user(self.state.users[email])))
+        elif path == "token" and method == "POST":
+            user = self.state.users.get(body.get("email", ""))
+            if not user or user["password"] != body.get("password"):
+                self._json(400, {"error": "invalid_grant", "error_description": "Invalid login credentials"})
+                return
+            self._json(200, self._session(self._public_user(user)))
+        elif path == "user" and method == "GET":
+            token = (self.headers.get("Authorization") or "").replace("Bearer ", "")
+            email = self.state.tokens.get(token)
+            if not email:
+                self._json(401, {"msg": "Invalid token"})
+                return
+            self._json(200, self._public_user(self.state.users[email]))
+        elif path == "logout":
+            self._json(204, {})
+        else:
+            self._json(404, {"msg": f"Nieobsługiwana ścieżka auth: {path}"})
+
+    @staticmethod
+    def _public_user(user: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in user.items() if key != "password"}
+
+
+def create_server(host: str = "127.0.0.1", port: int = 8787, **state_options: Any) -> ThreadingHTTPServer:
+    """Tworzy (nieuruchomiony) serwer; port=0 wybiera wolny port"""
+    server = ThreadingHTTPServer((host, port), FakeServiceHandler)
+    server.daemon_threads = True
+    server.state = FakeState(**state_options)
+    return server
+
+
+def start_in_thread(**options: Any) -> Tuple[ThreadingHTTPServer, str]:
+    """Uruchamia serwer w wątku tła; zwraca (serwer, bazowy URL)"""
+    server = create_server(port=options.pop("port", 0), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Lokalny serwer OpenAI/Supabase do testów obciążeniowych SmartFlow")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--openai-latency", default="lognormal:800:0.4", help="np. fixed:50, uniform:20:200, lognormal:800:0.4 (ms)")
+    parser.add_argument("--chunk-latency", default="fixed:15", help="opóźnienie między fragmentami strumienia (ms)")
+    parser.add_argument("--supabase-latency", default="uniform:5:30")
+    parser.add_argument("--openai-errors", default="", help="np. 429=0.05,500=0.01,timeout=0.01")
+    parser.add_argument("--supabase-errors", default="")
+    parser.add_argument("--fixtures", help="plik JSON z kluczami 'chat' (lista odpowiedzi) i 'tables'")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    fixtures = None
+    if args.fixtures:
+        with open(args.fixtures, encoding="utf-8") as f:
+            fixtures = json.load(f)
+    server = create_server(
+        args.host,
+        args.port,
+        openai_latency=args.openai_latency,
+        supabase_latency=args.supabase_latency,
+        chunk_latency=args.chunk_latency,
+        openai_errors=args.openai_errors,
+        supabase_errors=args.supabase_errors,
+        fixtures=fixtures,
+        seed=args.seed
+    )
+    base_url = f"http://{args.host}:{args.port}"
+    print(f"Serwer testowy działa na {base_url}")
+    print(f"  OPENAI_BASE_URL={base_url}/v1")
+    print(f"  SUPABASE_URL={base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
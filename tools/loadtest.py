@@ -0,0 +1,154 @@
+"""
+Moduł testów obciążeniowych dla SmartFlow.
+
+Uruchamia równoległe analizy procesów i odczyty listy procesów przeciwko
+skonfigurowanym usługom - zwykle lokalnemu serwerowi z tools.fake_services,
+dzięki czemu wyniki są powtarzalne i nie kosztują tokenów.
+
+Użycie:
+    python -m tools.fake_services --seed 1 &
+    python -m tools.loadtest --scenario analysis --requests 200 --concurrency 20
+    python -m tools.loadtest --scenario dashboard --requests 500 --concurrency 50
+
+Bez ustawionych OPENAI_BASE_URL / SUPABASE_URL skrypt sam uruchamia serwer
+testowy w tle (opcje --openai-latency, --openai-errors itd.).
+"""
+import os
+import time
+import uuid
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from tools.fake_services import start_in_thread
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _process_data(index: int) -> Dict[str, Any]:
+    # Unikalny opis - każde zapytanie omija cache i scalanie single-flight
+    description = f"Proces testowy {index}-{uuid.uuid4().hex}: otrzymuję zamówienie emailem, przepisuję je ręcznie do Excela i wystawiam fakturę."
+    return {
+        "title": f"Proces {index}",
+        "description": description,
+        "form_data": {
+            "process": {
+                "name": f"Proces {index}",
+                "frequency": "codziennie",
+                "participants": "2-3 osoby",
+                "duration": 2.0,
+                "description": description
+            },
+            "improvement_goals": ["szybkość"]
+        }
+    }
+
+
+def analysis_scenario() -> Callable[[int], Dict[str, Any]]:
+    """Analiza AI z pominięciem cache'u (odpowiedzi z sieci)"""
+    from ai.openai_service import OpenAIService
+
+    service = OpenAIService(use_cache=False)
+
+    def run(index: int) -> Dict[str, Any]:
+        return service.analyze_process(_process_data(index))
+
+    return run
+
+
+def dashboard_scenario() -> Callable[[int], Any]:
+    """Zapis procesu jednego użytkownika i odczyt pierwszej strony jego listy procesów"""
+    from database.supabase_client import get_user_processes_page, save_process
+
+    user_id = str(uuid.uuid4())
+    for index in range(20):
+        save_process(user_id, {**_process_data(index), "ai_analysis": {"ocena_potencjalu": 5}})
+
+    def run(index: int) -> Any:
+        return get_user_processes_page(user_id)
+
+    return run
+
+
+SCENARIOS = {
+    "analysis": analysis_scenario,
+    "dashboard": dashboard_scenario
+}
+
+
+def run_load(run: Callable[[int], Any], requests: int, concurrency: int) -> Dict[str, Any]:
+    """Wykonuje run(i) requests razy na concurrency wątkach; zwraca statystyki"""
+    latencies: List[float] = []
+    errors = 0
+    degraded = 0
+
+    def timed(index: int) -> None:
+        nonlocal errors, degraded
+        start = time.perf_counter()
+        try:
+            result = run(index)
+            if isinstance(result, dict) and result.get("_meta", {}).get("degraded"):
+                degraded += 1
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2),
+        "errors": errors,
+        "degraded": degraded,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Test obciążeniowy SmartFlow")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="analysis")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--openai-latency", default="lognormal:800:0.4")
+    parser.add_argument("--supabase-latency", default="uniform:5:30")
+    parser.add_argument("--openai-errors", default="")
+    parser.add_argument("--supabase-errors", default="")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_BASE_URL") and not os.getenv("SUPABASE_URL"):
+        _, base_url = start_in_thread(
+            openai_latency=args.openai_latency,
+            supabase_latency=args.supabase_latency,
+            openai_errors=args.openai_errors,
+            supabase_errors=args.supabase_errors,
+            seed=args.seed
+        )
+        os.environ.update({
+            "OPENAI_BASE_URL": f"{base_url}/v1",
+            "OPENAI_API_KEY": "sk-fake",
+            "SUPABASE_URL": base_url,
+            "SUPABASE_ANON_KEY": "fake.fake.fake"
+        })
+        print(f"Uruchomiono serwer testowy: {base_url}")
+
+    stats = run_load(SCENARIOS[args.scenario](), args.requests, args.concurrency)
+    for key, value in stats.items():
+        print(f"{key:>15}: {value}")
+
+
+if __name__ == "__main__":
+    main()